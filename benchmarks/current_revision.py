@@ -0,0 +1,102 @@
+"""Micro-benchmark: cost of Dataset.current_revision accesses in one update task.
+
+An update task reads the current revision once per file in `load_file`, again
+in `DatasetStore._persist_files` and in `FetchPolicy.should_refetch`. This
+compares those accesses with the cached squashed revision against rebuilding it
+on every access (the previous behaviour).
+
+    python benchmarks/current_revision.py [revisions] [files_per_revision]
+"""
+import sys
+import timeit
+from datetime import timedelta
+
+from ingestify.domain import Dataset, DatasetState, File, Identifier, Revision
+from ingestify.domain.models.dataset.revision import RevisionSource, SourceType
+from ingestify.utils import utcnow
+
+
+def build_dataset(revision_count: int, files_per_revision: int) -> Dataset:
+    now = utcnow()
+    dataset = Dataset(
+        bucket="main",
+        dataset_id="dataset-1",
+        name="Dataset 1",
+        state=DatasetState.COMPLETE,
+        dataset_type="match",
+        provider="benchmark",
+        identifier=Identifier(match_id=1),
+        metadata={},
+        created_at=now,
+        updated_at=now,
+        last_modified_at=None,
+    )
+    for revision_id in range(revision_count):
+        modified_at = now + timedelta(minutes=revision_id)
+        dataset.add_revision(
+            Revision(
+                revision_id=revision_id,
+                created_at=modified_at,
+                description="Update",
+                modified_files=[
+                    File(
+                        file_id=f"file{i}__v1",
+                        created_at=modified_at,
+                        modified_at=modified_at,
+                        tag=f"{revision_id}-{i}",
+                        size=100,
+                        content_type="application/json",
+                        data_feed_key=f"file{i}",
+                        data_spec_version="v1",
+                        data_serialization_format="json",
+                        storage_size=50,
+                        storage_compression_method="gzip",
+                        storage_path=f"match/{revision_id}/file{i}.json.gz",
+                    )
+                    for i in range(files_per_revision)
+                ],
+                source=RevisionSource(source_type=SourceType.TASK, source_id="b"),
+            )
+        )
+    return dataset
+
+
+def reset_caches(dataset: Dataset):
+    dataset._current_revision = None
+    for revision in dataset.revisions:
+        revision._modified_files_map = None
+
+
+def run_task(dataset: Dataset, files_per_revision: int, cached: bool):
+    # Every task starts with a freshly loaded dataset
+    reset_caches(dataset)
+    # load_file (per file), _persist_files and should_refetch
+    for _ in range(files_per_revision + 2):
+        if not cached:
+            reset_caches(dataset)
+        dataset.current_revision.modified_files_map.get("file0__v1")
+
+
+def main():
+    revision_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    files_per_revision = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    dataset = build_dataset(revision_count, files_per_revision)
+
+    number = 200
+    for cached in (False, True):
+        took = min(
+            timeit.repeat(
+                lambda: run_task(dataset, files_per_revision, cached),
+                number=number,
+                repeat=3,
+            )
+        )
+        print(
+            f"{'cached' if cached else 'uncached':>8}: "
+            f"{took / number * 1000:.3f} ms per task "
+            f"({revision_count} revisions, {files_per_revision} files each)"
+        )
+
+
+if __name__ == "__main__":
+    main()
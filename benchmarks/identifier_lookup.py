@@ -0,0 +1,114 @@
+"""Benchmark: selector lookups with inlined CTEs vs bound-parameter arrays.
+
+Looks up batches of 100, 1k and 10k identifiers with both lookup strategies of
+SqlAlchemyDatasetRepository and reports the time per lookup and the size of the
+SQL text that is sent.
+
+    python benchmarks/identifier_lookup.py [metadata_url]
+
+Without a url a temporary SQLite database is used. On SQLite the "cte"
+strategy can't use an index for selector joins, so larger batches are skipped
+for a strategy once a lookup takes longer than TIME_BUDGET seconds.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ingestify.domain import Dataset, DatasetState, Identifier, Selector
+from ingestify.infra.store.dataset.sqlalchemy.repository import (
+    SqlAlchemyDatasetRepository,
+    SqlAlchemySessionProvider,
+)
+from ingestify.utils import utcnow
+
+BATCH_SIZES = [100, 1_000, 10_000]
+REPEAT = 5
+TIME_BUDGET = 10.0
+
+
+def fill(repository: SqlAlchemyDatasetRepository, count: int):
+    now = utcnow()
+    datasets = [
+        Dataset(
+            bucket="benchmark",
+            dataset_id=f"dataset-{i}",
+            name=f"Dataset {i}",
+            state=DatasetState.COMPLETE,
+            identifier=Identifier(competition_id=i % 10, match_id=i),
+            dataset_type="match",
+            provider="benchmark",
+            metadata={},
+            created_at=now,
+            updated_at=now,
+            last_modified_at=now,
+        )
+        for i in range(count)
+    ]
+    for i in range(0, count, 1000):
+        repository.save_many("benchmark", datasets[i : i + 1000])
+
+
+def lookup(repository: SqlAlchemyDatasetRepository, offset: int, size: int):
+    selectors = [
+        Selector({"competition_id": i % 10, "match_id": i})
+        for i in range(offset, offset + size)
+    ]
+    return repository.get_dataset_collection(
+        bucket="benchmark",
+        provider="benchmark",
+        dataset_type="match",
+        selector=selectors,
+        metadata_only=True,
+    )
+
+
+def sql_length(repository: SqlAlchemyDatasetRepository, size: int) -> int:
+    cte = repository._build_cte(
+        [{"competition_id": i % 10, "match_id": i} for i in range(size)], "attributes"
+    )
+    return len(str(cte.select().compile(dialect=repository.dialect)))
+
+
+def main():
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+    else:
+        url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark.db'}"
+
+    session_provider = SqlAlchemySessionProvider(url, table_prefix="benchmark_")
+    try:
+        fill(SqlAlchemyDatasetRepository(session_provider), 2 * max(BATCH_SIZES))
+
+        too_slow = set()
+        for size in BATCH_SIZES:
+            for strategy in ("cte", "array"):
+                repository = SqlAlchemyDatasetRepository(
+                    session_provider, lookup_strategy=strategy
+                )
+                if strategy in too_slow:
+                    print(f"{size:>6} identifiers {strategy:>5}: skipped")
+                    continue
+
+                timings = []
+                for i in range(REPEAT):
+                    # Different identifiers every time, like ingestion batches
+                    offset = (i * size) % max(BATCH_SIZES)
+                    start = time.perf_counter()
+                    lookup(repository, offset, size)
+                    timings.append(time.perf_counter() - start)
+                    if timings[-1] > TIME_BUDGET:
+                        too_slow.add(strategy)
+                        break
+
+                print(
+                    f"{size:>6} identifiers {strategy:>5}: "
+                    f"{min(timings) * 1000:8.1f} ms per lookup, "
+                    f"{sql_length(repository, size):>8} bytes of SQL"
+                )
+    finally:
+        session_provider.drop_all_tables()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: build time and memory of the dataset summary map.
+
+Builds the summary of N datasets from cursor rows the way
+get_dataset_summary_map does: once as a dict of DatasetSummary objects keyed
+by the decoded identifier (the previous implementation) and once as a
+DatasetSummaryMap keyed by the identifier_key column. Each runs in a fresh
+process and reports the build time, how much the RSS grew and the time of a
+`get`.
+
+    python benchmarks/summary_map.py [sizes...]
+"""
+import gc
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from ingestify.domain.models.dataset.dataset import DatasetSummary
+from ingestify.domain.models.dataset.revision import RevisionState
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
+from ingestify.utils import key_from_dict
+
+SIZES = [100_000, 1_000_000, 3_000_000]
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def cursor(count: int, chunk_size: int = 10_000):
+    """Chunks of rows as they come from the query cursor: the identifier JSON,
+    the identifier_key column, both timestamps and the state."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for offset in range(0, count, chunk_size):
+        yield [
+            (
+                json.dumps({"competition_id": i % 50, "match_id": i}),
+                f"competition_id={i % 50}/match_id={i}",
+                start + timedelta(seconds=i),
+                start + timedelta(seconds=i, microseconds=1),
+                RevisionState.PENDING_VALIDATION,
+            )
+            for i in range(offset, min(offset + chunk_size, count))
+        ]
+
+
+def build_dict(rows, summary_map: dict):
+    # The previous implementation: decode the identifier, one object per row
+    for identifier, _, last_modified, created_at, state in rows:
+        summary_map[key_from_dict(json.loads(identifier))] = DatasetSummary(
+            last_modified=last_modified,
+            current_created_at=created_at,
+            current_state=state,
+            has_revisions=True,
+        )
+
+
+def build_compact(rows, summary_map: DatasetSummaryMap):
+    for _, identifier_key, last_modified, created_at, state in rows:
+        summary_map.add(identifier_key, last_modified, created_at, state, True)
+
+
+def run(kind: str, count: int):
+    gc.collect()
+    before = rss()
+    if kind == "dict":
+        summary_map, build = {}, build_dict
+    else:
+        summary_map, build = DatasetSummaryMap(), build_compact
+
+    took = 0.0
+    for rows in cursor(count):
+        start = time.perf_counter()
+        build(rows, summary_map)
+        took += time.perf_counter() - start
+        del rows
+    gc.collect()
+    grown = rss() - before
+
+    step = max(1, count // 10_000)
+    start = time.perf_counter()
+    for i in range(0, count, step):
+        summary_map.get(f"competition_id={i % 50}/match_id={i}")
+    lookup = (time.perf_counter() - start) / len(range(0, count, step)) * 1e6
+
+    print(
+        f"{count:>9} {kind:>7}: build {took:6.2f} s, "
+        f"RSS +{grown / 2**20:7.1f} MB, get {lookup:5.2f} us"
+    )
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], int(sys.argv[3]))
+        return
+
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    for count in sizes:
+        for kind in ("dict", "compact"):
+            # A fresh process per measurement, so the RSS isn't shared
+            subprocess.run(
+                [sys.executable, __file__, "--run", kind, str(count)], check=True
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,8 @@ except NameError:
     __INGESTIFY_SETUP__ = False
 
 if not __INGESTIFY_SETUP__:
-    from .infra import retrieve_http
-    from .source_base import Source, DatasetResource
+    from .infra import retrieve_http, retrieve_http_async
+    from .source_base import Source, AsyncSource, DatasetResource
     from .domain.models.fetch_policy import FetchPolicy
     from .exceptions import StopProcessing, FatalError
     from .main import debug_source
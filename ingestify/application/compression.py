@@ -0,0 +1,539 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from ingestify.domain.models import Dataset, FileRepository
+from ingestify.exceptions import ConfigurationError
+from ingestify.utils import BufferedStream, MappedStream
+
+logger = logging.getLogger(__name__)
+
+# Large files are split in members of this size, compressed in parallel
+GZIP_MEMBER_SIZE = 4 * 1024 * 1024
+
+
+def gzip_compress(data: bytes, level: int) -> bytes:
+    """Compress `data` to a single gzip member. A module level function, so it
+    can run in a process pool."""
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+_gzip_executor: Optional[ThreadPoolExecutor] = None
+_gzip_executor_lock = threading.Lock()
+
+
+def _get_gzip_executor() -> ThreadPoolExecutor:
+    """Threads for the gzip members when no executor is given, shared by all
+    codecs and created on first use. zlib releases the GIL while it
+    compresses, so the members are compressed on all cores."""
+    global _gzip_executor
+    with _gzip_executor_lock:
+        if _gzip_executor is None:
+            _gzip_executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="gzip"
+            )
+        return _gzip_executor
+
+
+def _reset_gzip_executor():
+    # The threads of the parent don't exist in a forked (worker) process
+    global _gzip_executor, _gzip_executor_lock
+    _gzip_executor = None
+    _gzip_executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_gzip_executor)
+
+
+def _seekable(stream: BinaryIO) -> BinaryIO:
+    """`stream`, or a local copy when it can't seek (e.g. an S3 download)"""
+    seekable = getattr(stream, "seekable", None)
+    if seekable is not None and seekable():
+        return stream
+    try:
+        return BufferedStream.from_stream(stream)
+    finally:
+        stream.close()
+
+
+class _RewindingReader(io.BufferedIOBase):
+    """Seekable view over a forward-only decompressing reader. Seeking back
+    reopens the reader at the start of the (seekable) source."""
+
+    def __init__(self, source: BinaryIO, open_reader):
+        self._source = source
+        self._open_reader = open_reader
+        self._reader = open_reader(source)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        self._checkClosed()
+        data = self._reader.read(-1 if size is None else size)
+        self._position += len(data)
+        return data
+
+    read1 = read
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._checkClosed()
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            # The size is only known after decompressing everything
+            while self.read(1024 * 1024):
+                pass
+            offset += self._position
+
+        if offset < self._position:
+            self._reader.close()
+            self._source.seek(0)
+            self._reader = self._open_reader(self._source)
+            self._position = 0
+        while self._position < offset:
+            if not self.read(min(offset - self._position, 1024 * 1024)):
+                break
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._reader.close()
+            self._source.close()
+        super().close()
+
+
+class Codec:
+    """Compresses files for storage and decompresses them when they're read.
+
+    `name` is recorded as File.storage_compression_method, `suffix` is added to
+    the file name. A codec may record a more specific method (e.g. the
+    dictionary that was used); reads are dispatched on the part before ":".
+    """
+
+    name: str
+    suffix: str = ""
+
+    def __init__(self, level: Optional[int] = None, levels: Dict[str, int] = None):
+        self.level = level
+        self.levels = levels or {}
+
+    def level_for(self, data_feed_key: str) -> Optional[int]:
+        return self.levels.get(data_feed_key, self.level)
+
+    def bind(self, file_repository: FileRepository, bucket: str):
+        """Called by the DatasetStore, for codecs that store state next to the
+        files."""
+
+    def compress(
+        self,
+        stream: BinaryIO,
+        data_feed_key: str,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[BinaryIO, Optional[str]]:
+        """Return the compressed stream and the method to record."""
+        raise NotImplementedError
+
+    def decompress(self, stream: BinaryIO, method: Optional[str]) -> BinaryIO:
+        """Return the decompressed content, read into memory (or a temporary
+        file when it's large)."""
+        raise NotImplementedError
+
+    def open(self, stream: BinaryIO, method: Optional[str]) -> BinaryIO:
+        """Return a seekable stream that decompresses while it's read."""
+        return self.decompress(stream, method)
+
+
+class NoCodec(Codec):
+    """Store files as they are."""
+
+    name = "none"
+
+    def compress(self, stream, data_feed_key, executor=None):
+        return stream, None
+
+    def decompress(self, stream, method):
+        # Repositories return (file) handles, LoadedFile holds an in-memory
+        # stream
+        try:
+            return BufferedStream.from_stream(stream)
+        finally:
+            stream.close()
+
+    def open(self, stream, method):
+        try:
+            fileno = stream.fileno()
+        except (AttributeError, OSError):
+            return _seekable(stream)
+        if os.fstat(fileno).st_size == 0:
+            # An empty file can't be mapped
+            return stream
+        return MappedStream(stream)
+
+
+class GzipCodec(Codec):
+    """gzip, with a level per data_feed_key.
+
+    Streams over `member_size` bytes are split in members of that size that
+    are compressed in parallel: in `executor` when given (the process pool of
+    the hybrid backend), otherwise in a shared thread pool. The members are
+    written in order: a sequence of gzip members is a valid gzip file, and
+    every gzip reader returns the concatenated content.
+    """
+
+    name = "gzip"
+    suffix = ".gz"
+
+    def __init__(
+        self,
+        level: int = 9,
+        levels: Optional[Dict[str, int]] = None,
+        member_size: int = GZIP_MEMBER_SIZE,
+    ):
+        super().__init__(level, levels)
+        self.member_size = member_size
+
+    def compress(self, stream, data_feed_key, executor=None):
+        level = self.level_for(data_feed_key)
+        output = BufferedStream()
+        chunk = stream.read(self.member_size)
+        if len(chunk) < self.member_size:
+            # A single member, or an empty file (still a valid gzip file)
+            output.write(gzip_compress(chunk, level))
+        else:
+            executor = executor or _get_gzip_executor()
+            # Bound the memory: only a few members are read ahead
+            max_pending = 2 * (os.cpu_count() or 1)
+            pending = deque()
+            while chunk:
+                pending.append(executor.submit(gzip_compress, chunk, level))
+                if len(pending) >= max_pending:
+                    output.write(pending.popleft().result())
+                chunk = stream.read(self.member_size)
+            while pending:
+                output.write(pending.popleft().result())
+        output.seek(0)
+        return output, self.name
+
+    def decompress(self, stream, method):
+        output = BufferedStream()
+        with gzip.GzipFile(fileobj=stream, mode="rb") as fp:
+            shutil.copyfileobj(fp, output)
+        output.seek(0)
+        return output
+
+    def open(self, stream, method):
+        # GzipFile can seek: back by rewinding the source
+        reader = gzip.GzipFile(fileobj=_seekable(stream), mode="rb")
+        # Close the source together with the reader
+        reader.myfileobj = reader.fileobj
+        return reader
+
+
+class ZstdCodec(Codec):
+    """Zstandard. Needs the `zstandard` package (`pip install ingestify[zstd]`).
+
+    With an executor (CPU-parallel mode), zstd compresses with its own
+    threads, one per core.
+    """
+
+    name = "zstd"
+    suffix = ".zst"
+
+    def __init__(self, level: int = 3, levels: Optional[Dict[str, int]] = None):
+        super().__init__(level, levels)
+
+    def _compressor(self, data_feed_key: str, executor, dict_data=None):
+        import zstandard
+
+        return zstandard.ZstdCompressor(
+            level=self.level_for(data_feed_key),
+            dict_data=dict_data,
+            threads=-1 if executor is not None else 0,
+        )
+
+    def _decompressor(self, dict_data=None):
+        import zstandard
+
+        return zstandard.ZstdDecompressor(dict_data=dict_data)
+
+    def _copy(self, compressor, stream: BinaryIO) -> BufferedStream:
+        output = BufferedStream()
+        compressor.copy_stream(stream, output)
+        output.seek(0)
+        return output
+
+    def compress(self, stream, data_feed_key, executor=None):
+        return (
+            self._copy(self._compressor(data_feed_key, executor), stream),
+            self.name,
+        )
+
+    def decompress(self, stream, method):
+        return self._copy(self._decompressor(), stream)
+
+    def _open(self, stream: BinaryIO, dict_data=None) -> BinaryIO:
+        decompressor = self._decompressor(dict_data=dict_data)
+        return _RewindingReader(
+            _seekable(stream),
+            lambda source: decompressor.stream_reader(
+                source, read_across_frames=True, closefd=False
+            ),
+        )
+
+    def open(self, stream, method):
+        return self._open(stream)
+
+
+class ZstdDictCodec(ZstdCodec):
+    """Zstandard with a dictionary trained per data_feed_key.
+
+    Small files of the same kind (lineups, match files) share most of their
+    structure. A dictionary holds that structure once, so each file only
+    stores what's different.
+
+    Until a data_feed_key has a dictionary, files are compressed without one
+    and the first `sample_count` of them (up to `max_sample_size` bytes) are
+    kept as training samples. The trained dictionary is stored in the file
+    repository under `<bucket>/zstd_dictionaries/`, and the files compressed
+    with it record `zstd-dict:<dictionary id>`. Dictionaries are never
+    removed, so every file can always be read.
+    """
+
+    name = "zstd-dict"
+
+    def __init__(
+        self,
+        level: int = 3,
+        levels: Optional[Dict[str, int]] = None,
+        dictionary_size: int = 112_640,
+        sample_count: int = 256,
+        max_sample_size: int = 1024 * 1024,
+    ):
+        super().__init__(level, levels)
+        self.dictionary_size = dictionary_size
+        self.sample_count = sample_count
+        self.max_sample_size = max_sample_size
+        self.file_repository: Optional[FileRepository] = None
+        self.bucket: Optional[str] = None
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, list] = {}
+        # data_feed_key -> dictionary id (None when there is none yet)
+        self._current: Dict[str, Optional[str]] = {}
+        self._dictionaries: Dict[str, object] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_lock", "_samples", "_current", "_dictionaries"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def bind(self, file_repository: FileRepository, bucket: str):
+        self.file_repository = file_repository
+        self.bucket = bucket
+
+    def _storage_path(self, name: str) -> str:
+        return f"{self.bucket}/zstd_dictionaries/{name}"
+
+    def _read(self, name: str) -> Optional[bytes]:
+        try:
+            with self.file_repository.load_content(
+                storage_path=self._storage_path(name)
+            ) as fp:
+                return fp.read()
+        except Exception:
+            return None
+
+    def _dictionary(self, dictionary_id: str):
+        import zstandard
+
+        with self._lock:
+            dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None:
+            data = self._read(f"{dictionary_id}.dict")
+            if data is None:
+                raise IOError(f"Missing zstd dictionary '{dictionary_id}'")
+            dictionary = zstandard.ZstdCompressionDict(data)
+            with self._lock:
+                self._dictionaries[dictionary_id] = dictionary
+        return dictionary
+
+    def _current_dictionary_id(self, data_feed_key: str) -> Optional[str]:
+        with self._lock:
+            if data_feed_key in self._current:
+                return self._current[data_feed_key]
+        # The dictionary trained by a previous run
+        pointer = self._read(f"{data_feed_key}.current")
+        dictionary_id = pointer.decode("utf-8").strip() if pointer else None
+        with self._lock:
+            return self._current.setdefault(data_feed_key, dictionary_id)
+
+    def _add_sample(self, data_feed_key: str, data: bytes):
+        if len(data) > self.max_sample_size:
+            return
+
+        with self._lock:
+            if self._current.get(data_feed_key):
+                return
+            samples = self._samples.setdefault(data_feed_key, [])
+            samples.append(data)
+            if len(samples) < self.sample_count:
+                return
+            del self._samples[data_feed_key]
+
+        self._train(data_feed_key, samples)
+
+    def _train(self, data_feed_key: str, samples: list):
+        import zstandard
+
+        try:
+            dictionary = zstandard.train_dictionary(self.dictionary_size, samples)
+        except zstandard.ZstdError as e:
+            logger.warning(
+                f"Could not train a zstd dictionary for '{data_feed_key}': {e}"
+            )
+            return
+
+        data = dictionary.as_bytes()
+        dictionary_id = hashlib.sha1(data).hexdigest()[:16]
+        self.file_repository.save_content_at(
+            self._storage_path(f"{dictionary_id}.dict"), BytesIO(data)
+        )
+        self.file_repository.save_content_at(
+            self._storage_path(f"{data_feed_key}.current"),
+            BytesIO(dictionary_id.encode("utf-8")),
+        )
+        logger.info(
+            f"Trained zstd dictionary {dictionary_id} for '{data_feed_key}' "
+            f"from {len(samples)} files"
+        )
+        with self._lock:
+            self._dictionaries[dictionary_id] = dictionary
+            self._current[data_feed_key] = dictionary_id
+
+    def compress(self, stream, data_feed_key, executor=None):
+        dictionary_id = self._current_dictionary_id(data_feed_key)
+        if dictionary_id is None:
+            data = stream.read()
+            self._add_sample(data_feed_key, data)
+            return (
+                self._copy(self._compressor(data_feed_key, executor), BytesIO(data)),
+                ZstdCodec.name,
+            )
+
+        compressor = self._compressor(
+            data_feed_key, executor, dict_data=self._dictionary(dictionary_id)
+        )
+        return self._copy(compressor, stream), f"{self.name}:{dictionary_id}"
+
+    def decompress(self, stream, method):
+        if ":" not in method:
+            return super().decompress(stream, method)
+        dictionary = self._dictionary(method.split(":", 1)[1])
+        return self._copy(self._decompressor(dict_data=dictionary), stream)
+
+    def open(self, stream, method):
+        if ":" not in method:
+            return super().open(stream, method)
+        return self._open(stream, self._dictionary(method.split(":", 1)[1]))
+
+
+CODECS = {codec.name: codec for codec in (NoCodec, GzipCodec, ZstdCodec, ZstdDictCodec)}
+
+
+class CodecRegistry:
+    """The codecs of a DatasetStore: `default` for all dataset types, unless
+    `dataset_types` maps a (provider, dataset_type) to another one.
+
+    Reads are dispatched on the method recorded for the file, so a store can
+    switch codecs at any time.
+    """
+
+    def __init__(
+        self,
+        default: str = "gzip",
+        dataset_types: Optional[Dict[Tuple[str, str], str]] = None,
+        level: Optional[int] = None,
+        levels: Optional[Dict[str, int]] = None,
+    ):
+        for name in [default, *(dataset_types or {}).values()]:
+            if name not in CODECS:
+                raise ConfigurationError(
+                    f"Unknown storage codec '{name}'. "
+                    f"Available codecs: {', '.join(CODECS)}"
+                )
+
+        self.default = default
+        self.dataset_types = dataset_types or {}
+        self.level = level
+        self.levels = levels
+        self.file_repository: Optional[FileRepository] = None
+        self.bucket: Optional[str] = None
+        self._codecs: Dict[str, Codec] = {}
+
+    def bind(self, file_repository: FileRepository, bucket: str):
+        self.file_repository = file_repository
+        self.bucket = bucket
+        for codec in self._codecs.values():
+            codec.bind(file_repository, bucket)
+
+    def register(self, codec: Codec):
+        """Use `codec` for its name, instead of one with the default options"""
+        if self.file_repository is not None:
+            codec.bind(self.file_repository, self.bucket)
+        self._codecs[codec.name] = codec
+
+    def get(self, name: str) -> Codec:
+        codec = self._codecs.get(name)
+        if codec is None:
+            try:
+                cls = CODECS[name]
+            except KeyError:
+                raise IOError(f"Unknown storage compression method '{name}'")
+
+            options = {"levels": self.levels}
+            if self.level is not None:
+                options["level"] = self.level
+            codec = cls(**options)
+            if self.file_repository is not None:
+                codec.bind(self.file_repository, self.bucket)
+            # Another thread may have created it in the meantime
+            codec = self._codecs.setdefault(name, codec)
+        return codec
+
+    def for_dataset(self, dataset: Dataset) -> Codec:
+        return self.get(
+            self.dataset_types.get(
+                (dataset.provider, dataset.dataset_type), self.default
+            )
+        )
+
+    def for_method(self, method: Optional[str]) -> Codec:
+        return self.get((method or NoCodec.name).split(":", 1)[0])
@@ -1,11 +1,12 @@
-import gzip
 import logging
 import os
-import shutil
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
 import threading
 from io import BytesIO
-from ingestify.utils import BufferedStream
 
 from typing import (
     Dict,
@@ -17,8 +18,11 @@ from typing import (
     Awaitable,
     NewType,
     Iterable,
+    Iterator,
+    Tuple,
 )
 
+from ingestify.domain.models.dataset.blob import Blob
 from ingestify.domain.models.dataset.dataset import DatasetState
 from ingestify.domain.models.dataset.events import (
     RevisionAdded,
@@ -32,6 +36,7 @@ from ingestify.domain.models.event import EventBus
 from ingestify.domain.models import (
     Dataset,
     DatasetCollection,
+    DatasetCursor,
     DatasetRepository,
     DraftFile,
     File,
@@ -42,7 +47,18 @@ from ingestify.domain.models import (
     Revision,
     DatasetCreated,
 )
-from ingestify.utils import utcnow
+from ingestify.exceptions import ConfigurationError
+from ingestify.utils import (
+    chunker,
+    content_hash,
+    get_concurrency,
+    parse_size,
+    utcnow,
+)
+from .compression import CodecRegistry
+from .file_cache import FileCache
+from .upload_queue import UploadQueue
+from .group_commit import GroupCommitWriter
 
 
 logger = logging.getLogger(__name__)
@@ -116,12 +132,29 @@ class DatasetStore:
         file_repository: FileRepository,
         bucket: str,
         identifier_index_configs: list = None,
+        codecs: Optional[CodecRegistry] = None,
+        content_addressed: bool = False,
     ):
         self.dataset_repository = dataset_repository
         self.file_repository = file_repository
-        self.storage_compression_method = "gzip"
         self.bucket = bucket
+        self.codecs = codecs or CodecRegistry()
+        self.codecs.bind(file_repository, bucket)
+        # Store files by content (see _persist_blobs)
+        self.content_addressed = content_addressed
         self.event_bus: Optional[EventBus] = None
+        # When set, compression runs in parallel in this (process) pool
+        self.compression_executor: Optional[Executor] = None
+        # When set, dataset saves of concurrent tasks are combined
+        self.group_commit_writer: Optional[GroupCommitWriter] = None
+        # When set, files are uploaded in the background
+        self.upload_queue: Optional[UploadQueue] = None
+        # Datasets of which a revision failed to upload, see flush_uploads
+        self._failed_uploads: List[Dataset] = []
+        # Shared by all threads while a with_file_cache scope is active
+        self.file_cache: Optional[FileCache] = None
+        self._file_cache_lock = threading.Lock()
+        self._file_cache_scopes = 0
         self._identifier_index_configs = identifier_index_configs or []
 
         # Pass current version to repository for validation/migration
@@ -130,32 +163,114 @@ class DatasetStore:
         self.dataset_repository.ensure_compatible_version(__version__)
 
     def create_indexes(self):
-        """Create identifier expression indexes for configured dataset types.
+        """Create identifier expression indexes for configured dataset types,
+        and table indexes missing on databases created by an older version.
 
-        Only runs on PostgreSQL. Safe to call multiple times (IF NOT EXISTS).
-        Should be triggered explicitly (e.g. via `ingestify sync-indexes`),
-        never automatically, as it can be slow on large tables.
+        Identifier indexes only run on PostgreSQL. Safe to call multiple times
+        (IF NOT EXISTS). Should be triggered explicitly (e.g. via
+        `ingestify sync-indexes`), never automatically, as it can be slow on
+        large tables.
         """
+        self.dataset_repository.create_table_indexes()
         self.dataset_repository.create_identifier_indexes(
             self._identifier_index_configs
         )
 
-    @property
-    def _thread_local(self):
-        if not hasattr(self, "_thread_local_"):
-            self._thread_local_ = threading.local()
-        return self._thread_local_
-
     def __getstate__(self):
         """When pickling this instance, don't pass EventBus. EventBus can contain all
         kind of dispatchers, which may, or may not can be pickled."""
         return {
             "dataset_repository": self.dataset_repository,
-            "storage_compression_method": self.storage_compression_method,
+            "codecs": self.codecs,
+            "content_addressed": self.content_addressed,
             "file_repository": self.file_repository,
             "bucket": self.bucket,
         }
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.event_bus = None
+        self.compression_executor = None
+        self.group_commit_writer = None
+        self.upload_queue = None
+        self._failed_uploads = []
+        self.file_cache = None
+        self._file_cache_lock = threading.Lock()
+        self._file_cache_scopes = 0
+        self._identifier_index_configs = []
+
+    @contextmanager
+    def with_compression_executor(self, executor: Optional[Executor]):
+        """Offload compression of files to `executor` during its scope. Used
+        to move the CPU-bound compression out of the (GIL-bound) task threads."""
+        previous = self.compression_executor
+        self.compression_executor = executor
+        try:
+            yield
+        finally:
+            self.compression_executor = previous
+
+    @contextmanager
+    def with_group_commit(self, max_items: int = 100, max_delay: float = 0.02):
+        """Combine the dataset saves of concurrent tasks during its scope. A save
+        returns once the transaction it was part of is committed. With
+        `max_items` set to 0 datasets are saved one by one."""
+        if max_items <= 0 or self.group_commit_writer is not None:
+            yield
+            return
+
+        writer = GroupCommitWriter(
+            self.dataset_repository,
+            self.bucket,
+            max_items=max_items,
+            max_delay=max_delay,
+        )
+        self.group_commit_writer = writer
+        try:
+            yield
+        finally:
+            self.group_commit_writer = None
+            writer.close()
+
+    @contextmanager
+    def with_upload_queue(
+        self, max_workers: int = 8, max_size: Union[int, str] = "256MB"
+    ):
+        """Upload files in the background during its scope. Tasks continue
+        once their files are compressed and queued, and the revision is saved
+        when all its files are uploaded. Queueing blocks while the queued
+        files are over `max_size`. With `max_workers` set to 0 files are
+        uploaded by the task itself."""
+        if max_workers <= 0 or self.upload_queue is not None:
+            yield
+            return
+
+        queue = UploadQueue(max_workers=max_workers, max_size=parse_size(max_size))
+        self.upload_queue = queue
+        try:
+            yield
+        finally:
+            self.upload_queue = None
+            queue.close()
+            # Not collected by flush_uploads; close() logs them
+            self._failed_uploads = []
+
+    def flush_uploads(self) -> List[Dataset]:
+        """Wait until the revisions of the queued uploads are saved, and
+        dispatch their events. Returns the datasets of which a revision was
+        not saved because an upload failed, since the previous flush."""
+        if not self.upload_queue:
+            return []
+        self.upload_queue.flush()
+        failed, self._failed_uploads = self._failed_uploads, []
+        return failed
+
+    def _save_dataset(self, dataset: Dataset):
+        if self.group_commit_writer:
+            self.group_commit_writer.save(dataset)
+        else:
+            self.dataset_repository.save(bucket=self.bucket, dataset=dataset)
+
     def set_event_bus(self, event_bus: EventBus):
         self.event_bus = event_bus
 
@@ -164,11 +279,18 @@ class DatasetStore:
             self.event_bus.dispatch(event)
 
     @contextmanager
-    def with_file_cache(self):
+    def with_file_cache(self, max_size: Union[int, str] = "256MB"):
         """Context manager to enable file caching during its scope.
 
-        Files loaded within this context will be cached and reused,
-        avoiding multiple downloads of the same file.
+        Files loaded within this context are kept in memory, decompressed, and
+        reused, avoiding multiple downloads of the same file. The cache is
+        shared by all threads: scopes that overlap (nested, or in other
+        threads) use the cache of the first one, which is dropped when the
+        last scope ends. The least recently used files are evicted when the
+        cache grows over `max_size` (bytes, or a size like "1GB").
+
+        Every load returns its own stream, so the files can be read by
+        several consumers at the same time.
 
         Example:
             # Without caching (loads files twice)
@@ -176,36 +298,61 @@ class DatasetStore:
             analyzer2 = VisualizationTool(store, dataset)
 
             # With caching (files are loaded once and shared)
-            with store.with_file_cache():
+            with store.with_file_cache() as file_cache:
                 analyzer1 = StatsAnalyzer(store, dataset)
                 analyzer2 = VisualizationTool(store, dataset)
+            print(file_cache.stats)
         """
-        # Enable caching for this thread
-        self._thread_local.use_file_cache = True
-        self._thread_local.file_cache = {}
+        with self._file_cache_lock:
+            if self.file_cache is None:
+                self.file_cache = FileCache(max_size=parse_size(max_size))
+            self._file_cache_scopes += 1
+            file_cache = self.file_cache
 
         try:
-            yield
+            yield file_cache
         finally:
-            # Disable caching for this thread
-            self._thread_local.use_file_cache = False
-            self._thread_local.file_cache = {}
+            with self._file_cache_lock:
+                self._file_cache_scopes -= 1
+                if not self._file_cache_scopes:
+                    self.file_cache = None
 
     def save_ingestion_job_summary(self, ingestion_job_summary):
         self.dataset_repository.save_ingestion_job_summary(ingestion_job_summary)
 
+    def release_thread_resources(self):
+        self.dataset_repository.release_thread_resources()
+
     def acquire_run_lock(self, job_key: str):
         """Single-run lock for one job identity (see docs/design/single-run-lock.md).
         Returns a held RunLock, or None if another process already holds it."""
         return self.dataset_repository.acquire_run_lock(job_key)
 
     def get_dataset_summary_map(
-        self, provider: str, dataset_type: str
+        self,
+        provider: str,
+        dataset_type: str,
+        selector: Optional[Selector] = None,
+        updated_since: Optional[datetime] = None,
+        summary_map: Optional["DatasetSummaryMap"] = None,
     ) -> "DatasetSummaryMap":
         return self.dataset_repository.get_dataset_summary_map(
             bucket=self.bucket,
             provider=provider,
             dataset_type=dataset_type,
+            selector=selector,
+            updated_since=updated_since,
+            summary_map=summary_map,
+        )
+
+    def count_datasets(
+        self, provider: str, dataset_type: str, selector: Optional[Selector] = None
+    ) -> Optional[int]:
+        return self.dataset_repository.count_datasets(
+            bucket=self.bucket,
+            provider=provider,
+            dataset_type=dataset_type,
+            selector=selector,
         )
 
     def get_dataset_collection(
@@ -217,11 +364,37 @@ class DatasetStore:
         page: Optional[int] = None,
         page_size: Optional[int] = None,
         dataset_state: Optional[DatasetStateParam] = None,
+        after: Optional[Union[str, DatasetCursor]] = None,
+        revisions: str = "all",
         **selector,
     ) -> DatasetCollection:
+        """Get the datasets matching the criteria.
+
+        Pages can be requested in two ways: with `page` and `page_size` (offset
+        based), or with `after` and `page_size`. The latter seeks past a
+        DatasetCursor and stays fast for deep pages. The cursor of the next page
+        is available as `collection.metadata.next_cursor`.
+
+        With `revisions="current"` only the current revision of every dataset is
+        loaded (squashed in the database), which is all `load_files` and the fetch
+        policies need. Use the default `"all"` to get the full revision history.
+        """
+        if isinstance(after, str):
+            after = DatasetCursor.decode(after)
+
         if "selector" in selector:
             selector = selector["selector"]
-        if isinstance(selector, dict):
+
+        identifiers = None
+        if (
+            isinstance(selector, list)
+            and selector
+            and all(isinstance(item, Identifier) for item in selector)
+        ):
+            # Complete identifiers: look them up by their key instead of
+            # matching every attribute
+            identifiers, selector = selector, None
+        elif isinstance(selector, dict):
             # By-pass the build as we don't want to specify data_spec_versions here... (for now)
             selector = Selector(selector)
         elif isinstance(selector, list):
@@ -245,6 +418,9 @@ class DatasetStore:
             dataset_state=normalized_dataset_state,
             page=page,
             page_size=page_size,
+            after=after,
+            revisions=revisions,
+            identifiers=identifiers,
         )
         return dataset_collection
 
@@ -256,11 +432,19 @@ class DatasetStore:
         batch_size: int = 1000,
         yield_dataset_collection: bool = False,
         dataset_state: Optional[DatasetStateParam] = None,
+        after: Optional[Union[str, DatasetCursor]] = None,
+        pagination: str = "keyset",
+        revisions: str = "all",
         **selector,
     ):
         """
         Iterate through all datasets matching the criteria with automatic pagination.
 
+        Datasets are returned ordered by (created_at, dataset_id). By default every
+        page seeks past the last dataset of the previous page (keyset pagination),
+        so fetching a page doesn't get slower the further the iteration gets, and
+        datasets created during the iteration don't shift the pages.
+
         Examples:
         ```
         # Iterate through individual datasets
@@ -281,6 +465,11 @@ class DatasetStore:
             dataset_state="COMPLETE"  # Can also use DatasetState.COMPLETE or ["COMPLETE", "PARTIAL"]
         ):
             process_completed_dataset(dataset)
+
+        # Resume an iteration after the last processed dataset
+        cursor = DatasetCursor.from_dataset(last_processed_dataset).encode()
+        for dataset in store.iter_dataset_collection_batches(after=cursor):
+            process(dataset)
         ```
 
         Args:
@@ -292,12 +481,22 @@ class DatasetStore:
                                      instead of individual Dataset objects
             dataset_state: Optional filter for dataset state. Can be a string, DatasetState enum,
                           or a list of strings or DatasetState enums
+            after: Optional DatasetCursor (or its encoded string) to start after
+            pagination: "keyset" (default) or "offset" to use page numbers
+            revisions: "all" (default) or "current" to only load the current revision
             **selector: Additional selector criteria
 
         Yields:
             If yield_dataset_collection is False (default): Dataset objects one by one
             If yield_dataset_collection is True: DatasetCollection objects (pages)
         """
+        if pagination not in ("keyset", "offset"):
+            raise ValueError(f"Unknown pagination: {pagination}")
+        if after is not None and pagination != "keyset":
+            raise ValueError("`after` requires keyset pagination")
+
+        # Without a cursor the first page is fetched by offset (0); from then
+        # on pages are fetched by the cursor of the previous page.
         page = 1
         while True:
             collection = self.get_dataset_collection(
@@ -307,6 +506,8 @@ class DatasetStore:
                 page=page,
                 page_size=batch_size,
                 dataset_state=dataset_state,
+                after=after,
+                revisions=revisions,
                 **selector,
             )
 
@@ -319,8 +520,13 @@ class DatasetStore:
                 for dataset in collection:
                     yield dataset
 
+            if pagination == "keyset":
+                # No cursor means the last page was not full
+                after = collection.metadata.next_cursor
+                if after is None:
+                    break
             # If we got fewer results than page_size, we've reached the end
-            if len(collection) < batch_size:
+            elif len(collection) < batch_size:
                 break
 
             page += 1
@@ -331,7 +537,7 @@ class DatasetStore:
     #     self.dataset_repository.destroy_dataset(dataset_id)
 
     def _prepare_write_stream(
-        self, file_: DraftFile
+        self, dataset: Dataset, file_: DraftFile
     ) -> tuple[BinaryIO, int, str, Optional[str]]:
         if file_.content_compression_method == "gzip":
             # Already gzip - store as-is, no CPU cost
@@ -341,44 +547,47 @@ class DatasetStore:
             stream.seek(0)
             return stream, storage_size, ".gz", "gzip"
 
-        if self.storage_compression_method == "gzip":
-            stream = BufferedStream()
-            with gzip.GzipFile(fileobj=stream, compresslevel=9, mode="wb") as fp:
-                shutil.copyfileobj(file_.stream, fp)
-
-            stream.seek(0, os.SEEK_END)
-            storage_size = stream.tell()
-            stream.seek(0)
-            return stream, storage_size, ".gz", "gzip"
-
-        return file_.stream, file_.size, "", None
+        codec = self.codecs.for_dataset(dataset)
+        stream, compression_method = codec.compress(
+            file_.stream, file_.data_feed_key, executor=self.compression_executor
+        )
+        stream.seek(0, os.SEEK_END)
+        storage_size = stream.tell()
+        stream.seek(0)
+        return stream, storage_size, codec.suffix, compression_method
 
     def _prepare_read_stream(
-        self,
+        self, storage_compression_method: Optional[str], streaming: bool = False
     ) -> tuple[Callable[[BinaryIO], Awaitable[BinaryIO]], str]:
-        if self.storage_compression_method == "gzip":
-
-            def reader(fh: BinaryIO) -> BinaryIO:
-                stream = BufferedStream()
-                with gzip.GzipFile(fileobj=fh, compresslevel=9, mode="rb") as fp:
-                    shutil.copyfileobj(fp, stream)
-                stream.seek(0)
-                return stream
-
-            return reader, ".gz"
-        else:
-            return lambda fh: fh, ""
+        """Reader for a file stored with `storage_compression_method`. When
+        streaming, the reader returns a view that decompresses while it's
+        read, instead of a decompressed copy."""
+        codec = self.codecs.for_method(storage_compression_method)
+        if streaming:
+            return (
+                lambda fh: codec.open(fh, storage_compression_method),
+                codec.suffix,
+            )
+        return (
+            lambda fh: codec.decompress(fh, storage_compression_method),
+            codec.suffix,
+        )
 
     def _persist_files(
         self,
         dataset: Dataset,
         revision_id: int,
         modified_files: Dict[str, Optional[DraftFile]],
+        uploads: Optional[List[Future]] = None,
     ) -> List[File]:
+        """Store the changed files. When `uploads` is passed, the files are
+        queued on the upload queue and the futures of the uploads are added
+        to it."""
         modified_files_ = []
 
         current_revision = dataset.current_revision
 
+        changed_files = {}
         for file_id, file_ in modified_files.items():
             if isinstance(file_, NotModifiedFile):
                 # It's always allowed to pass NotModifiedFile as file. This means it didn't change and must be ignored.
@@ -393,21 +602,37 @@ class DatasetStore:
                 # File didn't change. Ignore it.
                 continue
 
+            changed_files[file_id] = file_
+
+        if self.content_addressed:
+            return self._persist_blobs(dataset, changed_files, uploads)
+
+        for file_id, file_ in changed_files.items():
             (
                 stream,
                 storage_size,
                 suffix,
                 compression_method,
-            ) = self._prepare_write_stream(file_)
+            ) = self._prepare_write_stream(dataset, file_)
 
-            # TODO: check if this is a very clean way to go from DraftFile to File
-            full_path = self.file_repository.save_content(
+            filename = file_id + "." + file_.data_serialization_format + suffix
+            save_content = partial(
+                self.file_repository.save_content,
                 bucket=self.bucket,
                 dataset=dataset,
                 revision_id=revision_id,
-                filename=file_id + "." + file_.data_serialization_format + suffix,
+                filename=filename,
                 stream=stream,
             )
+            if uploads is None:
+                full_path = save_content()
+            else:
+                uploads.append(self.upload_queue.submit(save_content, storage_size))
+                full_path = self.file_repository.get_write_path(
+                    self.bucket, dataset, revision_id, filename
+                )
+
+            # TODO: check if this is a very clean way to go from DraftFile to File
             file = File.from_draft(
                 file_,
                 file_id,
@@ -420,6 +645,82 @@ class DatasetStore:
 
         return modified_files_
 
+    def _persist_blobs(
+        self,
+        dataset: Dataset,
+        changed_files: Dict[str, DraftFile],
+        uploads: Optional[List[Future]] = None,
+    ) -> List[File]:
+        """Content-addressed layout: every distinct content is stored once,
+        under `<bucket>/blobs/`, and shared by all files with that content.
+        Contents that are already stored aren't compressed or uploaded again.
+        A queued blob is recorded once its upload succeeded."""
+        content_hashes = {
+            file_id: content_hash(file_.stream)
+            for file_id, file_ in changed_files.items()
+        }
+        blobs = self.dataset_repository.get_blobs(
+            self.bucket, list(set(content_hashes.values()))
+        )
+
+        new_blobs = []
+        modified_files_ = []
+        for file_id, file_ in changed_files.items():
+            hash_ = content_hashes[file_id]
+            blob = blobs.get(hash_)
+            if blob is None:
+                (
+                    stream,
+                    storage_size,
+                    suffix,
+                    compression_method,
+                ) = self._prepare_write_stream(dataset, file_)
+                storage_path = (
+                    f"{self.bucket}/blobs/{hash_[:2]}/{hash_}"
+                    f".{file_.data_serialization_format}{suffix}"
+                )
+                if uploads is None:
+                    full_path = self.file_repository.save_content_at(
+                        storage_path, stream
+                    )
+                else:
+                    full_path = self.file_repository.get_read_path(storage_path)
+                blob = Blob(
+                    content_hash=hash_,
+                    storage_path=self.file_repository.get_relative_path(full_path),
+                    storage_size=storage_size,
+                    storage_compression_method=compression_method,
+                    created_at=utcnow(),
+                )
+                blobs[hash_] = blob
+                if uploads is None:
+                    new_blobs.append(blob)
+                else:
+                    uploads.append(
+                        self.upload_queue.submit(
+                            partial(self._upload_blob, storage_path, stream, blob),
+                            storage_size,
+                        )
+                    )
+
+            modified_files_.append(
+                File.from_draft(
+                    file_,
+                    file_id,
+                    storage_size=blob.storage_size,
+                    storage_compression_method=blob.storage_compression_method,
+                    path=blob.storage_path,
+                )
+            )
+
+        if new_blobs:
+            self.dataset_repository.save_blobs(self.bucket, new_blobs)
+        return modified_files_
+
+    def _upload_blob(self, storage_path: str, stream: BinaryIO, blob: Blob):
+        self.file_repository.save_content_at(storage_path, stream)
+        self.dataset_repository.save_blobs(self.bucket, [blob])
+
     def add_revision(
         self,
         dataset: Dataset,
@@ -432,10 +733,33 @@ class DatasetStore:
         Create new revision first, so FileRepository can use
         revision_id in the key.
         """
+        return self._add_revision(
+            dataset, files, revision_source, description, force_save
+        )
+
+    def _add_revision(
+        self,
+        dataset: Dataset,
+        files: Dict[str, DraftFile],
+        revision_source: RevisionSource,
+        description: str = "Update",
+        force_save: bool = False,
+        after_save: Optional[Callable[[], None]] = None,
+    ):
+        """With an upload queue, the revision is saved once the files are
+        uploaded, on an upload thread. Its events (and `after_save`) are
+        dispatched by `flush_uploads`, on the calling thread."""
+        upload_queue = self.upload_queue
+        uploads = None
+        if upload_queue:
+            # A previous revision of the dataset must be saved first
+            upload_queue.wait(dataset.dataset_id)
+            uploads = []
+
         revision_id = dataset.next_revision_id()
         created_at = utcnow()
 
-        persisted_files_ = self._persist_files(dataset, revision_id, files)
+        persisted_files_ = self._persist_files(dataset, revision_id, files, uploads)
         if persisted_files_ or force_save:
             # It can happen an API tells us data is changed, but it was not changed. In this case
             # we decide to ignore it.
@@ -448,13 +772,31 @@ class DatasetStore:
                 source=revision_source,
             )
 
-            dataset.add_revision(revision)
+            def save():
+                dataset.add_revision(revision)
 
-            self.dataset_repository.save(bucket=self.bucket, dataset=dataset)
-            self.dispatch(RevisionAdded(dataset=dataset))
-            logger.info(
-                f"Added a new revision to {dataset.identifier} -> {', '.join([file.file_id for file in persisted_files_])}"
-            )
+                self._save_dataset(dataset)
+                logger.info(
+                    f"Added a new revision to {dataset.identifier} -> {', '.join([file.file_id for file in persisted_files_])}"
+                )
+
+            def saved():
+                self.dispatch(RevisionAdded(dataset=dataset))
+                if after_save:
+                    after_save()
+
+            if uploads:
+                upload_queue.when_done(
+                    uploads,
+                    save,
+                    key=dataset.dataset_id,
+                    after=saved,
+                    on_failure=lambda _: self._failed_uploads.append(dataset),
+                )
+            else:
+                save()
+                saved()
+            return revision
         else:
             if dataset.update_last_modified(files):
                 # For some Datasets the last modified doesn't make sense (for sources that don't provide it)
@@ -472,9 +814,9 @@ class DatasetStore:
                     f"Ignoring a new revision without changed files -> {dataset.identifier}"
                 )
 
-            revision = None
-
-        return revision
+            if after_save:
+                after_save()
+            return None
 
     def update_dataset(
         self,
@@ -488,17 +830,18 @@ class DatasetStore:
         """The add_revision will also save the dataset."""
         metadata_changed = False
         if dataset.update_metadata(name, metadata, state):
-            self.dataset_repository.save(bucket=self.bucket, dataset=dataset)
+            self._save_dataset(dataset)
             metadata_changed = True
 
-        revision = self.add_revision(dataset, files, revision_source)
-
-        if metadata_changed:
-            # Dispatch after revision added. Otherwise, the downstream handlers are not able to see
-            # the new revision
-            self.dispatch(MetadataUpdated(dataset=dataset))
+        def after_save():
+            if metadata_changed:
+                # Dispatch after revision added. Otherwise, the downstream handlers are not able to see
+                # the new revision
+                self.dispatch(MetadataUpdated(dataset=dataset))
 
-        return revision
+        return self._add_revision(
+            dataset, files, revision_source, after_save=after_save
+        )
 
     def invalidate_revision(self, dataset: Dataset, reason: str = ""):
         """Mark the current revision as VALIDATION_FAILED and reset
@@ -547,51 +890,149 @@ class DatasetStore:
             updated_at=now,
             last_modified_at=None,  # Not known at this moment
         )
-        revision = self.add_revision(
-            dataset, files, revision_source, description, force_save=True
+        return self._add_revision(
+            dataset,
+            files,
+            revision_source,
+            description,
+            force_save=True,
+            after_save=lambda: self.dispatch(DatasetCreated(dataset=dataset)),
         )
 
-        self.dispatch(DatasetCreated(dataset=dataset))
-        return revision
-
     def load_files(
         self,
         dataset: Dataset,
         data_feed_keys: Optional[List[str]] = None,
         lazy: bool = False,
         auto_rewind: bool = True,
+        streaming: bool = False,
     ) -> FileCollection:
+        """Load the current files of `dataset`.
+
+        With `streaming`, every file stream is a seekable view that decompresses
+        while it's read, and uncompressed local files are memory-mapped. Use
+        this to scan large files without first decompressing them into memory
+        (or a temporary file). Close the streams when done."""
         current_revision = dataset.current_revision
+        file_cache = self.file_cache
         files = {}
 
-        reader, suffix = self._prepare_read_stream()
         for file in current_revision.modified_files:
             if data_feed_keys and file.data_feed_key not in data_feed_keys:
                 continue
 
             def get_stream(file_):
+                reader, _ = self._prepare_read_stream(
+                    file_.storage_compression_method, streaming=streaming
+                )
                 return reader(
-                    self.file_repository.load_content(storage_path=file_.storage_path)
+                    self.file_repository.load_file_content(
+                        storage_path=file_.storage_path, tag=file_.tag
+                    )
                 )
 
-            def make_loaded_file():
-                return LoadedFile(
-                    stream_=get_stream if lazy else get_stream(file),
-                    **file.model_dump(),
-                )
+            def get_cached_stream(file_):
+                def load():
+                    with get_stream(file_) as stream:
+                        return stream.read()
 
-            # Using getattr with a default value of False - simple one-liner
-            if getattr(self._thread_local, "use_file_cache", False):
-                key = (dataset.dataset_id, current_revision.revision_id, file.file_id)
-                if key not in self._thread_local.file_cache:
-                    self._thread_local.file_cache[key] = make_loaded_file()
-                loaded_file = self._thread_local.file_cache[key]
-            else:
-                loaded_file = make_loaded_file()
+                return file_cache.open((str(file_.storage_path), file_.tag), load)
 
-            files[file.file_id] = loaded_file
+            stream_getter = get_cached_stream if file_cache else get_stream
+            files[file.file_id] = LoadedFile(
+                stream_=stream_getter if lazy else stream_getter(file),
+                **file.model_dump(),
+            )
         return FileCollection(files, auto_rewind=auto_rewind)
 
+    def load_files_many(
+        self,
+        datasets: Iterable[Dataset],
+        data_feed_keys: Optional[List[str]] = None,
+        prefetch: int = 8,
+        max_size: Union[int, str] = "256MB",
+        max_workers: Optional[int] = None,
+    ) -> Iterator[Tuple[Dataset, FileCollection]]:
+        """Yield every dataset with its loaded files, in order, while the files
+        of the next `prefetch` datasets are downloaded and decompressed on a
+        thread pool.
+
+        Prefetching stops while the (uncompressed) size of the prefetched
+        files is over `max_size`, so a few very large datasets don't fill the
+        memory. The files of the dataset being processed don't count."""
+        max_size = parse_size(max_size)
+        datasets = iter(datasets)
+        pending = deque()
+        pending_size = 0
+
+        def dataset_size(dataset: Dataset) -> int:
+            if not dataset.current_revision:
+                return 0
+            return sum(
+                file.size
+                for file in dataset.current_revision.modified_files
+                if not data_feed_keys or file.data_feed_key in data_feed_keys
+            )
+
+        pool = ThreadPoolExecutor(
+            max_workers=max_workers or min(prefetch, get_concurrency()) or 1
+        )
+        try:
+            while True:
+                while len(pending) < max(prefetch, 1) and (
+                    not pending or pending_size < max_size
+                ):
+                    dataset = next(datasets, None)
+                    if dataset is None:
+                        break
+                    size = dataset_size(dataset)
+                    future = pool.submit(
+                        self.load_files, dataset, data_feed_keys=data_feed_keys
+                    )
+                    pending.append((dataset, size, future))
+                    pending_size += size
+
+                if not pending:
+                    break
+
+                dataset, size, future = pending.popleft()
+                pending_size -= size
+                yield dataset, future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def warm_file_cache(
+        self,
+        datasets: Iterable[Dataset],
+        data_feed_keys: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> int:
+        """Download the current files of `datasets` into the file cache
+        (`storage_options.file_cache`), in parallel. Returns the number of
+        files that weren't cached yet."""
+        fill = getattr(self.file_repository, "fill", None)
+        if fill is None:
+            raise ConfigurationError(
+                "No file cache configured. Set `storage_options.file_cache`"
+            )
+
+        def files():
+            for dataset in datasets:
+                if not dataset.current_revision:
+                    continue
+                for file in dataset.current_revision.modified_files:
+                    if data_feed_keys and file.data_feed_key not in data_feed_keys:
+                        continue
+                    yield file
+
+        filled = 0
+        with ThreadPoolExecutor(max_workers=max_workers or get_concurrency()) as pool:
+            for batch in chunker(files(), 1000):
+                filled += sum(
+                    pool.map(lambda file: fill(str(file.storage_path), file.tag), batch)
+                )
+        return filled
+
     def load_with_kloppy(self, dataset: Dataset, **kwargs):
         files = self.load_files(dataset)
         if dataset.provider == "statsbomb":
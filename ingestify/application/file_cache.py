@@ -0,0 +1,109 @@
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable, Hashable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    count: int
+
+
+class _Loading:
+    """A load in progress, waited on by the other threads that miss the
+    same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.content = None
+        self.exception = None
+
+
+class FileCache:
+    """Decompressed file contents, shared by all threads, up to `max_size`
+    bytes. The least recently used contents are evicted first.
+
+    Every `open` returns a new stream over the cached bytes, so consumers
+    don't share a read position. The bytes are shared, not copied.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def open(self, key: Hashable, load: Callable[[], bytes]) -> BytesIO:
+        return BytesIO(self.get(key, load))
+
+    def get(self, key: Hashable, load: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+
+            self.misses += 1
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = _Loading()
+                is_loader = True
+            else:
+                is_loader = False
+
+        if not is_loader:
+            loading.done.wait()
+            if loading.exception is not None:
+                raise loading.exception
+            return loading.content
+
+        try:
+            loading.content = load()
+        except BaseException as e:
+            loading.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+                if loading.exception is None:
+                    self._put(key, loading.content)
+            loading.done.set()
+        return loading.content
+
+    def _put(self, key: Hashable, content: bytes):
+        if len(content) > self.max_size:
+            return
+
+        self._entries[key] = content
+        self._size += len(content)
+        while self._size > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def stats(self) -> FileCacheStats:
+        with self._lock:
+            return FileCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=self._size,
+                count=len(self._entries),
+            )
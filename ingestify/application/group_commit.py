@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
+from typing import Optional
+
+from ingestify.domain.models import Dataset, DatasetRepository
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Write-behind saver that combines the dataset saves of concurrent tasks.
+
+    Saved datasets are queued and written by a single writer thread. A flush
+    happens when `max_items` datasets are queued, or `max_delay` seconds after
+    the first one was queued, whatever comes first. All datasets of a flush are
+    written with one set of multi-row upserts in a single transaction.
+
+    `save` blocks until the flush containing the dataset is committed, so the
+    caller can safely dispatch events afterwards. When a flush fails, the
+    datasets are saved one by one, so a single bad dataset only fails its own
+    task.
+    """
+
+    def __init__(
+        self,
+        dataset_repository: DatasetRepository,
+        bucket: str,
+        max_items: int = 100,
+        max_delay: float = 0.02,
+    ):
+        self.dataset_repository = dataset_repository
+        self.bucket = bucket
+        self.max_items = max_items
+        self.max_delay = max_delay
+
+        self._queue = SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, dataset: Dataset) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ingestify-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((dataset, future))
+        return future
+
+    def save(self, dataset: Dataset):
+        self.submit(dataset).result()
+
+    def close(self):
+        """Flush everything that is queued and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+
+        if thread is not None:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run(self):
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_items:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._flush(batch)
+        finally:
+            self.dataset_repository.release_thread_resources()
+
+    def _flush(self, batch: list[tuple[Dataset, Future]]):
+        # The same dataset can be queued more than once (e.g. a metadata update
+        # followed by a new revision). Write it once, with its latest state.
+        datasets = list({dataset.dataset_id: dataset for dataset, _ in batch}.values())
+
+        try:
+            self.dataset_repository.save_many(bucket=self.bucket, datasets=datasets)
+        except Exception as e:
+            if len(datasets) == 1:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+            logger.warning(
+                f"Group commit of {len(datasets)} datasets failed: {e}. "
+                f"Saving them one by one"
+            )
+            errors = {}
+            for dataset in datasets:
+                try:
+                    self.dataset_repository.save(bucket=self.bucket, dataset=dataset)
+                except Exception as e:
+                    errors[dataset.dataset_id] = e
+
+            for dataset, future in batch:
+                if dataset.dataset_id in errors:
+                    future.set_exception(errors[dataset.dataset_id])
+                else:
+                    future.set_result(None)
+        else:
+            logger.debug(f"Group commit of {len(datasets)} datasets")
+            for _, future in batch:
+                future.set_result(None)
@@ -7,7 +7,7 @@ from typing import Optional, List, Union, Any, Iterator, TypedDict
 from .loader import Loader
 from .dataset_store import DatasetStore
 from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
-from ingestify.domain.models import Dataset
+from ingestify.domain.models import Dataset, DatasetCursor
 from ..domain.models.dataset.events import (
     DatasetSkipped,
     RevisionAdded,
@@ -27,12 +27,12 @@ class AutoIngestConfig(TypedDict, total=False):
 
 
 class IngestionEngine:
-    def __init__(self, store: DatasetStore):
+    def __init__(self, store: DatasetStore, executor_backend: Optional[str] = None):
 
         # Note: disconnect event from loading. Event should only be used for
         #       metadata and 'loaded_files' for the actual data.
         self.store = store
-        self.loader = Loader(self.store)
+        self.loader = Loader(self.store, executor_backend=executor_backend)
 
     def add_ingestion_plan(self, ingestion_plan: IngestionPlan):
         self.loader.add_ingestion_plan(ingestion_plan)
@@ -153,6 +153,20 @@ class IngestionEngine:
             dataset_ids.append(dataset.dataset_id)
         return dataset_ids
 
+    def warm_cache(
+        self,
+        data_feed_keys: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+        **selector,
+    ) -> int:
+        """Download the files of the datasets matching `selector` into the
+        local file cache. Returns the number of files downloaded."""
+        return self.store.warm_file_cache(
+            self.store.iter_dataset_collection_batches(**selector),
+            data_feed_keys=data_feed_keys,
+            max_workers=max_workers,
+        )
+
     def iter_datasets(
         self,
         auto_ingest: Union[bool, AutoIngestConfig] = False,
@@ -162,6 +176,9 @@ class IngestionEngine:
         batch_size: int = 1000,
         yield_dataset_collection: bool = False,
         dataset_state: Optional[Any] = None,
+        after: Optional[Union[str, DatasetCursor]] = None,
+        prefetch: int = 0,
+        data_feed_keys: Optional[List[str]] = None,
         **selector_filters,
     ) -> Iterator[Dataset]:
         """
@@ -184,6 +201,14 @@ class IngestionEngine:
             ):
                 process(dataset)  # Includes newly ingested datasets
 
+            # Load the files of the next 16 datasets while processing one
+            for dataset, files in engine.iter_datasets(
+                provider="statsbomb",
+                prefetch=16,
+                data_feed_keys=["events"]
+            ):
+                process(dataset, files)
+
             # Real-time streaming with open data auto-discovery
             for dataset in engine.iter_datasets(
                 auto_ingest={
@@ -206,17 +231,45 @@ class IngestionEngine:
             batch_size: Number of datasets to fetch per batch for pagination
             yield_dataset_collection: If True, yield DatasetCollection objects instead of individual datasets
             dataset_state: Filter by dataset state (e.g., "COMPLETE", "PARTIAL")
+            after: Resume after this DatasetCursor (or its encoded string). Use
+                   `DatasetCursor.from_dataset(dataset)` for the last processed dataset,
+                   or `collection.metadata.next_cursor` when yielding collections
+            prefetch: When set, yield (dataset, files) pairs, and load the files of
+                      the next `prefetch` datasets on a thread pool while the current
+                      one is processed. See `DatasetStore.load_files_many`
+            data_feed_keys: Only load these files when prefetching
             **selector_filters: Additional selector criteria (competition_id, season_id, match_id, etc.)
 
         Yields:
             Dataset objects matching the specified criteria. If auto_ingest=True,
-            includes both existing datasets and newly ingested ones.
+            includes both existing datasets and newly ingested ones. With
+            `prefetch`, (dataset, files) pairs.
 
         Note:
             Auto-ingestion will only discover datasets that match configured
             IngestionPlans. Requests outside the scope of existing plans will
             not trigger ingestion.
         """
+        if prefetch:
+            if yield_dataset_collection:
+                raise ValueError("Cannot prefetch when yield_dataset_collection")
+
+            yield from self.store.load_files_many(
+                self.iter_datasets(
+                    auto_ingest=auto_ingest,
+                    dataset_type=dataset_type,
+                    provider=provider,
+                    dataset_id=dataset_id,
+                    batch_size=batch_size,
+                    dataset_state=dataset_state,
+                    after=after,
+                    **selector_filters,
+                ),
+                data_feed_keys=data_feed_keys,
+                prefetch=prefetch,
+            )
+            return
+
         # Parse auto_ingest config
         if isinstance(auto_ingest, dict):
             auto_ingest_enabled = auto_ingest.get("enabled", True)
@@ -275,6 +328,7 @@ class IngestionEngine:
             batch_size=batch_size,
             yield_dataset_collection=yield_dataset_collection,
             dataset_state=dataset_state,
+            after=after,
             **selector_filters,
         )
 
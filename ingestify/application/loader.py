@@ -1,13 +1,23 @@
+import asyncio
+import inspect
 import logging
 import platform
 import uuid
 from multiprocessing import set_start_method
 from typing import List, Optional
 
-from ingestify.domain.models import Selector
-from ingestify.utils import TaskExecutor
+from ingestify.domain.models import AsyncSource, Selector
+from ingestify.utils import (
+    TaskExecutor,
+    get_group_commit_delay,
+    get_group_commit_size,
+    get_summary_cache_dir,
+    get_upload_concurrency,
+    get_upload_queue_size,
+)
 
 from .dataset_store import DatasetStore
+from .summary_cache import DatasetSummaryCache
 from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
 from ingestify.domain.models.fetch_policy import FetchPolicy
 from ingestify.domain import DataSpecVersionCollection
@@ -53,8 +63,9 @@ def _create_open_data_plan(provider: str, dataset_type: str) -> Optional[Ingesti
 
 
 class Loader:
-    def __init__(self, store: DatasetStore):
+    def __init__(self, store: DatasetStore, executor_backend: Optional[str] = None):
         self.store = store
+        self.executor_backend = executor_backend
         self.ingestion_plans: List[IngestionPlan] = []
 
     def add_ingestion_plan(self, ingestion_plan: IngestionPlan):
@@ -148,6 +159,9 @@ class Loader:
                     all_selectors = ingestion_plan.source.discover_selectors(
                         ingestion_plan.dataset_type
                     )
+                    if inspect.isawaitable(all_selectors):
+                        # AsyncSource
+                        all_selectors = asyncio.run(all_selectors)
                     if no_selectors:
                         # When there were no selectors specified, just use all of them
                         extra_static_selectors = [
@@ -241,10 +255,12 @@ class Loader:
         """Execute the collected selectors."""
         ingestion_job_prefix = str(uuid.uuid1())
 
-        # Build a cache of lightweight dataset summaries per (provider,
-        # dataset_type). Fed to FetchPolicy.can_skip as a fast pre-check to skip
-        # datasets that are already up-to-date without loading the full graph.
-        summary_cache: dict[tuple, "DatasetSummaryMap"] = {}
+        # Lightweight dataset summaries per (provider, dataset_type, selector).
+        # Fed to FetchPolicy.can_skip as a fast pre-check to skip datasets that
+        # are already up-to-date without loading the full graph.
+        summary_cache = DatasetSummaryCache(
+            self.store, cache_dir=get_summary_cache_dir()
+        )
 
         for ingestion_job_idx, (ingestion_plan, selector) in enumerate(selectors):
             logger.info(
@@ -259,25 +275,37 @@ class Loader:
                 selector=selector,
             )
 
-            # Lazily load the timestamps cache per (provider, dataset_type)
-            cache_key = (
-                ingestion_plan.source.provider,
-                ingestion_plan.dataset_type,
+            # Loaded on first use, refreshed when the selector comes back
+            summary_map = summary_cache.get(
+                provider=ingestion_plan.source.provider,
+                dataset_type=ingestion_plan.dataset_type,
+                selector=selector,
             )
-            if cache_key not in summary_cache:
-                summary_cache[cache_key] = self.store.get_dataset_summary_map(
-                    provider=cache_key[0],
-                    dataset_type=cache_key[1],
-                )
 
             with TaskExecutor(
                 dry_run=dry_run,
                 processes=ingestion_plan.source.max_concurrency,
-            ) as task_executor:
+                # The tasks of an AsyncSource are coroutines
+                backend="asyncio"
+                if isinstance(ingestion_plan.source, AsyncSource)
+                else self.executor_backend,
+            ) as task_executor, self.store.with_compression_executor(
+                task_executor.cpu_executor
+            ), self.store.with_group_commit(
+                # Saves only pile up when tasks run concurrently in this process
+                max_items=get_group_commit_size()
+                if task_executor.runs_concurrently
+                else 0,
+                max_delay=get_group_commit_delay(),
+            ), self.store.with_upload_queue(
+                # Saves revisions through the group commit, so closes first
+                max_workers=get_upload_concurrency(),
+                max_size=get_upload_queue_size(),
+            ):
                 for ingestion_job_summary in ingestion_job.execute(
                     self.store,
                     task_executor=task_executor,
-                    summary_map=summary_cache[cache_key],
+                    summary_map=summary_map,
                 ):
                     # TODO: handle task_summaries
                     #       Summarize to a IngestionJobSummary, and save to a database. This Summary can later be used in a
@@ -288,6 +316,7 @@ class Loader:
                     logger.info(f"Storing IngestionJobSummary")
                     self.store.save_ingestion_job_summary(ingestion_job_summary)
 
+        summary_cache.save()
         logger.info("Done")
 
     def collect_and_run(
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from ingestify.domain.models import Selector
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
+
+from .dataset_store import DatasetStore
+
+logger = logging.getLogger(__name__)
+
+# Rows are written with the clock of the writing process, and a transaction
+# may commit after a newer one. Re-read this much before the watermark.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+class DatasetSummaryCache:
+    """Summary maps of a run, one per (provider, dataset_type, selector).
+
+    The first `get` loads the map of the datasets matching the selector. Later
+    calls only read the datasets updated since the previous load, so a map
+    stays current during a long run. When `cache_dir` is set, the maps are
+    written there by `save` and the next run starts with them.
+
+    A refreshed map is checked against the number of datasets in the store.
+    Deleted datasets are not seen by a refresh, so on a mismatch the map is
+    loaded again in full.
+    """
+
+    def __init__(self, store: DatasetStore, cache_dir: Optional[Path] = None):
+        self.store = store
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._maps: dict[tuple, DatasetSummaryMap] = {}
+
+    def _path(self, key: tuple) -> Path:
+        name = hashlib.sha1(json.dumps([self.store.bucket, *key]).encode()).hexdigest()
+        return self.cache_dir / f"summary_map_{name}.bin"
+
+    def get(
+        self, provider: str, dataset_type: str, selector: Optional[Selector] = None
+    ) -> DatasetSummaryMap:
+        # A selector without filtered attributes (e.g. a dynamic one) selects
+        # all datasets of the provider and dataset_type
+        selector = selector if selector else None
+        key = (provider, dataset_type, selector.key if selector else None)
+
+        summary_map = self._maps.get(key)
+        if summary_map is None and self.cache_dir:
+            summary_map = DatasetSummaryMap.load(self._path(key))
+
+        if summary_map is not None and summary_map.watermark is not None:
+            summary_map = self.store.get_dataset_summary_map(
+                provider=provider,
+                dataset_type=dataset_type,
+                selector=selector,
+                updated_since=summary_map.watermark - REFRESH_OVERLAP,
+                summary_map=summary_map,
+            )
+            count = self.store.count_datasets(
+                provider=provider, dataset_type=dataset_type, selector=selector
+            )
+            if count is not None and count != len(summary_map):
+                logger.info(
+                    f"Summary map of {provider}/{dataset_type} holds "
+                    f"{len(summary_map)} datasets, the store {count}. Reloading."
+                )
+                summary_map = None
+        else:
+            summary_map = None
+
+        if summary_map is None:
+            summary_map = self.store.get_dataset_summary_map(
+                provider=provider, dataset_type=dataset_type, selector=selector
+            )
+
+        self._maps[key] = summary_map
+        return summary_map
+
+    def save(self):
+        """Write the maps to `cache_dir`, when set"""
+        if not self.cache_dir:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for key, summary_map in self._maps.items():
+            try:
+                summary_map.save(self._path(key))
+            except OSError as e:
+                logger.warning(f"Could not write the summary map cache: {e}")
@@ -0,0 +1,130 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UploadQueue:
+    """Uploads files on a pool of threads, so tasks don't wait for the file
+    store.
+
+    `submit` blocks while the streams waiting to be uploaded are over
+    `max_size` bytes, which bounds the memory (or temporary files) held by
+    the queue. `when_done` runs a callback, like saving the revision the
+    files belong to, once all its uploads succeeded. When an upload fails the
+    callback doesn't run: the revision isn't saved, and the failure is
+    reported on the next `flush`.
+    """
+
+    def __init__(self, max_workers: int, max_size: int):
+        self.max_size = max_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="upload"
+        )
+        self._condition = threading.Condition()
+        self._size = 0
+        self._pending_callbacks = 0
+        # Per key, signalled when its callback ran (or was dropped)
+        self._keys: Dict[Any, threading.Event] = {}
+        # `after` and `on_failure` callbacks to run on flush
+        self._finished: List[Callable[[], None]] = []
+        self.failed = 0
+
+    def submit(self, upload: Callable[[], Any], size: int) -> Future:
+        with self._condition:
+            # A stream larger than the budget still goes when the queue is empty
+            self._condition.wait_for(
+                lambda: not self._size or self._size + size <= self.max_size
+            )
+            self._size += size
+
+        future = self._executor.submit(upload)
+        future.add_done_callback(lambda _: self._release(size))
+        return future
+
+    def _release(self, size: int):
+        with self._condition:
+            self._size -= size
+            self._condition.notify_all()
+
+    def when_done(
+        self,
+        uploads: List[Future],
+        callback: Callable[[], None],
+        key,
+        after: Optional[Callable[[], None]] = None,
+        on_failure: Optional[Callable[[Exception], None]] = None,
+    ):
+        """Run `callback` on an upload thread once all `uploads` succeeded.
+        Use `wait` with the same `key` to wait for it.
+
+        `after` (when it succeeded) or `on_failure` (when an upload or the
+        callback failed) run on the thread that calls `flush`, in the order
+        the callbacks finished."""
+        done = threading.Event()
+        remaining = [len(uploads)]
+        with self._condition:
+            self._pending_callbacks += 1
+            self._keys[key] = done
+
+        def on_upload_done(_):
+            with self._condition:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            error = None
+            try:
+                errors = [
+                    upload.exception() for upload in uploads if upload.exception()
+                ]
+                if errors:
+                    raise errors[0]
+                callback()
+            except Exception as e:
+                logger.exception(f"Failed to upload the files of {key}")
+                error = e
+            finally:
+                with self._condition:
+                    if error is not None:
+                        self.failed += 1
+                        if on_failure:
+                            self._finished.append(partial(on_failure, error))
+                    elif after:
+                        self._finished.append(after)
+                    self._pending_callbacks -= 1
+                    if self._keys.get(key) is done:
+                        del self._keys[key]
+                    self._condition.notify_all()
+                done.set()
+
+        for upload in uploads:
+            upload.add_done_callback(on_upload_done)
+
+    def wait(self, key):
+        """Wait until the callback for `key` (if any) ran"""
+        with self._condition:
+            done = self._keys.get(key)
+        if done is not None:
+            done.wait()
+
+    def flush(self):
+        """Wait until the callbacks of all queued uploads ran, and run their
+        `after` or `on_failure` callbacks on this thread"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._pending_callbacks)
+            finished, self._finished = self._finished, []
+        for fn in finished:
+            fn()
+
+    def close(self):
+        """Wait for all uploads and their callbacks"""
+        self.flush()
+        self._executor.shutdown(wait=True)
+        if self.failed:
+            logger.error(
+                f"{self.failed} revisions were not saved because an upload "
+                f"failed. They will be fetched again on the next run"
+            )
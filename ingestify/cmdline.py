@@ -225,6 +225,73 @@ def delete_dataset(
     logger.info("Done")
 
 
+@cli.command("warm-cache")
+@click.option(
+    "--config",
+    "config_file",
+    required=False,
+    help="Yaml config file",
+    type=click.Path(exists=True),
+    default=get_default_config,
+)
+@click.option(
+    "--bucket",
+    "bucket",
+    required=False,
+    help="bucket",
+    type=str,
+)
+@click.option(
+    "--data-feed-key",
+    "data_feed_keys",
+    required=False,
+    help="Only download files with this data_feed_key (can be repeated)",
+    type=str,
+    multiple=True,
+)
+@click.option(
+    "--concurrency",
+    "concurrency",
+    required=False,
+    help="Number of parallel downloads",
+    type=int,
+)
+@click.option("--debug", "debug", required=False, help="Debugging enabled", type=bool)
+@click.argument("selector", required=False)
+def warm_cache(
+    config_file: str,
+    bucket: Optional[str],
+    data_feed_keys: tuple,
+    concurrency: Optional[int],
+    debug: Optional[bool],
+    selector: Optional[str],
+):
+    """Download the files of the datasets matching SELECTOR (e.g.
+    provider=statsbomb/dataset_type=match/competition_id=11) into the local
+    file cache."""
+    try:
+        engine = get_engine(config_file, bucket)
+        filled = engine.warm_cache(
+            data_feed_keys=list(data_feed_keys) or None,
+            max_workers=concurrency,
+            **{
+                key: try_number(value)
+                for key, value in [
+                    _.split("=") for _ in (selector or "").split("/") if _
+                ]
+            },
+        )
+    except ConfigurationError as e:
+        if debug:
+            raise
+        else:
+            logger.exception(f"Failed due a configuration error: {e}")
+            sys.exit(1)
+
+    logger.info(f"Downloaded {filled} files")
+    logger.info("Done")
+
+
 #
 # @cli.command("list")
 # @click.option(
@@ -268,9 +335,11 @@ def delete_dataset(
     type=str,
 )
 def sync_indexes(config_file: str, bucket: Optional[str]):
-    """Create identifier expression indexes for dataset types with identifier_index: true.
+    """Create identifier expression indexes for dataset types with identifier_index: true,
+    and table indexes missing on stores created by an older version.
 
-    Safe to run multiple times (uses IF NOT EXISTS). Only affects PostgreSQL.
+    Safe to run multiple times. Identifier indexes are expression indexes on PostgreSQL
+    and SQLite, and indexes on generated columns on MySQL.
     Run this explicitly after initial setup or after adding new indexed dataset types —
     never runs automatically to avoid locking large tables unexpectedly.
     """
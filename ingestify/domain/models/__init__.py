@@ -1,6 +1,7 @@
 from .dataset import (
     Dataset,
     DatasetCollection,
+    DatasetCursor,
     DatasetRepository,
     DatasetCreated,
     DraftFile,
@@ -14,7 +15,7 @@ from .dataset import (
 )
 from .dataset.dataset_state import DatasetState
 from .sink import Sink
-from .source import Source
+from .source import Source, AsyncSource
 from .task import Task, TaskSet
 from .data_spec_version_collection import DataSpecVersionCollection
 from .resources import DatasetResource
@@ -23,9 +24,11 @@ __all__ = [
     "Selector",
     "Identifier",
     "Source",
+    "AsyncSource",
     "Revision",
     "Dataset",
     "DatasetCollection",
+    "DatasetCursor",
     "DatasetResource",
     "File",
     "DraftFile",
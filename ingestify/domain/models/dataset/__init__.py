@@ -1,5 +1,6 @@
 from .file import DraftFile, File, LoadedFile
 from .collection import DatasetCollection
+from .cursor import DatasetCursor
 from .dataset import Dataset
 from .dataset_repository import DatasetRepository
 from .file_repository import FileRepository
@@ -15,6 +16,7 @@ __all__ = [
     "Dataset",
     "Identifier",
     "DatasetCollection",
+    "DatasetCursor",
     "DatasetCreated",
     "File",
     "DraftFile",
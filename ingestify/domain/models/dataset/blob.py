@@ -0,0 +1,17 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from ingestify.domain.models.base import BaseModel
+
+
+class Blob(BaseModel):
+    """A stored file in the content-addressed layout, shared by every File
+    with the same content."""
+
+    # sha1 of the content
+    content_hash: str
+    storage_path: Path
+    storage_size: int
+    storage_compression_method: Optional[str]
+    created_at: datetime
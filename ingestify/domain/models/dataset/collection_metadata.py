@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+from .cursor import DatasetCursor
+
 
 @dataclass
 class DatasetCollectionMetadata:
@@ -14,3 +16,6 @@ class DatasetCollectionMetadata:
 
     # Not really used
     row_count: Optional[int] = None
+
+    # Set when the page is full: pass it as `after` to get the next page
+    next_cursor: Optional[DatasetCursor] = None
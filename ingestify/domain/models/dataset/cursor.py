@@ -0,0 +1,37 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class DatasetCursor:
+    """Position in the (created_at, dataset_id) ordering of datasets.
+
+    Used for keyset pagination: the next page starts right after the dataset
+    the cursor points to. `encode` turns it into an opaque string that can be
+    stored to resume an iteration later."""
+
+    created_at: datetime
+    dataset_id: str
+
+    @classmethod
+    def from_dataset(cls, dataset) -> "DatasetCursor":
+        return cls(created_at=dataset.created_at, dataset_id=dataset.dataset_id)
+
+    def encode(self) -> str:
+        value = json.dumps([self.created_at.isoformat(), self.dataset_id])
+        return base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, value: str) -> "DatasetCursor":
+        try:
+            created_at, dataset_id = json.loads(base64.urlsafe_b64decode(value))
+            return cls(
+                created_at=datetime.fromisoformat(created_at), dataset_id=dataset_id
+            )
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid dataset cursor: {value!r}") from e
+
+    def __str__(self):
+        return self.encode()
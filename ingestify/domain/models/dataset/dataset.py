@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from typing import List, Optional, Dict
-from pydantic import Field, field_validator
+from pydantic import Field, PrivateAttr, field_validator
 
 from ingestify.utils import utcnow
 from .dataset_state import DatasetState
@@ -27,10 +27,6 @@ class DatasetSummary:
     has_revisions: bool
 
 
-# Keyed by Identifier.key (the JSON identifier).
-DatasetSummaryMap = dict[str, DatasetSummary]
-
-
 class Dataset(BaseModel):
     bucket: str  # This must be set by the DatasetRepository
     dataset_id: str
@@ -47,6 +43,12 @@ class Dataset(BaseModel):
     # The last_modified_at is equal to the max modified_at of all files in all revisions
     last_modified_at: Optional[datetime]
 
+    # Revisions that are stored by the DatasetRepository. Revisions (and their
+    # files) are immutable, so a save only has to write the ones not in here.
+    _saved_revision_ids: set[int] = PrivateAttr(default_factory=set)
+    # Squashing is expensive for a long history. Reset when revisions change.
+    _current_revision: Optional[Revision] = PrivateAttr(default=None)
+
     @field_validator("identifier", mode="before")
     @classmethod
     def parse_identifier(cls, value):
@@ -59,10 +61,15 @@ class Dataset(BaseModel):
         return self.state.is_complete
 
     def next_revision_id(self) -> int:
-        return len(self.revisions)
+        # Don't use len(): a dataset loaded with only its current (squashed)
+        # revision doesn't hold the full history
+        if not self.revisions:
+            return 0
+        return self.revisions[-1].revision_id + 1
 
     def add_revision(self, revision: Revision):
         self.revisions.append(revision)
+        self._current_revision = None
         self.updated_at = utcnow()
 
         if self.last_modified_at:
@@ -72,6 +79,24 @@ class Dataset(BaseModel):
         else:
             self.last_modified_at = revision.last_modified_at
 
+    @property
+    def unsaved_revisions(self) -> List[Revision]:
+        return [
+            revision
+            for revision in self.revisions
+            if revision.revision_id not in self._saved_revision_ids
+        ]
+
+    def mark_saved(self):
+        """Called by the DatasetRepository once all revisions are stored."""
+        self._saved_revision_ids = {revision.revision_id for revision in self.revisions}
+
+    def set_revision_state(self, state: RevisionState):
+        """Set the state of all revisions, e.g. when they are invalidated."""
+        for revision in self.revisions:
+            revision.state = state
+        self._current_revision = None
+
     def update_last_modified(self, files: Dict[str, DraftFile]):
         """Update the last modified, even tho there was no new revision. Some Sources
         may report a Dataset is changed, even when there are no changed files.
@@ -86,6 +111,9 @@ class Dataset(BaseModel):
                 # Update, and continue looking for others
                 self.last_modified_at = file.modified_at
                 changed = True
+        if changed:
+            # Picked up by incremental refreshes of summary maps
+            self.updated_at = utcnow()
         return changed
 
     def update_metadata(self, name: str, metadata: dict, state: DatasetState) -> bool:
@@ -112,45 +140,56 @@ class Dataset(BaseModel):
         """
         When multiple versions are available, squash versions into one single version which
         contents all most recent files.
+
+        The squashed revision is cached until a revision is added, or the state of
+        the revisions is changed with `set_revision_state`.
         """
         if not self.revisions:
             return None
         elif len(self.revisions) == 1:
             return self.revisions[0]
-        else:
-            files = {}
-
-            for revision in self.revisions:
-                for file_id, file in revision.modified_files_map.items():
-                    if isinstance(file, DraftFile):
-                        raise Exception(
-                            f"Cannot squash draft file. Revision: {revision}. FileId: {file_id}"
-                        )
-                    files[file_id] = file
-                    files[file_id].revision_id = revision.revision_id
-
-            # Derive the squashed state from the revisions that actually
-            # contribute the current files: if any current file still comes from
-            # a VALIDATION_FAILED revision, the squashed dataset holds invalid
-            # data and must report VALIDATION_FAILED (so it gets refetched).
-            revision_state = {r.revision_id: r.state for r in self.revisions}
-            contributing_revision_ids = {file.revision_id for file in files.values()}
-            squashed_state = (
-                RevisionState.VALIDATION_FAILED
-                if any(
-                    revision_state[revision_id] == RevisionState.VALIDATION_FAILED
-                    for revision_id in contributing_revision_ids
-                )
-                else self.revisions[-1].state
-            )
 
-            return Revision(
-                revision_id=self.revisions[-1].revision_id,
-                created_at=self.revisions[-1].created_at,
-                # created_at=max([file.modified_at for file in files.values()]),
-                description="Squashed revision",
-                is_squashed=True,
-                state=squashed_state,
-                modified_files=list(files.values()),
-                source=RevisionSource(source_type=SourceType.SQUASHED, source_id=""),
+        cached = self._current_revision
+        if cached is not None and cached.revision_id == self.revisions[-1].revision_id:
+            return cached
+
+        self._current_revision = self._squash_revisions()
+        return self._current_revision
+
+    def _squash_revisions(self) -> Revision:
+        files = {}
+
+        for revision in self.revisions:
+            for file_id, file in revision.modified_files_map.items():
+                if isinstance(file, DraftFile):
+                    raise Exception(
+                        f"Cannot squash draft file. Revision: {revision}. FileId: {file_id}"
+                    )
+                files[file_id] = file
+                files[file_id].revision_id = revision.revision_id
+
+        # Derive the squashed state from the revisions that actually
+        # contribute the current files: if any current file still comes from
+        # a VALIDATION_FAILED revision, the squashed dataset holds invalid
+        # data and must report VALIDATION_FAILED (so it gets refetched).
+        revision_state = {r.revision_id: r.state for r in self.revisions}
+        contributing_revision_ids = {file.revision_id for file in files.values()}
+        squashed_state = (
+            RevisionState.VALIDATION_FAILED
+            if any(
+                revision_state[revision_id] == RevisionState.VALIDATION_FAILED
+                for revision_id in contributing_revision_ids
             )
+            else self.revisions[-1].state
+        )
+
+        return Revision(
+            revision_id=self.revisions[-1].revision_id,
+            created_at=self.revisions[-1].created_at,
+            # created_at=max([file.modified_at for file in files.values()]),
+            description="Squashed revision",
+            is_squashed=True,
+            state=squashed_state,
+            modified_files=list(files.values()),
+            source=RevisionSource(source_type=SourceType.SQUASHED, source_id=""),
+        )
@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional, List, Union
+from typing import Dict, Optional, List, Union
 
+from .blob import Blob
 from .collection import DatasetCollection
-from .dataset import Dataset, DatasetSummaryMap
+from .cursor import DatasetCursor
+from .dataset import Dataset
+from .summary_map import DatasetSummaryMap
 from .dataset_state import DatasetState
+from .identifier import Identifier
 from .selector import Selector
 
 
@@ -28,6 +32,16 @@ class DatasetRepository(ABC):
         always-granted no-op lock, so a lone local process is never blocked."""
         return NoopRunLock()
 
+    def create_table_indexes(self):
+        """Create indexes that were added to the schema after the tables were
+        created. Stores without indexes don't need to do anything."""
+        pass
+
+    def release_thread_resources(self):
+        """Release resources (e.g. a database session) held on behalf of the
+        calling thread. Called by short-lived worker threads before they exit."""
+        pass
+
     @abstractmethod
     def get_dataset_collection(
         self,
@@ -40,7 +54,14 @@ class DatasetRepository(ABC):
         dataset_state: Optional[List[DatasetState]] = None,
         page: Optional[int] = None,
         page_size: Optional[int] = None,
+        after: Optional[DatasetCursor] = None,
+        revisions: str = "all",
+        identifiers: Optional[List[Identifier]] = None,
     ) -> DatasetCollection:
+        """With `revisions="current"` every dataset gets a single (squashed)
+        revision holding the newest version of each file, instead of the full
+        revision history. `identifiers` selects datasets by their exact
+        identifier."""
         pass
 
     def get_dataset_summary_map(
@@ -48,13 +69,42 @@ class DatasetRepository(ABC):
         bucket: str,
         provider: str,
         dataset_type: str,
+        selector: Optional[Selector] = None,
+        updated_since: Optional[datetime] = None,
+        summary_map: Optional[DatasetSummaryMap] = None,
     ) -> DatasetSummaryMap:
-        """Return {identifier_json: DatasetSummary} for all datasets matching the
+        """Return {Identifier.key: DatasetSummary} for all datasets matching the
         given provider and dataset_type. Feeds FetchPolicy.can_skip as a cheap
         pre-check, so an up-to-date dataset is skipped without loading the full
-        dataset+revision+file graph. Each summary reflects the latest revision."""
+        dataset+revision+file graph. Each summary reflects the latest revision.
+
+        `selector` limits the map to the datasets of one selector.
+        `updated_since` only reads the datasets updated since then, and adds
+        them to `summary_map` when given (an incremental refresh)."""
+        return summary_map if summary_map is not None else DatasetSummaryMap()
+
+    def count_datasets(
+        self,
+        bucket: str,
+        provider: str,
+        dataset_type: str,
+        selector: Optional[Selector] = None,
+    ) -> Optional[int]:
+        """Number of datasets matching the arguments, or None when the
+        repository can't count them cheaply."""
+        return None
+
+    def get_blobs(self, bucket: str, content_hashes: List[str]) -> Dict[str, Blob]:
+        """Return the stored blobs of the content-addressed file layout, by
+        content hash. Repositories without a blob index return nothing, so
+        every file is uploaded."""
         return {}
 
+    def save_blobs(self, bucket: str, blobs: List[Blob]):
+        """Record uploaded blobs. The first blob stored for a content hash is
+        kept."""
+        pass
+
     def invalidate_revision(self, dataset: Dataset):
         """Mark the current revision as VALIDATION_FAILED and reset
         last_modified_at on the dataset."""
@@ -74,6 +124,12 @@ class DatasetRepository(ABC):
     def save(self, bucket: str, dataset: Dataset):
         pass
 
+    def save_many(self, bucket: str, datasets: list[Dataset]):
+        """Save multiple datasets. Repositories that can write them in a single
+        transaction should override this."""
+        for dataset in datasets:
+            self.save(bucket=bucket, dataset=dataset)
+
     @abstractmethod
     def next_identity(self):
         pass
@@ -1,7 +1,7 @@
 from datetime import datetime
 from pathlib import Path
 from typing import BinaryIO, Optional, Union, Callable, Awaitable
-from io import BytesIO, StringIO
+from io import BytesIO, IOBase, StringIO
 import hashlib
 
 from pydantic import field_validator
@@ -140,6 +140,8 @@ class LoadedFile(BaseModel):
         BinaryIO,
         BytesIO,
         BufferedStream,
+        # Streaming views (see DatasetStore.load_files)
+        IOBase,
         Callable[[], Awaitable[Union[BinaryIO, BytesIO, BufferedStream]]],
     ]
     revision_id: Optional[int] = None  # This can be used when a Revision is squashed
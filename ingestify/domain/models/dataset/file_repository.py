@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 
 from .dataset import Dataset
 from ...services.identifier_key_transformer import IdentifierTransformer
@@ -43,6 +43,11 @@ class FileRepository(ABC):
     ) -> Path:
         pass
 
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        """Write `stream` to `storage_path`, relative to the base of the
+        repository. For files that don't belong to a dataset revision."""
+        raise NotImplementedError
+
     def get_read_path(self, storage_path: str) -> Path:
         return self.base_dir / storage_path
 
@@ -50,6 +55,13 @@ class FileRepository(ABC):
     def load_content(self, storage_path: str) -> BinaryIO:
         pass
 
+    def load_file_content(
+        self, storage_path: str, tag: Optional[str] = None
+    ) -> BinaryIO:
+        """Load the content of a stored file. `tag` identifies the version of
+        the content, for repositories that cache it."""
+        return self.load_content(storage_path)
+
     @classmethod
     @abstractmethod
     def supports(cls, url: str) -> bool:
@@ -2,6 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Optional
 
+from pydantic import PrivateAttr
 from typing_extensions import TypedDict
 
 from .file import File
@@ -36,6 +37,21 @@ class Revision(BaseModel):
     is_squashed: bool = False
     state: RevisionState = RevisionState.PENDING_VALIDATION
 
+    # Cache of modified_files_map. Reset when modified_files is assigned; the
+    # list itself is not changed in place
+    _modified_files_map: Optional[Dict[str, File]] = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "modified_files":
+            self._modified_files_map = None
+
+    def model_copy(self, *, update=None, deep: bool = False):
+        copy = super().model_copy(update=update, deep=deep)
+        if update and "modified_files" in update:
+            copy._modified_files_map = None
+        return copy
+
     @property
     def last_modified_at(self):
         if self.modified_files:
@@ -44,7 +60,11 @@ class Revision(BaseModel):
 
     @property
     def modified_files_map(self) -> Dict[str, File]:
-        return {file.file_id: file for file in self.modified_files}
+        if self._modified_files_map is None:
+            self._modified_files_map = {
+                file.file_id: file for file in self.modified_files
+            }
+        return self._modified_files_map
 
     def is_changed(
         self, files: Dict[str, datetime], dataset_last_modified_at: datetime
@@ -0,0 +1,247 @@
+import hashlib
+import json
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from .dataset import DatasetSummary
+from .revision import RevisionState
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# Stored for a missing timestamp
+_NO_TIMESTAMP = -(2**63)
+
+_STATES = list(RevisionState)
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+# Stored for a missing state
+_NO_STATE = 255
+
+_MIN_SLOTS = 16
+
+# Bump when the layout of the cache file changes
+_FILE_VERSION = 1
+
+
+def hash_key(key: str) -> int:
+    """Stable 64-bit hash of an Identifier.key"""
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(),
+        "little",
+        signed=True,
+    )
+
+
+def _to_timestamp(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NO_TIMESTAMP
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_timestamp(value: int) -> Optional[datetime]:
+    if value == _NO_TIMESTAMP:
+        return None
+    seconds, microseconds = divmod(value, 1_000_000)
+    return _EPOCH + timedelta(0, seconds, microseconds)
+
+
+class DatasetSummaryMap:
+    """{Identifier.key: DatasetSummary} for all datasets of a provider and
+    dataset_type, stored in flat arrays instead of a dict of objects.
+
+    A run keeps one map per (provider, dataset_type) in memory, for stores with
+    millions of datasets. Per dataset this stores the 64-bit hash of the key,
+    both timestamps as microseconds since epoch, the state as a one byte code
+    and a has_revisions flag. An open addressing table (linear probing) maps
+    the hashes to rows. That is about 40 bytes per dataset, where the dict takes
+    several hundreds. `get` creates the DatasetSummary when it's asked for.
+
+    The keys themselves are not kept. Two keys with the same 64-bit hash share
+    a row: for 3M datasets the chance that this happens at all is about 1 in
+    4 million.
+
+    `watermark` is the newest updated_at of the datasets that were added. A
+    refresh only has to read the datasets updated since then.
+    """
+
+    def __init__(self):
+        self._hashes = array("q")
+        self._last_modified = array("q")
+        self._current_created_at = array("q")
+        self._states = array("B")
+        self._has_revisions = array("B")
+        # Row number + 1 for every slot, 0 for an empty one
+        self._slots = array("i", bytes(4 * _MIN_SLOTS))
+        self._mask = _MIN_SLOTS - 1
+        self.watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(hash_key(key)) is not None
+
+    def __setitem__(self, key: str, summary: DatasetSummary):
+        self.add(
+            key,
+            last_modified=summary.last_modified,
+            current_created_at=summary.current_created_at,
+            current_state=summary.current_state,
+            has_revisions=summary.has_revisions,
+        )
+
+    def __getitem__(self, key: str) -> DatasetSummary:
+        summary = self.get(key)
+        if summary is None:
+            raise KeyError(key)
+        return summary
+
+    def get(
+        self, key: str, default: Optional[DatasetSummary] = None
+    ) -> Optional[DatasetSummary]:
+        row = self._find(hash_key(key))
+        if row is None:
+            return default
+
+        state = self._states[row]
+        # Positional arguments: this is called for every discovered dataset
+        return DatasetSummary(
+            _from_timestamp(self._last_modified[row]),
+            _from_timestamp(self._current_created_at[row]),
+            None if state == _NO_STATE else _STATES[state],
+            bool(self._has_revisions[row]),
+        )
+
+    def add(
+        self,
+        key: str,
+        last_modified: Optional[datetime],
+        current_created_at: Optional[datetime],
+        current_state: Optional[RevisionState],
+        has_revisions: bool,
+        updated_at: Optional[datetime] = None,
+    ):
+        """Add the summary of a dataset, or replace it when the key exists."""
+        if updated_at is not None and (
+            self.watermark is None or updated_at > self.watermark
+        ):
+            self.watermark = updated_at
+
+        key_hash = hash_key(key)
+        values = (
+            _to_timestamp(last_modified),
+            _to_timestamp(current_created_at),
+            _NO_STATE if current_state is None else _STATE_CODES[current_state],
+            1 if has_revisions else 0,
+        )
+
+        slots, hashes, mask = self._slots, self._hashes, self._mask
+        slot = key_hash & mask
+        while True:
+            row = slots[slot]
+            if row == 0:
+                break
+            if hashes[row - 1] == key_hash:
+                (
+                    self._last_modified[row - 1],
+                    self._current_created_at[row - 1],
+                    self._states[row - 1],
+                    self._has_revisions[row - 1],
+                ) = values
+                return
+            slot = (slot + 1) & mask
+
+        hashes.append(key_hash)
+        self._last_modified.append(values[0])
+        self._current_created_at.append(values[1])
+        self._states.append(values[2])
+        self._has_revisions.append(values[3])
+        slots[slot] = len(hashes)
+
+        if 2 * len(hashes) > len(slots):
+            # Keep the load factor below 0.5
+            self._resize(2 * len(slots))
+
+    def _find(self, key_hash: int) -> Optional[int]:
+        slots, hashes, mask = self._slots, self._hashes, self._mask
+        slot = key_hash & mask
+        while True:
+            row = slots[slot]
+            if row == 0:
+                return None
+            if hashes[row - 1] == key_hash:
+                return row - 1
+            slot = (slot + 1) & mask
+
+    def _resize(self, size: int):
+        slots = array("i", bytes(4 * size))
+        mask = size - 1
+        for row, key_hash in enumerate(self._hashes, start=1):
+            slot = key_hash & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = row
+        self._slots, self._mask = slots, mask
+
+    def _arrays(self) -> list[array]:
+        return [
+            self._hashes,
+            self._last_modified,
+            self._current_created_at,
+            self._states,
+            self._has_revisions,
+            self._slots,
+        ]
+
+    def save(self, path: Path):
+        """Write the map to a file, to start the next run with it"""
+        header = {
+            "version": _FILE_VERSION,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "sizes": [len(values) for values in self._arrays()],
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fp:
+            fp.write(json.dumps(header).encode("utf-8") + b"\n")
+            for values in self._arrays():
+                values.tofile(fp)
+        # Never leave a partly written file behind
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["DatasetSummaryMap"]:
+        """Read a map written by `save`. Returns None when the file is missing,
+        incomplete or written by another version."""
+        try:
+            with open(path, "rb") as fp:
+                header = json.loads(fp.readline())
+                if header.get("version") != _FILE_VERSION:
+                    return None
+
+                summary_map = cls()
+                arrays = [array(values.typecode) for values in summary_map._arrays()]
+                for values, size in zip(arrays, header["sizes"]):
+                    values.fromfile(fp, size)
+        except (OSError, EOFError, ValueError, KeyError):
+            return None
+
+        (
+            summary_map._hashes,
+            summary_map._last_modified,
+            summary_map._current_created_at,
+            summary_map._states,
+            summary_map._has_revisions,
+            summary_map._slots,
+        ) = arrays
+        summary_map._mask = len(summary_map._slots) - 1
+        if header["watermark"]:
+            summary_map.watermark = datetime.fromisoformat(header["watermark"])
+        return summary_map
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays"""
+        return sum(values.itemsize * len(values) for values in self._arrays())
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from typing import List, Optional, Sequence
 
 from ingestify.domain import Dataset, Identifier, DatasetResource
 from ingestify.domain.models.dataset.dataset import DatasetSummary
@@ -36,6 +37,24 @@ class FetchPolicy:
         )
         return summary.last_modified >= max_file_modified
 
+    def can_skip_many(
+        self,
+        summaries: Sequence[Optional[DatasetSummary]],
+        dataset_resources: Sequence[DatasetResource],
+    ) -> List[bool]:
+        """Batch version of ``can_skip``: one flag per dataset resource. A
+        summary is None when the dataset doesn't exist yet, which is never
+        skipped.
+
+        The engine calls this once per discovered batch. Policies that only
+        override ``can_skip`` keep working: it's called for every resource with
+        a summary.
+        """
+        return [
+            summary is not None and self.can_skip(summary, dataset_resource)
+            for summary, dataset_resource in zip(summaries, dataset_resources)
+        ]
+
     def should_refetch(
         self, dataset: Dataset, dataset_resource: DatasetResource
     ) -> bool:
@@ -64,3 +83,17 @@ class FetchPolicy:
             #         return True
 
         return False
+
+    def should_refetch_many(
+        self,
+        datasets: Sequence[Dataset],
+        dataset_resources: Sequence[DatasetResource],
+    ) -> List[bool]:
+        """Batch version of ``should_refetch``: one flag per existing dataset.
+        Override it to decide for a whole batch at once (e.g. with one lookup
+        in an external system). By default ``should_refetch`` is called for
+        every dataset."""
+        return [
+            self.should_refetch(dataset, dataset_resource)
+            for dataset, dataset_resource in zip(datasets, dataset_resources)
+        ]
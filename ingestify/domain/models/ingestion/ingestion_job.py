@@ -1,16 +1,30 @@
+import asyncio
+import functools
 import inspect
 import itertools
 import json
 import logging
+import threading
 import uuid
+from collections import Counter
+from queue import SimpleQueue
+from contextlib import closing
 from enum import Enum
-from typing import Optional, Iterator, Union
+from typing import Optional, Iterator, Union, List
 
 from pydantic import ValidationError
 
-from ingestify import retrieve_http
+from ingestify import retrieve_http, retrieve_http_async
 from ingestify.application.dataset_store import DatasetStore
-from ingestify.domain import Selector, Identifier, TaskSet, Dataset, DraftFile, Task
+from ingestify.domain import (
+    Selector,
+    Identifier,
+    TaskSet,
+    Dataset,
+    DraftFile,
+    File,
+    Task,
+)
 from ingestify.domain.models.dataset.file import NotModifiedFile
 from ingestify.domain.models.dataset.revision import RevisionSource, SourceType
 from ingestify.domain.models.ingestion.ingestion_job_summary import (
@@ -19,14 +33,22 @@ from ingestify.domain.models.ingestion.ingestion_job_summary import (
 )
 from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
 from ingestify.domain.models.dataset.events import SelectorSkipped, DatasetSkipped
+from ingestify.domain.models.event import EventBus
 from ingestify.domain.models.resources.dataset_resource import (
     FileResource,
     DatasetResource,
 )
-from ingestify.domain.models.dataset.dataset import DatasetSummaryMap
-from ingestify.domain.models.task.task_summary import TaskSummary, Operation
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
+from ingestify.domain.models.task.task_summary import TaskSummary, Operation, TaskState
 from ingestify.exceptions import SaveError, IngestifyError, StopProcessing, FatalError
-from ingestify.utils import TaskExecutor, chunker
+from ingestify.utils import (
+    TaskExecutor,
+    HasTiming,
+    chunker,
+    iter_async,
+    get_pipeline_depth,
+    pipelined,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +61,29 @@ def run_task(task):
     return task.run()
 
 
+async def run_task_async(task):
+    logger.info(f"Running task {task}")
+    return await task.run_async()
+
+
+def run_task_in_process(task):
+    """Run a task in a worker process.
+
+    The store is unpickled without its EventBus. Collect the events the task
+    dispatches and return them, so the parent process can dispatch them."""
+    events = SimpleQueue()
+    event_bus = EventBus()
+    event_bus.register_queue(events)
+    task.store.set_event_bus(event_bus)
+
+    task_summary = run_task(task)
+
+    dispatched = []
+    while not events.empty():
+        dispatched.append(events.get())
+    return task_summary, dispatched
+
+
 def to_batches(input_):
     if isinstance(input_, list):
         batches = iter(input_)
@@ -59,16 +104,46 @@ def to_batches(input_):
     return batches
 
 
+def _get_current_file(
+    file_resource: FileResource, dataset: Optional[Dataset]
+) -> Optional[File]:
+    if dataset:
+        return dataset.current_revision.modified_files_map.get(file_resource.file_id)
+    return None
+
+
+def _http_kwargs(file_resource: FileResource) -> dict:
+    http_options = {}
+    if file_resource.http_options:
+        for k, v in file_resource.http_options.items():
+            http_options[f"http_{k}"] = v
+
+    return dict(
+        url=file_resource.url,
+        file_data_feed_key=file_resource.data_feed_key,
+        file_data_spec_version=file_resource.data_spec_version,
+        file_data_serialization_format=file_resource.data_serialization_format or "txt",
+        last_modified=file_resource.last_modified,
+        **http_options,
+        **file_resource.loader_kwargs,
+    )
+
+
+def _loader_kwargs(
+    file_resource: FileResource, dataset_resource: Optional[DatasetResource]
+) -> dict:
+    extra_kwargs = {}
+    if _loader_accepts_dataset_resource(file_resource.file_loader):
+        extra_kwargs["dataset_resource"] = dataset_resource
+    return dict(**extra_kwargs, **file_resource.loader_kwargs)
+
+
 def load_file(
     file_resource: FileResource,
     dataset: Optional[Dataset] = None,
     dataset_resource: Optional[DatasetResource] = None,
 ) -> Union[DraftFile, NotModifiedFile]:
-    current_file = None
-    if dataset:
-        current_file = dataset.current_revision.modified_files_map.get(
-            file_resource.file_id
-        )
+    current_file = _get_current_file(file_resource, dataset)
 
     if file_resource.json_content is not None:
         # Empty dictionary is allowed
@@ -87,34 +162,40 @@ def load_file(
             )
         return file
     elif file_resource.url:
-        http_options = {}
-        if file_resource.http_options:
-            for k, v in file_resource.http_options.items():
-                http_options[f"http_{k}"] = v
-
-        return retrieve_http(
-            url=file_resource.url,
-            current_file=current_file,
-            file_data_feed_key=file_resource.data_feed_key,
-            file_data_spec_version=file_resource.data_spec_version,
-            file_data_serialization_format=file_resource.data_serialization_format
-            or "txt",
-            last_modified=file_resource.last_modified,
-            **http_options,
-            **file_resource.loader_kwargs,
-        )
+        return retrieve_http(current_file=current_file, **_http_kwargs(file_resource))
     else:
-        extra_kwargs = {}
-        if _loader_accepts_dataset_resource(file_resource.file_loader):
-            extra_kwargs["dataset_resource"] = dataset_resource
         return file_resource.file_loader(
             file_resource,
             current_file,
-            **extra_kwargs,
-            **file_resource.loader_kwargs,
+            **_loader_kwargs(file_resource, dataset_resource),
         )
 
 
+async def load_file_async(
+    file_resource: FileResource,
+    dataset: Optional[Dataset] = None,
+    dataset_resource: Optional[DatasetResource] = None,
+) -> Union[DraftFile, NotModifiedFile]:
+    """Async version of `load_file`. Urls are fetched with the pooled async
+    client and coroutine loaders are awaited; everything else runs in a thread."""
+    if file_resource.json_content is None:
+        current_file = _get_current_file(file_resource, dataset)
+        if file_resource.url:
+            return await retrieve_http_async(
+                current_file=current_file, **_http_kwargs(file_resource)
+            )
+        elif inspect.iscoroutinefunction(file_resource.file_loader):
+            return await file_resource.file_loader(
+                file_resource,
+                current_file,
+                **_loader_kwargs(file_resource, dataset_resource),
+            )
+
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(load_file, file_resource, dataset, dataset_resource)
+    )
+
+
 def _loader_accepts_dataset_resource(loader) -> bool:
     """Return True if loader accepts a `dataset_resource` keyword argument."""
     try:
@@ -127,28 +208,25 @@ def _loader_accepts_dataset_resource(loader) -> bool:
     return any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
 
 
-class UpdateDatasetTask(Task):
-    def __init__(
-        self,
-        dataset: Dataset,
-        dataset_resource: DatasetResource,
-        store: DatasetStore,
-    ):
-        self.dataset = dataset
-        self.dataset_resource = dataset_resource
-        self.store = store
-        self.task_id = str(uuid.uuid1())
+class _DatasetTask(Task):
+    """Shared loading logic of the create and update tasks. Subclasses
+    implement `_summary` and `_save`."""
+
+    dataset: Optional[Dataset] = None
+
+    def _summary(self, dataset_identifier: Identifier):
+        raise NotImplementedError
+
+    def _save(self, task_summary: TaskSummary, files: dict, revision_source):
+        raise NotImplementedError
 
     def run(self):
         dataset_identifier = Identifier(**self.dataset_resource.dataset_resource_id)
-
         revision_source = RevisionSource(
             source_id=self.task_id, source_type=SourceType.TASK
         )
 
-        with TaskSummary.update(
-            self.task_id, dataset_identifier=dataset_identifier
-        ) as task_summary:
+        with self._summary(dataset_identifier) as task_summary:
             files = {
                 file_id: task_summary.record_load_file(
                     lambda: load_file(
@@ -160,29 +238,79 @@ class UpdateDatasetTask(Task):
                 )
                 for file_id, file_resource in self.dataset_resource.files.items()
             }
+            self._save(task_summary, files, revision_source)
 
-            self.dataset_resource.run_post_load_files(files, self.dataset)
+        return task_summary
 
-            try:
-                revision = self.store.update_dataset(
-                    dataset=self.dataset,
-                    name=self.dataset_resource.name,
-                    state=self.dataset_resource.state,
-                    metadata=self.dataset_resource.metadata,
-                    files=files,
-                    revision_source=revision_source,
-                )
-                task_summary.set_stats_from_revision(revision)
-            except Exception as e:
-                raise SaveError("Could not update dataset") from e
+    async def run_async(self):
+        dataset_identifier = Identifier(**self.dataset_resource.dataset_resource_id)
+        revision_source = RevisionSource(
+            source_id=self.task_id, source_type=SourceType.TASK
+        )
+
+        with self._summary(dataset_identifier) as task_summary:
+            file_ids = list(self.dataset_resource.files.keys())
+            # Load all files of the dataset concurrently
+            loaded_files = await asyncio.gather(
+                *[
+                    task_summary.record_load_file_async(
+                        functools.partial(
+                            load_file_async,
+                            file_resource,
+                            dataset=self.dataset,
+                            dataset_resource=self.dataset_resource,
+                        ),
+                        metadata={"file_id": file_id},
+                    )
+                    for file_id, file_resource in self.dataset_resource.files.items()
+                ]
+            )
+            files = dict(zip(file_ids, loaded_files))
+
+            # Database writes and compression are blocking
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._save, task_summary, files, revision_source
+            )
 
         return task_summary
 
+
+class UpdateDatasetTask(_DatasetTask):
+    def __init__(
+        self,
+        dataset: Dataset,
+        dataset_resource: DatasetResource,
+        store: DatasetStore,
+    ):
+        self.dataset = dataset
+        self.dataset_resource = dataset_resource
+        self.store = store
+        self.task_id = str(uuid.uuid1())
+
+    def _summary(self, dataset_identifier: Identifier):
+        return TaskSummary.update(self.task_id, dataset_identifier=dataset_identifier)
+
+    def _save(self, task_summary: TaskSummary, files: dict, revision_source):
+        self.dataset_resource.run_post_load_files(files, self.dataset)
+
+        try:
+            revision = self.store.update_dataset(
+                dataset=self.dataset,
+                name=self.dataset_resource.name,
+                state=self.dataset_resource.state,
+                metadata=self.dataset_resource.metadata,
+                files=files,
+                revision_source=revision_source,
+            )
+            task_summary.set_stats_from_revision(revision)
+        except Exception as e:
+            raise SaveError("Could not update dataset") from e
+
     def __repr__(self):
         return f"UpdateDatasetTask({self.dataset_resource.provider} -> {self.dataset_resource.dataset_resource_id})"
 
 
-class CreateDatasetTask(Task):
+class CreateDatasetTask(_DatasetTask):
     def __init__(
         self,
         dataset_resource: DatasetResource,
@@ -192,44 +320,29 @@ class CreateDatasetTask(Task):
         self.store = store
         self.task_id = str(uuid.uuid1())
 
-    def run(self):
-        dataset_identifier = Identifier(**self.dataset_resource.dataset_resource_id)
-        revision_source = RevisionSource(
-            source_id=self.task_id, source_type=SourceType.TASK
-        )
-
-        with TaskSummary.create(self.task_id, dataset_identifier) as task_summary:
-            files = {
-                file_id: task_summary.record_load_file(
-                    lambda: load_file(
-                        file_resource,
-                        dataset=None,
-                        dataset_resource=self.dataset_resource,
-                    ),
-                    metadata={"file_id": file_id},
-                )
-                for file_id, file_resource in self.dataset_resource.files.items()
-            }
+    def _summary(self, dataset_identifier: Identifier):
+        return TaskSummary.create(self.task_id, dataset_identifier)
 
-            self.dataset_resource.run_post_load_files(files)
+    def _save(self, task_summary: TaskSummary, files: dict, revision_source):
+        self.dataset_resource.run_post_load_files(files)
 
-            try:
-                revision = self.store.create_dataset(
-                    dataset_type=self.dataset_resource.dataset_type,
-                    provider=self.dataset_resource.provider,
-                    dataset_identifier=dataset_identifier,
-                    name=self.dataset_resource.name,
-                    state=self.dataset_resource.state,
-                    metadata=self.dataset_resource.metadata,
-                    files=files,
-                    revision_source=revision_source,
-                )
-
-                task_summary.set_stats_from_revision(revision)
-            except Exception as e:
-                raise SaveError("Could not create dataset") from e
+        try:
+            revision = self.store.create_dataset(
+                dataset_type=self.dataset_resource.dataset_type,
+                provider=self.dataset_resource.provider,
+                dataset_identifier=Identifier(
+                    **self.dataset_resource.dataset_resource_id
+                ),
+                name=self.dataset_resource.name,
+                state=self.dataset_resource.state,
+                metadata=self.dataset_resource.metadata,
+                files=files,
+                revision_source=revision_source,
+            )
 
-        return task_summary
+            task_summary.set_stats_from_revision(revision)
+        except Exception as e:
+            raise SaveError("Could not create dataset") from e
 
     def __repr__(self):
         return f"CreateDatasetTask({self.dataset_resource.provider} -> {self.dataset_resource.dataset_resource_id})"
@@ -243,16 +356,75 @@ MAX_TASKS_PER_CHUNK = 10_000
 PROGRESS_SAVE_INTERVAL = 100
 
 
+class _PreparedBatch(HasTiming):
+    """A discovered batch on its way through the discover -> resolve -> build
+    stages. Stage timings are collected here (possibly on another thread) and
+    merged into the IngestionJobSummary that executes the batch."""
+
+    def __init__(self):
+        self.timings = []
+        self.batch = []
+        # The batch as returned by find_datasets, before the pre-check
+        self.discovered = []
+        self.error: Optional[Exception] = None
+        self.skipped_tasks = 0
+        self.identifier_keys = []
+        # Resolved while an earlier batch with some of the same identifiers
+        # was not executed yet
+        self.stale = False
+        self.dataset_collection = None
+        self.task_set = TaskSet()
+        # Datasets that are up-to-date. DatasetSkipped is dispatched when the
+        # batch is executed, not when it's built.
+        self.skipped_datasets = []
+
+    @classmethod
+    def from_discovered(cls, discovered: list) -> "_PreparedBatch":
+        prepared = cls()
+        prepared.batch = prepared.discovered = discovered
+        return prepared
+
+
+class _InFlightIdentifiers:
+    """Identifier keys of batches that are resolved but not executed yet.
+
+    With a pipeline a batch is looked up in the store before the batches in
+    front of it have saved anything. A batch that shares identifiers with one
+    of those is marked stale, and resolved again right before it's executed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def claim(self, keys: list[str]) -> bool:
+        """Mark `keys` as in flight. Returns True when any of them already was."""
+        with self._lock:
+            stale = any(self._counts[key] for key in keys)
+            self._counts.update(keys)
+        return stale
+
+    def release(self, keys: list[str]):
+        with self._lock:
+            self._counts.subtract(keys)
+
+
 class IngestionJob:
     def __init__(
         self,
         ingestion_job_id: str,
         ingestion_plan: IngestionPlan,
         selector: Selector,
+        pipeline_depth: Optional[int] = None,
     ):
         self.ingestion_job_id = ingestion_job_id
         self.ingestion_plan = ingestion_plan
         self.selector = selector
+        # How many batches may be discovered ahead of the one being executed.
+        # 0 runs the batches strictly one after the other.
+        self.pipeline_depth = (
+            pipeline_depth if pipeline_depth is not None else get_pipeline_depth()
+        )
         # task_count() at which the summary was last persisted mid-run.
         self._last_progress_saved_at = 0
 
@@ -379,6 +551,12 @@ class IngestionJob:
                     **self.selector.custom_attributes,
                 )
 
+                if hasattr(dataset_resources, "__aiter__"):
+                    # AsyncSource: drive discovery on the loop the tasks run on
+                    dataset_resources = iter_async(
+                        dataset_resources, loop=task_executor.event_loop
+                    )
+
                 # We need to include the to_batches as that will start the generator
                 batches = to_batches(dataset_resources)
         except FatalError as e:
@@ -420,174 +598,332 @@ class IngestionJob:
             )
             return
 
+        in_flight = _InFlightIdentifiers()
+        if self.pipeline_depth:
+            # Staged pipeline: discovery, the store lookup and building the task
+            # set for upcoming batches run in background threads while the
+            # current batch executes.
+            prepared_batches = pipelined(
+                self._discover_batches(batches),
+                lambda prepared: self._resolve_batch(
+                    prepared, store, summary_map, in_flight
+                ),
+                lambda prepared: self._build_task_set(prepared, store),
+                maxsize=self.pipeline_depth,
+                on_thread_exit=store.release_thread_resources,
+            )
+        else:
+            prepared_batches = (
+                self._build_task_set(
+                    self._resolve_batch(prepared, store, summary_map, in_flight),
+                    store,
+                )
+                for prepared in self._discover_batches(batches)
+            )
+
+        # Make sure background stages stop when we leave early (abort, errors)
+        with closing(prepared_batches):
+            for prepared in prepared_batches:
+                # Timings are recorded on the batch by whichever stage (thread)
+                # handled it, and accounted to the summary that executes it.
+                ingestion_job_summary.timings.extend(prepared.timings)
+
+                if prepared.error is not None:
+                    if isinstance(prepared.error, FatalError):
+                        # Persist the failure, then abort, instead of swallowing it as a
+                        # failed batch fetch.
+                        ingestion_job_summary.set_exception(prepared.error)
+                        yield ingestion_job_summary
+                        raise prepared.error
+
+                    logger.error(
+                        "Failed to fetch next batch",
+                        exc_info=(
+                            type(prepared.error),
+                            prepared.error,
+                            prepared.error.__traceback__,
+                        ),
+                    )
+                    ingestion_job_summary.set_exception(prepared.error)
+                    yield ingestion_job_summary
+                    return
+
+                if prepared.stale:
+                    # The batches in front of this one are done now, so the
+                    # store is up-to-date for the identifiers they shared.
+                    in_flight.release(prepared.identifier_keys)
+                    prepared = self._build_task_set(
+                        self._resolve_batch(
+                            _PreparedBatch.from_discovered(prepared.discovered),
+                            store,
+                            summary_map,
+                            in_flight,
+                        ),
+                        store,
+                    )
+                    ingestion_job_summary.timings.extend(prepared.timings)
+
+                for dataset in prepared.skipped_datasets:
+                    # Emit event for streaming datasets
+                    store.dispatch(DatasetSkipped(dataset=dataset))
+
+                skipped_tasks = prepared.skipped_tasks
+                if not prepared.batch:
+                    logger.info(
+                        f"Discovered {skipped_tasks} datasets from "
+                        f"{self.ingestion_plan.source.__class__.__name__} "
+                        f"using selector {self.selector} => nothing to do "
+                        f"({skipped_tasks} skipped via pre-check)"
+                    )
+                    ingestion_job_summary.increase_skipped_tasks(skipped_tasks)
+                    continue
+
+                task_set = prepared.task_set
+                batch_task_summaries = []
+                with ingestion_job_summary.record_timing("tasks"):
+                    if task_set:
+                        logger.info(
+                            f"Discovered {len(prepared.batch)} datasets from {self.ingestion_plan.source.__class__.__name__} "
+                            f"using selector {self.selector} => {len(task_set)} tasks. {skipped_tasks} skipped."
+                        )
+
+                        try:
+                            # Results stream in as tasks finish, so a slow task
+                            # doesn't delay reporting the rest of the batch.
+                            for task_summary in self._run_tasks(
+                                task_executor, task_set, store
+                            ):
+                                ingestion_job_summary.add_task_summaries([task_summary])
+                                batch_task_summaries.append(task_summary)
+                                self._save_progress(store, ingestion_job_summary)
+                        except StopProcessing:
+                            logger.info(
+                                "StopProcessing raised — saving partial results "
+                                "and stopping"
+                            )
+                            ingestion_job_summary.set_aborted()
+                            yield ingestion_job_summary
+                            raise
+                        except (KeyboardInterrupt, SystemExit):
+                            logger.warning(
+                                "Interrupted — saving partial results and aborting"
+                            )
+                            ingestion_job_summary.set_aborted()
+                            yield ingestion_job_summary
+                            raise
+                        except FatalError as e:
+                            logger.error("Fatal error — saving summary and aborting")
+                            ingestion_job_summary.set_exception(e)
+                            yield ingestion_job_summary
+                            raise
+                    else:
+                        logger.info(
+                            f"Discovered {len(prepared.batch)} datasets from {self.ingestion_plan.source.__class__.__name__} "
+                            f"using selector {self.selector} => nothing to do"
+                        )
+                    ingestion_job_summary.increase_skipped_tasks(skipped_tasks)
+                # The datasets of the batch must be saved before the next
+                # batches look them up
+                failed_uploads = store.flush_uploads()
+                if failed_uploads:
+                    # The task finished, but its revision was not saved
+                    failed_keys = {dataset.identifier.key for dataset in failed_uploads}
+                    for task_summary in batch_task_summaries:
+                        if task_summary.dataset_identifier.key in failed_keys:
+                            task_summary.state = TaskState.FAILED
+                in_flight.release(prepared.identifier_keys)
+
+                # Live snapshot after each batch (throttled) so the summary's
+                # counters/state stay current while the job runs.
+                self._save_progress(store, ingestion_job_summary)
+
+                if ingestion_job_summary.task_count() >= MAX_TASKS_PER_CHUNK:
+                    ingestion_job_summary.set_finished()
+                    yield ingestion_job_summary
+
+                    # Start a new one
+                    is_first_chunk = False
+                    ingestion_job_summary = IngestionJobSummary.new(ingestion_job=self)
+                    self._current_summary = ingestion_job_summary
+                    self._last_progress_saved_at = 0
+                    self._save_progress(store, ingestion_job_summary, force=True)
+
+        if ingestion_job_summary.task_count() > 0 or is_first_chunk:
+            # When there is interesting information to store, or there was no data at all, store it
+            ingestion_job_summary.set_finished()
+            yield ingestion_job_summary
+
+    def _run_tasks(
+        self, task_executor: TaskExecutor, task_set: TaskSet, store: DatasetStore
+    ) -> Iterator[TaskSummary]:
+        if task_executor.event_loop:
+            yield from task_executor.iter_run(run_task_async, task_set)
+            return
+
+        if not task_executor.runs_in_processes:
+            yield from task_executor.iter_run(run_task, task_set)
+            return
+
+        for task_summary, events in task_executor.iter_run(
+            run_task_in_process, task_set
+        ):
+            for event in events:
+                store.dispatch(event)
+            yield task_summary
+
+    def _discover_batches(self, batches) -> Iterator["_PreparedBatch"]:
+        """Discover stage: pull the next batch from find_datasets.
+
+        A failure ends discovery; it is passed along as the last batch so the
+        execute stage can handle it in order."""
         while True:
             logger.info(f"Finding next batch of datasets for selector={self.selector}")
 
+            prepared = _PreparedBatch()
             try:
-                with ingestion_job_summary.record_timing("find_datasets"):
+                with prepared.record_timing("find_datasets"):
                     try:
-                        batch = next(batches)
+                        prepared.batch = prepared.discovered = next(batches)
                     except StopIteration:
-                        break
-            except FatalError as e:
-                # Persist the failure, then abort, instead of swallowing it as a
-                # failed batch fetch.
-                ingestion_job_summary.set_exception(e)
-                yield ingestion_job_summary
-                raise
+                        return
             except Exception as e:
-                logger.exception("Failed to fetch next batch")
-
-                ingestion_job_summary.set_exception(e)
-                yield ingestion_job_summary
+                prepared.error = e
+                yield prepared
                 return
 
-            # Fast pre-check (bloom-filter style): let the fetch policy skip
-            # datasets it is certain are up-to-date from a cheap summary, before
-            # loading the full dataset+revision+file graph. can_skip is one-sided
-            # (True only when certain); "unknown" resources fall through to the
-            # authoritative get_dataset_collection + should_refetch path. Only
-            # existing datasets (summary present) are eligible — new ones go to
-            # the create path below.
-            skipped_tasks = 0
-            if summary_map:
-                pending_batch = []
-                for dataset_resource in batch:
-                    identifier = Identifier.create_from_selector(
-                        self.selector, **dataset_resource.dataset_resource_id
-                    )
-                    summary = summary_map.get(identifier.key)
-                    if (
-                        summary is not None
-                        and self.ingestion_plan.fetch_policy.can_skip(
-                            summary, dataset_resource
-                        )
-                    ):
-                        skipped_tasks += 1
-                        continue
-                    pending_batch.append(dataset_resource)
-                batch = pending_batch
+            yield prepared
 
-            if not batch:
-                logger.info(
-                    f"Discovered {skipped_tasks + len(batch)} datasets from "
-                    f"{self.ingestion_plan.source.__class__.__name__} "
-                    f"using selector {self.selector} => nothing to do "
-                    f"({skipped_tasks} skipped via pre-check)"
-                )
-                ingestion_job_summary.increase_skipped_tasks(skipped_tasks)
-                continue
-
-            dataset_identifiers = [
+    def _drop_skippable(
+        self, batch: List[DatasetResource], summary_map: DatasetSummaryMap
+    ) -> List[DatasetResource]:
+        """Return the resources of the batch the fetch policy can't skip, based
+        on their summaries (one can_skip_many call for the batch)."""
+        summaries = [
+            summary_map.get(
                 Identifier.create_from_selector(
                     self.selector, **dataset_resource.dataset_resource_id
-                )
-                for dataset_resource in batch
-            ]
-
-            logger.info(f"Searching for existing Datasets for DatasetResources")
-
-            with ingestion_job_summary.record_timing("get_dataset_collection"):
-                # Load all available datasets based on the discovered dataset identifiers
-                dataset_collection = store.get_dataset_collection(
-                    dataset_type=self.ingestion_plan.dataset_type,
-                    # Assume all DatasetResources share the same provider
-                    provider=batch[0].provider,
-                    selector=dataset_identifiers,
-                )
-
-            task_set = TaskSet()
+                ).key
+            )
+            for dataset_resource in batch
+        ]
+        mask = self.ingestion_plan.fetch_policy.can_skip_many(summaries, batch)
+        return [
+            dataset_resource for dataset_resource, skip in zip(batch, mask) if not skip
+        ]
+
+    def _should_refetch_many(
+        self,
+        datasets: List[Optional[Dataset]],
+        batch: List[DatasetResource],
+    ) -> List[Optional[bool]]:
+        """should_refetch_many for the existing datasets of a batch (one call),
+        aligned with the batch. None for the datasets that don't exist."""
+        existing = [i for i, dataset in enumerate(datasets) if dataset]
+        refetch: List[Optional[bool]] = [None] * len(batch)
+        if existing:
+            mask = self.ingestion_plan.fetch_policy.should_refetch_many(
+                [datasets[i] for i in existing], [batch[i] for i in existing]
+            )
+            for i, flag in zip(existing, mask):
+                refetch[i] = flag
+        return refetch
 
-            with ingestion_job_summary.record_timing("build_task_set"):
-                for dataset_resource in batch:
-                    dataset_identifier = Identifier.create_from_selector(
+    def _resolve_batch(
+        self,
+        prepared: "_PreparedBatch",
+        store: DatasetStore,
+        summary_map: Optional[DatasetSummaryMap],
+        in_flight: _InFlightIdentifiers,
+    ) -> "_PreparedBatch":
+        """Resolve stage: drop resources the fetch policy can skip and load the
+        existing datasets for the remaining ones."""
+        if prepared.error is not None:
+            return prepared
+
+        # Fast pre-check (bloom-filter style): let the fetch policy skip
+        # datasets it is certain are up-to-date from a cheap summary, before
+        # loading the full dataset+revision+file graph. can_skip is one-sided
+        # (True only when certain); "unknown" resources fall through to the
+        # authoritative get_dataset_collection + should_refetch path. Only
+        # existing datasets (summary present) are eligible — new ones go to
+        # the create path below.
+        if summary_map:
+            pending_batch = self._drop_skippable(prepared.batch, summary_map)
+            prepared.skipped_tasks += len(prepared.batch) - len(pending_batch)
+            prepared.batch = pending_batch
+
+        if not prepared.batch:
+            return prepared
+
+        dataset_identifiers = [
+            Identifier.create_from_selector(
+                self.selector, **dataset_resource.dataset_resource_id
+            )
+            for dataset_resource in prepared.batch
+        ]
+        prepared.identifier_keys = [
+            identifier.key for identifier in dataset_identifiers
+        ]
+        prepared.stale = in_flight.claim(prepared.identifier_keys)
+
+        logger.info(f"Searching for existing Datasets for DatasetResources")
+
+        with prepared.record_timing("get_dataset_collection"):
+            # Load all available datasets based on the discovered dataset identifiers
+            prepared.dataset_collection = store.get_dataset_collection(
+                dataset_type=self.ingestion_plan.dataset_type,
+                # Assume all DatasetResources share the same provider
+                provider=prepared.batch[0].provider,
+                selector=dataset_identifiers,
+                # Tasks and fetch policies only look at the current files
+                revisions="current",
+            )
+        return prepared
+
+    def _build_task_set(
+        self, prepared: "_PreparedBatch", store: DatasetStore
+    ) -> "_PreparedBatch":
+        """Build stage: turn the resolved batch into create/update tasks."""
+        if prepared.error is not None or not prepared.batch:
+            return prepared
+
+        with prepared.record_timing("build_task_set"):
+            datasets = [
+                prepared.dataset_collection.get(
+                    Identifier.create_from_selector(
                         self.selector, **dataset_resource.dataset_resource_id
                     )
-
-                    if dataset := dataset_collection.get(dataset_identifier):
-                        if self.ingestion_plan.fetch_policy.should_refetch(
-                            dataset, dataset_resource
-                        ):
-                            task_set.add(
-                                UpdateDatasetTask(
-                                    dataset=dataset,  # Current dataset from the database
-                                    dataset_resource=dataset_resource,  # Most recent dataset_resource
-                                    store=store,
-                                )
+                )
+                for dataset_resource in prepared.batch
+            ]
+            refetch = self._should_refetch_many(datasets, prepared.batch)
+
+            for dataset_resource, dataset, should_refetch in zip(
+                prepared.batch, datasets, refetch
+            ):
+                if dataset:
+                    if should_refetch:
+                        prepared.task_set.add(
+                            UpdateDatasetTask(
+                                dataset=dataset,  # Current dataset from the database
+                                dataset_resource=dataset_resource,  # Most recent dataset_resource
+                                store=store,
                             )
-                        else:
-                            # Emit event for streaming datasets
-                            store.dispatch(DatasetSkipped(dataset=dataset))
-                            skipped_tasks += 1
+                        )
                     else:
-                        if self.ingestion_plan.fetch_policy.should_fetch(
-                            dataset_resource
-                        ):
-                            task_set.add(
-                                CreateDatasetTask(
-                                    dataset_resource=dataset_resource,
-                                    store=store,
-                                )
+                        prepared.skipped_datasets.append(dataset)
+                        prepared.skipped_tasks += 1
+                else:
+                    if self.ingestion_plan.fetch_policy.should_fetch(dataset_resource):
+                        prepared.task_set.add(
+                            CreateDatasetTask(
+                                dataset_resource=dataset_resource,
+                                store=store,
                             )
-                        else:
-                            skipped_tasks += 1
-
-            with ingestion_job_summary.record_timing("tasks"):
-                if task_set:
-                    logger.info(
-                        f"Discovered {len(dataset_identifiers)} datasets from {self.ingestion_plan.source.__class__.__name__} "
-                        f"using selector {self.selector} => {len(task_set)} tasks. {skipped_tasks} skipped."
-                    )
-
-                    try:
-                        results = task_executor.run(run_task, task_set)
-                    except StopProcessing:
-                        logger.info(
-                            "StopProcessing raised — saving partial results "
-                            "and stopping"
-                        )
-                        ingestion_job_summary.set_aborted()
-                        yield ingestion_job_summary
-                        raise
-                    except (KeyboardInterrupt, SystemExit):
-                        logger.warning(
-                            "Interrupted — saving partial results and aborting"
                         )
-                        ingestion_job_summary.set_aborted()
-                        yield ingestion_job_summary
-                        raise
-                    except FatalError as e:
-                        logger.error("Fatal error — saving summary and aborting")
-                        ingestion_job_summary.set_exception(e)
-                        yield ingestion_job_summary
-                        raise
-
-                    ingestion_job_summary.add_task_summaries(results)
-                else:
-                    logger.info(
-                        f"Discovered {len(dataset_identifiers)} datasets from {self.ingestion_plan.source.__class__.__name__} "
-                        f"using selector {self.selector} => nothing to do"
-                    )
-                ingestion_job_summary.increase_skipped_tasks(skipped_tasks)
-
-            # Live snapshot after each batch (throttled) so the summary's
-            # counters/state stay current while the job runs.
-            self._save_progress(store, ingestion_job_summary)
-
-            if ingestion_job_summary.task_count() >= MAX_TASKS_PER_CHUNK:
-                ingestion_job_summary.set_finished()
-                yield ingestion_job_summary
-
-                # Start a new one
-                is_first_chunk = False
-                ingestion_job_summary = IngestionJobSummary.new(ingestion_job=self)
-                self._last_progress_saved_at = 0
-                self._save_progress(store, ingestion_job_summary, force=True)
-
-        if ingestion_job_summary.task_count() > 0 or is_first_chunk:
-            # When there is interesting information to store, or there was no data at all, store it
-            ingestion_job_summary.set_finished()
-            yield ingestion_job_summary
+                    else:
+                        prepared.skipped_tasks += 1
+        return prepared
 
     def _execute_async(
         self,
@@ -625,19 +961,10 @@ class IngestionJob:
                 # when certain); only existing datasets (summary present) are
                 # eligible — new ones fall through to the create path.
                 if summary_map:
-                    pending = []
-                    for dr in batch:
-                        identifier = Identifier.create_from_selector(
-                            self.selector, **dr.dataset_resource_id
-                        )
-                        summary = summary_map.get(identifier.key)
-                        if (
-                            summary is not None
-                            and self.ingestion_plan.fetch_policy.can_skip(summary, dr)
-                        ):
-                            ingestion_job_summary.increase_skipped_tasks(1)
-                            continue
-                        pending.append(dr)
+                    pending = self._drop_skippable(batch, summary_map)
+                    ingestion_job_summary.increase_skipped_tasks(
+                        len(batch) - len(pending)
+                    )
                     batch = pending
 
                 if not batch:
@@ -656,15 +983,22 @@ class IngestionJob:
                         dataset_type=self.ingestion_plan.dataset_type,
                         provider=batch[0].provider,
                         selector=dataset_identifiers,
+                        revisions="current",
                     )
 
-                for dr in batch:
-                    identifier = Identifier.create_from_selector(
-                        self.selector, **dr.dataset_resource_id
+                datasets = [
+                    dataset_collection.get(
+                        Identifier.create_from_selector(
+                            self.selector, **dr.dataset_resource_id
+                        )
                     )
-                    dataset = dataset_collection.get(identifier)
+                    for dr in batch
+                ]
+                refetch = self._should_refetch_many(datasets, batch)
+
+                for dr, dataset, should_refetch in zip(batch, datasets, refetch):
                     if dataset:
-                        if self.ingestion_plan.fetch_policy.should_refetch(dataset, dr):
+                        if should_refetch:
                             dr._existing_dataset = dataset
                             yield dr
                         else:
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Iterable, Iterator, Union
+from typing import AsyncIterator, Dict, List, Optional, Iterable, Iterator, Union
 
 from .data_spec_version_collection import DataSpecVersionCollection
 from .dataset.collection_metadata import DatasetCollectionMetadata
@@ -36,3 +36,27 @@ class Source(ABC):
 
     def __repr__(self):
         return self.__class__.__name__
+
+
+class AsyncSource(Source):
+    """Source for I/O heavy workloads, like many small HTTP requests.
+
+    `find_datasets` is async. A subclass may define an async
+    `discover_selectors(dataset_type) -> List[Dict]`; like on Source it's
+    optional, and only called when it exists. The tasks of an AsyncSource run
+    as coroutines on an event loop, so a single process keeps many requests
+    in flight. A `file_loader` of a FileResource may be a
+    coroutine function; files with a `url` are fetched with
+    `retrieve_http_async`. Blocking loaders, database writes and compression
+    are offloaded to a thread pool.
+    """
+
+    @abstractmethod
+    async def find_datasets(
+        self,
+        dataset_type: str,
+        data_spec_versions: DataSpecVersionCollection,
+        dataset_collection_metadata: DatasetCollectionMetadata,
+        **kwargs
+    ) -> AsyncIterator[List[DatasetResource]]:
+        pass
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 from .task_summary import TaskSummary
@@ -7,3 +8,8 @@ class Task(ABC):
     @abstractmethod
     def run(self) -> TaskSummary:
         pass
+
+    async def run_async(self) -> TaskSummary:
+        """Run the task on an event loop. By default `run` is called in a
+        thread, so it doesn't block the loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.run)
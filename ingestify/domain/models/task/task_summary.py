@@ -49,6 +49,10 @@ class TaskSummary(BaseModel, HasTiming):
         with self.record_timing(f"Load of {metadata.get('file_id', 'file')}", metadata):
             return fn()
 
+    async def record_load_file_async(self, fn, metadata: dict):
+        with self.record_timing(f"Load of {metadata.get('file_id', 'file')}", metadata):
+            return await fn()
+
     @classmethod
     @contextmanager
     def new(cls, task_id: str, operation: Operation, dataset_identifier: Identifier):
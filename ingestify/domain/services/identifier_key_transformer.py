@@ -102,7 +102,7 @@ class IdentifierTransformer:
         Registers a transformation for a specific (provider, dataset_type, id_key).
 
         key_type: declared value type of this identifier key ('str' or 'int').
-        When set, the repository uses this to cast JSONB values in queries and
+        When set, the repository uses this to cast identifier values in queries and
         to generate matching expression indexes via sync-indexes.
         """
         if isinstance(transformation, str):
@@ -1,4 +1,4 @@
-from .fetch.http import retrieve_http
+from .fetch.http import retrieve_http, retrieve_http_async
 from .store import *
 
-__all__ = ["retrieve_http"]
+__all__ = ["retrieve_http", "retrieve_http_async"]
@@ -1,4 +1,6 @@
+import asyncio
 import json
+import weakref
 from datetime import datetime
 from email.utils import format_datetime, parsedate
 from hashlib import sha1
@@ -15,6 +17,7 @@ from ingestify.utils import (
     utcnow,
     BufferedStream,
     detect_compression,
+    get_async_concurrency,
     gzip_uncompressed_size,
 )
 
@@ -45,21 +48,26 @@ def get_session():
     return _session
 
 
-def retrieve_http(
-    url,
-    current_file: Optional[File] = None,
-    headers: Optional[dict] = None,
-    pager: Optional[Tuple[str, Callable[[str, dict], Optional[str]]]] = None,
-    last_modified: Optional[datetime] = None,
-    **kwargs,
-) -> Union[DraftFile, NotModifiedFile]:
+def _prepare_request(
+    current_file: Optional[File],
+    headers: Optional[dict],
+    last_modified: Optional[datetime],
+    kwargs: dict,
+) -> Tuple[Optional[NotModifiedFile], dict, dict, dict]:
+    """Split kwargs into http and file attributes, and add the conditional
+    request headers. Returns a NotModifiedFile when no request is needed."""
     headers = headers or {}
     if current_file:
         if last_modified and current_file.modified_at >= last_modified:
             # Not changed
-            return NotModifiedFile(
-                modified_at=last_modified,
-                reason=f"last-modified same as current file: {current_file.modified_at} >= {last_modified}",
+            return (
+                NotModifiedFile(
+                    modified_at=last_modified,
+                    reason=f"last-modified same as current file: {current_file.modified_at} >= {last_modified}",
+                ),
+                headers,
+                {},
+                {},
             )
         # else:
         #     print(f"{current_file.modified_at=} {last_modified=}")
@@ -77,6 +85,82 @@ def retrieve_http(
             file_attributes[key[5:]] = item
         else:
             raise Exception(f"Don't know how to use {key}")
+    return None, headers, http_kwargs, file_attributes
+
+
+def _get_modified_at(last_modified: Optional[datetime], response_headers) -> datetime:
+    if last_modified:
+        # From metadata received from api in discover_datasets
+        return last_modified
+    elif "last-modified" in response_headers:
+        # Received from the webserver
+        return parsedate(response_headers["last-modified"])
+    else:
+        return utcnow()
+
+
+def _paged_stream(
+    data_path: str,
+    data: list,
+    tag: Optional[str],
+    current_file: Optional[File],
+    last_modified: Optional[datetime],
+) -> Union[NotModifiedFile, Tuple[BinaryIO, str, int]]:
+    content_bytes = json.dumps({data_path: data}).encode("utf-8")
+    if not tag:
+        tag = sha1(content_bytes).hexdigest()
+    if current_file and current_file.tag == tag:
+        return NotModifiedFile(
+            modified_at=last_modified, reason="tag matched current_file"
+        )
+    stream = BufferedStream.from_stream(BytesIO(content_bytes))
+    return stream, tag, len(content_bytes)
+
+
+def _build_draft_file(
+    raw_stream: BufferedStream,
+    tag: str,
+    modified_at: datetime,
+    content_type: Optional[str],
+    file_attributes: dict,
+    content_length: Optional[int] = None,
+) -> DraftFile:
+    raw_stream.seek(0)
+    content_compression_method = None
+    if content_length is None:
+        content_compression_method = detect_compression(raw_stream)
+        if content_compression_method == "gzip":
+            content_length = gzip_uncompressed_size(raw_stream)
+        else:
+            raw_stream.seek(0, 2)
+            content_length = raw_stream.tell()
+            raw_stream.seek(0)
+
+    return DraftFile(
+        created_at=utcnow(),
+        modified_at=modified_at,
+        tag=tag,
+        size=content_length,
+        content_type=content_type,
+        content_compression_method=content_compression_method,
+        stream=raw_stream,
+        **file_attributes,
+    )
+
+
+def retrieve_http(
+    url,
+    current_file: Optional[File] = None,
+    headers: Optional[dict] = None,
+    pager: Optional[Tuple[str, Callable[[str, dict], Optional[str]]]] = None,
+    last_modified: Optional[datetime] = None,
+    **kwargs,
+) -> Union[DraftFile, NotModifiedFile]:
+    not_modified, headers, http_kwargs, file_attributes = _prepare_request(
+        current_file, headers, last_modified, kwargs
+    )
+    if not_modified:
+        return not_modified
 
     ignore_not_found = http_kwargs.pop("ignore_not_found", False)
 
@@ -91,15 +175,7 @@ def retrieve_http(
         # Not modified
         return NotModifiedFile(modified_at=last_modified, reason="304 http code")
 
-    if last_modified:
-        # From metadata received from api in discover_datasets
-        modified_at = last_modified
-    elif "last-modified" in response.headers:
-        # Received from the webserver
-        modified_at = parsedate(response.headers["last-modified"])
-    else:
-        modified_at = utcnow()
-
+    modified_at = _get_modified_at(last_modified, response.headers)
     tag = response.headers.get("etag")
 
     if pager:
@@ -117,49 +193,168 @@ def retrieve_http(
                     next_url, headers=headers, stream=True, **http_kwargs
                 )
 
-        content_bytes = json.dumps({data_path: data}).encode("utf-8")
-        if not tag:
-            tag = sha1(content_bytes).hexdigest()
-        if current_file and current_file.tag == tag:
+        result = _paged_stream(data_path, data, tag, current_file, last_modified)
+        if isinstance(result, NotModifiedFile):
+            return result
+        stream, tag, content_length = result
+        return _build_draft_file(
+            stream,
+            tag,
+            modified_at,
+            response.headers.get("content-type"),
+            file_attributes,
+            content_length=content_length,
+        )
+
+    # Stream response body directly into BufferedStream, hashing on the fly
+    raw_stream = BufferedStream()
+    hasher = sha1()
+    for chunk in response.iter_content(chunk_size=1024 * 1024):
+        hasher.update(chunk)
+        raw_stream.write(chunk)
+
+    if not tag:
+        tag = hasher.hexdigest()
+
+    if current_file and current_file.tag == tag:
+        return NotModifiedFile(
+            modified_at=last_modified, reason="tag matched current_file"
+        )
+
+    return _build_draft_file(
+        raw_stream,
+        tag,
+        modified_at,
+        response.headers.get("content-type"),
+        file_attributes,
+    )
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def get_async_client():
+    """Pooled async HTTP client, one per event loop. Requires httpx."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import httpx
+
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            # Retries on connection errors. Retries on status codes are handled
+            # by _get_async
+            transport=httpx.AsyncHTTPTransport(
+                retries=4,
+                limits=httpx.Limits(
+                    max_connections=get_async_concurrency(),
+                    max_keepalive_connections=get_async_concurrency(),
+                ),
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the client of the running event loop, if there is one. Call this
+    before the loop stops, so its connections are closed."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _get_async(client, url, headers, http_kwargs, max_retries: int = 4):
+    """Send the request, with the same retry strategy as the sync session."""
+    for attempt in range(max_retries + 1):
+        response = await client.send(
+            client.build_request("GET", url, headers=headers, **http_kwargs),
+            stream=True,
+        )
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+        await response.aclose()
+        await asyncio.sleep(2 * 2**attempt)
+
+
+async def retrieve_http_async(
+    url,
+    current_file: Optional[File] = None,
+    headers: Optional[dict] = None,
+    pager: Optional[Tuple[str, Callable[[str, dict], Optional[str]]]] = None,
+    last_modified: Optional[datetime] = None,
+    **kwargs,
+) -> Union[DraftFile, NotModifiedFile]:
+    """Async equivalent of `retrieve_http`, using a pooled httpx client."""
+    not_modified, headers, http_kwargs, file_attributes = _prepare_request(
+        current_file, headers, last_modified, kwargs
+    )
+    if not_modified:
+        return not_modified
+
+    ignore_not_found = http_kwargs.pop("ignore_not_found", False)
+
+    client = get_async_client()
+    response = await _get_async(client, url, headers, http_kwargs)
+    try:
+        if response.status_code == 404 and ignore_not_found:
             return NotModifiedFile(
-                modified_at=last_modified, reason="tag matched current_file"
+                modified_at=last_modified, reason="404 http code and ignore-not-found"
             )
-        stream = BufferedStream.from_stream(BytesIO(content_bytes))
-        content_length = len(content_bytes)
-        content_compression_method = None
-    else:
-        # Stream response body directly into BufferedStream, hashing on the fly
+
+        if response.status_code == 304:
+            # Not modified. Checked first: httpx raises on any non-2xx status
+            return NotModifiedFile(modified_at=last_modified, reason="304 http code")
+        response.raise_for_status()
+
+        modified_at = _get_modified_at(last_modified, response.headers)
+        tag = response.headers.get("etag")
+        content_type = response.headers.get("content-type")
+
+        if pager:
+            data_path, pager_fn = pager
+            data = []
+            while True:
+                await response.aread()
+                current_page_data = response.json()
+                data.extend(current_page_data[data_path])
+                next_url = pager_fn(url, current_page_data)
+                if not next_url:
+                    break
+                await response.aclose()
+                response = await _get_async(client, next_url, headers, http_kwargs)
+
+            result = _paged_stream(data_path, data, tag, current_file, last_modified)
+            if isinstance(result, NotModifiedFile):
+                return result
+            stream, tag, content_length = result
+            return _build_draft_file(
+                stream,
+                tag,
+                modified_at,
+                content_type,
+                file_attributes,
+                content_length=content_length,
+            )
+
         raw_stream = BufferedStream()
         hasher = sha1()
-        for chunk in response.iter_content(chunk_size=1024 * 1024):
+        async for chunk in response.aiter_bytes(chunk_size=1024 * 1024):
             hasher.update(chunk)
             raw_stream.write(chunk)
+    finally:
+        await response.aclose()
 
-        if not tag:
-            tag = hasher.hexdigest()
+    if not tag:
+        tag = hasher.hexdigest()
 
-        if current_file and current_file.tag == tag:
-            return NotModifiedFile(
-                modified_at=last_modified, reason="tag matched current_file"
-            )
-
-        raw_stream.seek(0)
-        content_compression_method = detect_compression(raw_stream)
-        if content_compression_method == "gzip":
-            content_length = gzip_uncompressed_size(raw_stream)
-        else:
-            raw_stream.seek(0, 2)
-            content_length = raw_stream.tell()
-            raw_stream.seek(0)
-        stream = raw_stream
+    if current_file and current_file.tag == tag:
+        return NotModifiedFile(
+            modified_at=last_modified, reason="tag matched current_file"
+        )
 
-    return DraftFile(
-        created_at=utcnow(),
-        modified_at=modified_at,
-        tag=tag,
-        size=content_length,
-        content_type=response.headers.get("content-type"),
-        content_compression_method=content_compression_method,
-        stream=stream,
-        **file_attributes,
+    return _build_draft_file(
+        raw_stream, tag, modified_at, content_type, file_attributes
     )
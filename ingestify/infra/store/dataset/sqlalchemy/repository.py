@@ -3,6 +3,7 @@ import itertools
 import json
 import logging
 import uuid
+from datetime import datetime
 from typing import Optional, Union, List
 
 from sqlalchemy import (
@@ -15,43 +16,115 @@ from sqlalchemy import (
     literal,
     select,
     and_,
+    or_,
+    tuple_,
     Dialect,
     values,
     CTE,
     column as sqlalchemy_column,
     Integer,
     String,
+    Text,
+    bindparam,
+    cast,
+    literal_column,
+    inspect as sqlalchemy_inspect,
 )
 from sqlalchemy.engine import make_url
-from sqlalchemy.exc import NoSuchModuleError
+from sqlalchemy.exc import IntegrityError, NoSuchModuleError
 from sqlalchemy.orm import Session, Query, sessionmaker, scoped_session
 
 from ingestify.domain import File, Revision
 from ingestify.domain.models.dataset.dataset_repository import RunLock
-from ingestify.domain.models.dataset.revision import RevisionState
+from ingestify.domain.models.dataset.revision import (
+    RevisionSource,
+    RevisionState,
+    SourceType,
+)
 from ingestify.domain.models import (
     Dataset,
     DatasetCollection,
+    DatasetCursor,
     DatasetRepository,
     DatasetState,
+    Identifier,
     Selector,
 )
 from ingestify.domain.models.dataset.collection_metadata import (
     DatasetCollectionMetadata,
 )
-from ingestify.domain.models.dataset.dataset import (
-    DatasetSummary,
-    DatasetSummaryMap,
-)
+from ingestify.domain.models.dataset.blob import Blob
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
 from ingestify.domain.models.ingestion.ingestion_job_summary import IngestionJobSummary
 from ingestify.domain.models.task.task_summary import TaskSummary, TaskState
 from ingestify.exceptions import IngestifyError
-from ingestify.utils import get_concurrency, key_from_dict
+from ingestify.utils import get_concurrency, key_from_dict, utcnow
 
 from .tables import get_tables
 
 logger = logging.getLogger(__name__)
 
+# SQLite allows 32766 bound parameters per statement, PostgreSQL 65535
+MAX_BIND_PARAMETERS = 30000
+
+IDENTIFIER_KEY_LENGTH = 255
+
+# Columns of the dataset table pointing at the latest revision
+HEAD_REVISION_COLUMNS = (
+    "current_revision_id",
+    "current_revision_state",
+    "current_revision_created_at",
+)
+
+# Length of the generated string columns of identifier_index keys on MySQL
+IDENTIFIER_VALUE_LENGTH = 255
+
+
+def get_identifier_key(identifier: dict) -> str:
+    """The Identifier.key as stored in the identifier_key column. Keys that don't
+    fit in the column are replaced by their hash."""
+    key = key_from_dict(identifier)
+    if len(key) > IDENTIFIER_KEY_LENGTH:
+        return "sha1:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return key
+
+
+def identifier_value(dialect_name: str, identifier, key: str, key_type: str):
+    """Expression for the value of `key` in the identifier JSON column on SQLite
+    and MySQL, cast to the declared `key_type`.
+
+    The JSON path is rendered inline: the expression has to be identical to the
+    one of the index created by `create_identifier_indexes` to be able to use it."""
+    path = _json_path(key)
+    if dialect_name == "mysql":
+        value = func.json_unquote(func.json_extract(identifier, path))
+        if key_type == "int":
+            return cast(value, Integer)
+        # The generated column is a VARCHAR, see `create_identifier_indexes`
+        return func.left(value, IDENTIFIER_VALUE_LENGTH)
+
+    value = func.json_extract(identifier, path)
+    return cast(value, Integer if key_type == "int" else Text)
+
+
+def _json_path(key: str):
+    return literal_column("'$.{}'".format(key.replace("'", "''")))
+
+
+def get_identifier_column_name(key: str, key_type: str) -> str:
+    """Name of the generated column that holds an identifier value (MySQL)"""
+    return f"identifier_{key_type}_{key}"
+
+
+def _index_keys(config: dict) -> list[dict]:
+    """The keys of an index config as {name, key_type} dicts"""
+    return [
+        {"name": key["name"], "key_type": key.get("key_type") or "str"}
+        if isinstance(key, dict)
+        else {"name": key, "key_type": "str"}
+        for key in config["keys"]
+    ]
+
 
 def parse_value(v):
     try:
@@ -60,6 +133,19 @@ def parse_value(v):
         return v
 
 
+def is_int_value(v) -> bool:
+    """Whether `v` is an int, or a string int() accepts"""
+    if isinstance(v, int):
+        return not isinstance(v, bool)
+    if not isinstance(v, str):
+        return False
+    try:
+        int(v)
+    except ValueError:
+        return False
+    return True
+
+
 def isfloat(x):
     try:
         a = float(x)
@@ -121,6 +207,10 @@ class SqlAlchemySessionProvider:
         self.ingestion_job_summary_table = tables["ingestion_job_summary_table"]
         self.task_summary_table = tables["task_summary_table"]
         self.store_version_table = tables["store_version_table"]
+        self.blob_table = tables["blob_table"]
+
+        # Loaded on first use, see get_identifier_columns
+        self._identifier_columns = None
 
     def __getstate__(self):
         return {"url": self.url, "table_prefix": self.table_prefix}
@@ -139,6 +229,8 @@ class SqlAlchemySessionProvider:
 
         # Create all tables in the database
         self.create_all_tables()
+        self.migrate_identifier_key()
+        self.migrate_head_revision()
 
     def __del__(self):
         self.close()
@@ -154,8 +246,152 @@ class SqlAlchemySessionProvider:
     def create_all_tables(self):
         self.metadata.create_all(self.engine)
 
+    def migrate_identifier_key(self):
+        """Add and backfill the identifier_key column on stores created before
+        the column existed. Its unique index is created by `create_table_indexes`."""
+        table = self.dataset_table
+        columns = sqlalchemy_inspect(self.engine).get_columns(table.name)
+        if "identifier_key" in {column["name"] for column in columns}:
+            return
+
+        logger.info(f"Adding identifier_key column to {table.name}")
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"ALTER TABLE {table.name} "
+                    f"ADD COLUMN identifier_key VARCHAR({IDENTIFIER_KEY_LENGTH})"
+                )
+            )
+            self.backfill_identifier_keys(connection)
+
+    def migrate_head_revision(self):
+        """Add and backfill the current_revision_* columns on stores created
+        before they existed."""
+        table = self.dataset_table
+        existing = {
+            column["name"]
+            for column in sqlalchemy_inspect(self.engine).get_columns(table.name)
+        }
+        missing = [
+            column
+            for column in (
+                table.c.current_revision_id,
+                table.c.current_revision_state,
+                table.c.current_revision_created_at,
+            )
+            if column.name not in existing
+        ]
+        if not missing:
+            return
+
+        logger.info(f"Adding current revision columns to {table.name}")
+        with self.engine.begin() as connection:
+            for column in missing:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                        f"{column.type.compile(dialect=self.dialect)}"
+                    )
+                )
+            self.backfill_head_revisions(connection)
+
+    def backfill_head_revisions(self, connection: Connection):
+        ds = self.dataset_table
+        rev = self.revision_table
+        connection.execute(
+            ds.update().values(
+                current_revision_id=select(func.max(rev.c.revision_id))
+                .where(rev.c.dataset_id == ds.c.dataset_id)
+                .scalar_subquery()
+            )
+        )
+        latest_revision = and_(
+            rev.c.dataset_id == ds.c.dataset_id,
+            rev.c.revision_id == ds.c.current_revision_id,
+        )
+        connection.execute(
+            ds.update()
+            .where(ds.c.current_revision_id.is_not(None))
+            .values(
+                current_revision_state=select(rev.c.state)
+                .where(latest_revision)
+                .scalar_subquery(),
+                current_revision_created_at=select(rev.c.created_at)
+                .where(latest_revision)
+                .scalar_subquery(),
+            )
+        )
+        logger.info(f"Backfilled current revision columns of {ds.name}")
+
+    def backfill_identifier_keys(self, connection: Connection, batch_size: int = 1000):
+        table = self.dataset_table
+        rows = connection.execute(
+            select(table.c.dataset_id, table.c.identifier).where(
+                table.c.identifier_key.is_(None)
+            )
+        ).all()
+
+        update = (
+            table.update()
+            .where(table.c.dataset_id == bindparam("_dataset_id"))
+            .values(identifier_key=bindparam("_identifier_key"))
+        )
+        for i in range(0, len(rows), batch_size):
+            connection.execute(
+                update,
+                [
+                    {
+                        "_dataset_id": row.dataset_id,
+                        "_identifier_key": get_identifier_key(row.identifier),
+                    }
+                    for row in rows[i : i + batch_size]
+                ],
+            )
+        logger.info(f"Backfilled identifier_key of {len(rows)} datasets")
+
+    def create_table_indexes(self):
+        """Create the indexes of the tables that don't exist yet. `create_all`
+        only creates indexes together with a new table, so indexes added in a
+        later version are missing on existing databases."""
+        for table in self.metadata.tables.values():
+            for index in table.indexes:
+                try:
+                    index.create(self.engine, checkfirst=True)
+                except IntegrityError as e:
+                    # A unique index on a store that already holds duplicates
+                    logger.error(
+                        f"Could not create unique index {index.name}: the table "
+                        f"contains duplicate rows. Remove them and run again. {e}"
+                    )
+
     def create_identifier_indexes(self, index_configs: list[dict]):
-        """Create partial expression indexes on identifier JSONB keys (Postgres only).
+        """Create indexes on the identifier keys of dataset types.
+
+        Each entry in index_configs should have:
+            - name: a label used in the index name (typically provider_dataset_type)
+            - provider: provider value to match in the partial index predicate
+            - dataset_type: dataset_type value to match in the partial index predicate
+            - keys: list of identifier key dicts {name, key_type} to index
+
+        PostgreSQL gets partial expression indexes on the JSONB keys, SQLite
+        expression indexes and MySQL indexes on generated columns. The values are
+        cast to the declared key_type, the same way `_filter_query` does.
+
+        Call this explicitly (e.g. via `ingestify sync-indexes`) when datasets
+        have high-cardinality identifiers that are queried frequently.
+        """
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            self._create_postgresql_identifier_indexes(index_configs)
+        elif dialect == "sqlite":
+            self._create_sqlite_identifier_indexes(index_configs)
+        elif dialect == "mysql":
+            self._create_mysql_identifier_indexes(index_configs)
+        else:
+            logger.info(f"Skipping identifier indexes: not supported on {dialect}")
+
+    def _create_postgresql_identifier_indexes(self, index_configs: list[dict]):
+        """Create partial expression indexes on identifier JSONB keys.
 
         Each entry in index_configs should have:
             - name: a label used in the index name (typically provider_dataset_type)
@@ -180,13 +416,7 @@ class SqlAlchemySessionProvider:
         planner the real cardinality so it chooses the index plan on its own. Statistics
         only take effect after ANALYZE, which this runs once at the end.
 
-        Call this explicitly (e.g. via `ingestify sync-indexes`) when datasets
-        have high-cardinality identifiers that are queried frequently.
         """
-        if self.engine.dialect.name != "postgresql":
-            logger.info("Skipping identifier indexes: not a PostgreSQL database")
-            return
-
         table_name = f"{self.table_prefix}dataset"
         with self.engine.connect() as conn:
             # Expression statistics (CREATE STATISTICS ... ON (<expr>)) need PostgreSQL 14+.
@@ -237,6 +467,127 @@ class SqlAlchemySessionProvider:
                 )
                 conn.execute(text(f"ANALYZE {table_name}"))
 
+    def _create_sqlite_identifier_indexes(self, index_configs: list[dict]):
+        """Create expression indexes on the identifier keys:
+
+            CREATE INDEX IF NOT EXISTS idx_dataset_identifier_<name>
+            ON dataset (provider, dataset_type,
+                        CAST(json_extract(identifier, '$.key1') AS TEXT), ...)
+
+        SQLite only uses a partial index when the query contains the same
+        literal values, and ours are bound parameters. Instead provider and
+        dataset_type are the leading columns of the index.
+        """
+        table_name = f"{self.table_prefix}dataset"
+        identifier = sqlalchemy_column("identifier")
+        with self.engine.begin() as conn:
+            for config in index_configs:
+                index_name = (
+                    f"{self.table_prefix}idx_dataset_identifier_{config['name']}"
+                )
+                expressions = ", ".join(
+                    str(
+                        identifier_value(
+                            "sqlite", identifier, key["name"], key["key_type"]
+                        ).compile(
+                            dialect=self.dialect,
+                            compile_kwargs={"literal_binds": True},
+                        )
+                    )
+                    for key in _index_keys(config)
+                )
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} "
+                        f"ON {table_name} (provider, dataset_type, {expressions})"
+                    )
+                )
+                logger.info("Created index %s on keys: %s", index_name, config["keys"])
+
+            if index_configs:
+                # Without statistics the planner prefers the (bucket, provider,
+                # dataset_type, ...) indexes and joins the identifiers afterwards
+                logger.info("Analyzing %s", table_name)
+                conn.execute(text(f"ANALYZE {table_name}"))
+
+    def _create_mysql_identifier_indexes(self, index_configs: list[dict]):
+        """Create a VIRTUAL generated column per identifier key and an index on them:
+
+            ALTER TABLE dataset ADD COLUMN identifier_str_key1 VARCHAR(255)
+            AS (LEFT(JSON_UNQUOTE(JSON_EXTRACT(identifier, '$.key1')), 255)) VIRTUAL;
+            CREATE INDEX idx_dataset_identifier_<name>
+            ON dataset (provider, dataset_type, identifier_str_key1, ...);
+
+        Adding a virtual column doesn't rebuild the table, the values are only
+        stored in the index. `_filter_query` compares against these columns.
+        """
+        table_name = f"{self.table_prefix}dataset"
+        identifier = sqlalchemy_column("identifier")
+        inspector = sqlalchemy_inspect(self.engine)
+        existing_columns = {
+            column["name"] for column in inspector.get_columns(table_name)
+        }
+        existing_indexes = {
+            index["name"] for index in inspector.get_indexes(table_name)
+        }
+
+        with self.engine.begin() as conn:
+            for config in index_configs:
+                column_names = []
+                for key in _index_keys(config):
+                    column_name = get_identifier_column_name(
+                        key["name"], key["key_type"]
+                    )
+                    column_names.append(column_name)
+                    if column_name in existing_columns:
+                        continue
+
+                    expression = identifier_value(
+                        "mysql", identifier, key["name"], key["key_type"]
+                    ).compile(
+                        dialect=self.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    column_type = (
+                        "BIGINT"
+                        if key["key_type"] == "int"
+                        else f"VARCHAR({IDENTIFIER_VALUE_LENGTH})"
+                    )
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {table_name} ADD COLUMN {column_name} "
+                            f"{column_type} AS ({expression}) VIRTUAL"
+                        )
+                    )
+                    existing_columns.add(column_name)
+                    logger.info("Added generated column %s", column_name)
+
+                index_name = (
+                    f"{self.table_prefix}idx_dataset_identifier_{config['name']}"
+                )
+                if index_name in existing_indexes:
+                    continue
+                conn.execute(
+                    text(
+                        f"CREATE INDEX {index_name} ON {table_name} "
+                        f"(provider, dataset_type, {', '.join(column_names)})"
+                    )
+                )
+                logger.info("Created index %s on keys: %s", index_name, config["keys"])
+
+        self._identifier_columns = existing_columns
+
+    def get_identifier_columns(self) -> set[str]:
+        """Names of the columns of the dataset table, including the generated
+        identifier columns created by `create_identifier_indexes` (MySQL)."""
+        if self._identifier_columns is None:
+            self._identifier_columns = {
+                column["name"]
+                for column in sqlalchemy_inspect(self.engine).get_columns(
+                    self.dataset_table.name
+                )
+            }
+        return self._identifier_columns
+
     def drop_all_tables(self):
         """Drop all tables in the database. Useful for test cleanup."""
         if hasattr(self, "metadata") and hasattr(self, "engine"):
@@ -276,10 +627,20 @@ class _SessionRunLock(RunLock):
 
 class SqlAlchemyDatasetRepository(DatasetRepository):
     def __init__(
-        self, session_provider: SqlAlchemySessionProvider, identifier_transformer=None
+        self,
+        session_provider: SqlAlchemySessionProvider,
+        identifier_transformer=None,
+        lookup_strategy: str = "array",
     ):
+        """`lookup_strategy` decides how lists of values (dataset ids, selectors)
+        are sent to the database: "array" binds them as a single parameter, "cte"
+        inlines them in the SQL as a VALUES/UNION ALL table."""
+        if lookup_strategy not in ("array", "cte"):
+            raise ValueError(f"Unknown lookup strategy: {lookup_strategy}")
+
         self.session_provider = session_provider
         self._identifier_transformer = identifier_transformer
+        self.lookup_strategy = lookup_strategy
 
     def create_identifier_indexes(self, index_configs: list[dict]):
         self.session_provider.create_identifier_indexes(index_configs)
@@ -292,6 +653,13 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
     def dialect(self) -> Dialect:
         return self.session_provider.dialect
 
+    def create_table_indexes(self):
+        self.session_provider.create_table_indexes()
+
+    def release_thread_resources(self):
+        # Return the session (and its connection) of this thread to the pool
+        self.session_provider.session.remove()
+
     def acquire_run_lock(self, job_key: str) -> Optional[RunLock]:
         dialect = self.dialect.name
         if dialect not in ("postgresql", "mysql"):
@@ -353,13 +721,20 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
     def store_version_table(self):
         return self.session_provider.store_version_table
 
+    @property
+    def blob_table(self):
+        return self.session_provider.blob_table
+
     def _upsert(
         self,
         connection: Connection,
         table: Table,
         entities: list[dict],
         immutable_rows: bool = False,
+        keep_existing: tuple[str, ...] = (),
     ):
+        """Insert or update `entities`. The columns in `keep_existing` keep their
+        stored value when the entity holds None for them."""
         if not entities:
             # Nothing to do
             return
@@ -374,6 +749,28 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
         else:
             raise IngestifyError(f"Don't know how to do an upsert in {dialect}")
 
+        # Stay below the maximum number of bound parameters of a statement
+        chunk_size = max(1, MAX_BIND_PARAMETERS // len(table.columns))
+        for i in range(0, len(entities), chunk_size):
+            self._upsert_chunk(
+                connection,
+                table,
+                entities[i : i + chunk_size],
+                immutable_rows,
+                keep_existing,
+                insert,
+            )
+
+    def _upsert_chunk(
+        self,
+        connection: Connection,
+        table: Table,
+        entities: list[dict],
+        immutable_rows: bool,
+        keep_existing: tuple[str, ...],
+        insert,
+    ):
+        dialect = self.dialect.name
         stmt = insert(table).values(entities)
 
         primary_key_columns = [column for column in table.columns if column.primary_key]
@@ -390,6 +787,8 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                     for name, column in table.columns.items()
                     if column not in primary_key_columns
                 }
+                for name in keep_existing:
+                    set_[name] = func.coalesce(stmt.inserted[name], table.c[name])
                 stmt = stmt.on_duplicate_key_update(set_)
         else:
             # PostgreSQL and SQLite use ON CONFLICT syntax
@@ -401,6 +800,8 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                     for name, column in table.columns.items()
                     if column not in primary_key_columns
                 }
+                for name in keep_existing:
+                    set_[name] = func.coalesce(stmt.excluded[name], table.c[name])
 
                 stmt = stmt.on_conflict_do_update(
                     index_elements=primary_key_columns, set_=set_
@@ -424,25 +825,141 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
             ]
         ).cte(name)
 
+    @staticmethod
+    def _record_columns(records: list[dict]) -> list:
+        """A column per key of the records: Integer when all its values are
+        ints, String otherwise"""
+        columns = []
+        for key in records[0].keys():
+            if all(
+                isinstance(record[key], int) and not isinstance(record[key], bool)
+                for record in records
+            ):
+                columns.append(sqlalchemy_column(key, Integer))
+            else:
+                columns.append(sqlalchemy_column(key, String))
+        return columns
+
+    def _build_array_cte(self, records: list[dict], name: str) -> CTE:
+        """Build a CTE from a list of dictionaries, passed as bound parameters.
+
+        The records are sent as one array per column (PostgreSQL) or as a single
+        JSON document (SQLite, MySQL), so the SQL text doesn't depend on the
+        records. Batches of lookups then share the compiled statement and the
+        database's query plan."""
+        dialect = self.dialect.name
+        keys = list(records[0].keys())
+        columns = self._record_columns(records)
+
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import ARRAY
+
+            arrays = []
+            for column in columns:
+                values_ = [record[column.name] for record in records]
+                if not isinstance(column.type, Integer):
+                    values_ = [None if v is None else str(v) for v in values_]
+                arrays.append(
+                    bindparam(
+                        f"{name}_{column.name}", values_, type_=ARRAY(column.type)
+                    )
+                )
+            rows = (
+                func.unnest(*arrays)
+                .table_valued(*columns)
+                .render_derived(name=f"{name}_rows")
+            )
+            return select(*(rows.c[key] for key in keys)).cte(name)
+
+        payload = bindparam(f"{name}_payload", json.dumps(records, default=str))
+        if dialect == "sqlite":
+            rows = func.json_each(payload).table_valued("value")
+            # The casts give the columns an affinity, so SQLite can compare
+            # them with (and build an automatic index for) typed expressions
+            cte = select(
+                *(
+                    cast(
+                        func.json_extract(rows.c.value, f'$."{column.name}"'),
+                        Integer if isinstance(column.type, Integer) else Text,
+                    ).label(column.name)
+                    for column in columns
+                )
+            ).cte(name)
+            if self.dialect.dbapi.sqlite_version_info >= (3, 35, 0):
+                # Otherwise SQLite inlines the CTE and parses the JSON again
+                # for every dataset row it joins against
+                cte = cte.prefix_with("MATERIALIZED")
+            return cte
+        elif dialect == "mysql":
+            json_columns = ", ".join(
+                f"`{column.name}` "
+                f"{'BIGINT' if isinstance(column.type, Integer) else 'VARCHAR(255)'} "
+                f"PATH '$.\"{column.name}\"'"
+                for column in columns
+            )
+            return (
+                text(
+                    f"SELECT * FROM JSON_TABLE(:{name}_payload, '$[*]' "
+                    f"COLUMNS ({json_columns})) AS {name}_rows"
+                )
+                .bindparams(payload)
+                .columns(*columns)
+                .cte(name)
+            )
+        raise IngestifyError(f"Don't know how to pass an array in {dialect}")
+
     def _build_cte(self, records: list[dict], name: str) -> CTE:
         """Build a CTE from a list of dictionaries."""
+        if self.lookup_strategy == "array":
+            return self._build_array_cte(records, name)
 
         if self.dialect.name in ("sqlite", "mysql"):
             # SQLite and MySQL don't support VALUES syntax, use UNION ALL instead
             return self._build_cte_sqlite(records, name)
 
-        first_row = records[0]
-        columns = []
-        for key, value in first_row.items():
-            columns.append(
-                sqlalchemy_column(key, Integer if isinstance(value, int) else String)
-            )
+        columns = self._record_columns(records)
 
         # Prepare the data in tuples, in same order as columns
-        data = [tuple(record[column.name] for column in columns) for record in records]
+        data = [
+            tuple(
+                record[column.name]
+                if isinstance(column.type, Integer) or record[column.name] is None
+                else str(record[column.name])
+                for column in columns
+            )
+            for record in records
+        ]
 
         return select(values(*columns, name=name).data(data)).cte(name)
 
+    def _identifier_conditions(self, key: str, key_type: str, value) -> list:
+        """Conditions comparing identifier key `key` with `value` on SQLite and
+        MySQL, written so they can use the indexes of `create_identifier_indexes`."""
+        dialect = self.dialect.name
+        expression = identifier_value(
+            dialect, self.dataset_table.c.identifier, key, key_type
+        )
+        if dialect != "mysql":
+            return [expression == value]
+
+        if key_type != "int":
+            # Compare the VARCHAR with the complete value as well
+            full_value = func.json_unquote(
+                func.json_extract(self.dataset_table.c.identifier, _json_path(key))
+            )
+            conditions = [full_value == value]
+            value = func.left(value, IDENTIFIER_VALUE_LENGTH)
+        else:
+            conditions = []
+
+        column_name = get_identifier_column_name(key, key_type)
+        if column_name in self.session_provider.get_identifier_columns():
+            expression = literal_column(
+                f"{self.dataset_table.name}.{column_name}",
+                Integer if key_type == "int" else String,
+            )
+        return [expression == value] + conditions
+
     def _filter_query(
         self,
         query,
@@ -452,6 +969,7 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
         dataset_id: Optional[Union[str, List[str]]] = None,
         selector: Optional[Union[Selector, List[Selector]]] = None,
         dataset_state: Optional[List[DatasetState]] = None,
+        identifiers: Optional[List[Identifier]] = None,
     ):
         if dataset_id is not None:
             if isinstance(dataset_id, list):
@@ -474,9 +992,28 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
             else:
                 query = query.filter(self.dataset_table.c.dataset_id == dataset_id)
 
+        if identifiers:
+            # Exact identifiers: an indexed join on the identifier_key column
+            identifier_keys_cte = self._build_cte(
+                [
+                    {"identifier_key": identifier_key}
+                    for identifier_key in {
+                        get_identifier_key(identifier) for identifier in identifiers
+                    }
+                ],
+                "identifier_keys",
+            )
+            query = query.select_from(
+                self.dataset_table.join(
+                    identifier_keys_cte,
+                    identifier_keys_cte.c.identifier_key
+                    == self.dataset_table.c.identifier_key,
+                )
+            )
+
         dialect = self.dialect.name
 
-        if not isinstance(selector, list):
+        if selector is not None and not isinstance(selector, list):
             where, selector = selector.split("where")
         else:
             where = None
@@ -494,39 +1031,59 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
             keys = list(first_selector.keys())
 
             if keys:
-                attribute_cte = self._build_cte(
-                    [selector.filtered_attributes for selector in selectors],
-                    "attributes",
-                )
+                records = [selector.filtered_attributes for selector in selectors]
+
+                # Use declared key_type when available so the cast matches
+                # the expression index created by sync-indexes.
+                # Fall back to inferring from the runtime value types. Keys
+                # with values that aren't all integers are compared as text.
+                key_types = {}
+                for k in keys:
+                    declared_type = (
+                        self._identifier_transformer.get_key_type(
+                            provider, dataset_type, k
+                        )
+                        if self._identifier_transformer
+                        else None
+                    )
+                    values_ = [record[k] for record in records]
+                    if declared_type == "int":
+                        is_int = all(is_int_value(v) for v in values_)
+                    else:
+                        is_int = declared_type is None and all(
+                            isinstance(v, int) and not isinstance(v, bool)
+                            for v in values_
+                        )
+                    key_types[k] = "int" if is_int else "str"
+
+                # Convert the values instead of casting them in SQL: SQLite
+                # can only build an automatic index on plain CTE columns. The
+                # CTE columns then also have the type the join compares with.
+                records = [
+                    {
+                        k: (int if key_types[k] == "int" else str)(record[k])
+                        for k in keys
+                    }
+                    for record in records
+                ]
+                attribute_cte = self._build_cte(records, "attributes")
 
                 join_conditions = []
                 for k in keys:
                     if dialect == "postgresql":
                         column = self.dataset_table.c.identifier[k]
-
-                        # Use declared key_type when available so the cast matches
-                        # the expression index created by sync-indexes.
-                        # Fall back to inferring from the runtime value type.
-                        declared_type = (
-                            self._identifier_transformer.get_key_type(
-                                provider, dataset_type, k
-                            )
-                            if self._identifier_transformer
-                            else None
-                        )
-                        if declared_type == "int" or (
-                            declared_type is None and isinstance(first_selector[k], int)
-                        ):
+                        if key_types[k] == "int":
                             column = column.as_integer()
                         else:
                             column = column.as_string()
+                        join_conditions.append(attribute_cte.c[k] == column)
                     else:
-                        column = func.json_extract(
-                            self.dataset_table.c.identifier, f"$.{k}"
+                        join_conditions.extend(
+                            self._identifier_conditions(
+                                k, key_types[k], attribute_cte.c[k]
+                            )
                         )
 
-                    join_conditions.append(attribute_cte.c[k] == column)
-
                 query = query.select_from(
                     self.dataset_table.join(attribute_cte, and_(*join_conditions))
                 )
@@ -544,7 +1101,9 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
 
         return query
 
-    def _load_datasets(self, dataset_ids: list[str]) -> list[Dataset]:
+    def _load_datasets(
+        self, dataset_ids: list[str], revisions: str = "all"
+    ) -> list[Dataset]:
         if not dataset_ids:
             return []
 
@@ -561,6 +1120,24 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                 )
             )
         )
+        if revisions == "current":
+            revisions_per_dataset = self._load_current_revisions(dataset_ids_cte)
+        else:
+            revisions_per_dataset = self._load_all_revisions(dataset_ids_cte)
+
+        datasets = []
+        for dataset_row in dataset_rows:
+            dataset = Dataset.model_validate(
+                {
+                    **dataset_row._mapping,
+                    "revisions": revisions_per_dataset.get(dataset_row.dataset_id, []),
+                }
+            )
+            dataset.mark_saved()
+            datasets.append(dataset)
+        return datasets
+
+    def _load_all_revisions(self, dataset_ids_cte: CTE) -> dict[str, list[Revision]]:
         revisions_per_dataset = {}
         rows = (
             self.session.query(self.revision_table)
@@ -597,11 +1174,10 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
         ):
             files_per_revision[(dataset_id, revision_id)] = list(files)
 
-        datasets = []
-        for dataset_row in dataset_rows:
-            dataset_id = dataset_row.dataset_id
+        result = {}
+        for dataset_id, revision_rows in revisions_per_dataset.items():
             revisions = []
-            for revision_row in revisions_per_dataset.get(dataset_id, []):
+            for revision_row in revision_rows:
                 files = [
                     File.model_validate(file_row)
                     for file_row in files_per_revision.get(
@@ -612,11 +1188,130 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                     {**revision_row._mapping, "modified_files": files}
                 )
                 revisions.append(revision)
+            result[dataset_id] = revisions
+        return result
+
+    def _load_current_revisions(
+        self, dataset_ids_cte: CTE
+    ) -> dict[str, list[Revision]]:
+        """Load one revision per dataset holding the newest version of every
+        file, like `Dataset.current_revision` squashes the full history. Only
+        the latest revision row and the latest row per file are transferred."""
+        revision_table = self.revision_table
+        file_table = self.file_table
+
+        latest_revisions = (
+            select(
+                revision_table.c.dataset_id,
+                func.max(revision_table.c.revision_id).label("revision_id"),
+            )
+            .select_from(
+                revision_table.join(
+                    dataset_ids_cte,
+                    dataset_ids_cte.c.dataset_id == revision_table.c.dataset_id,
+                )
+            )
+            .group_by(revision_table.c.dataset_id)
+            .subquery("latest_revisions")
+        )
+        revision_rows = self.session.query(revision_table).select_from(
+            revision_table.join(
+                latest_revisions,
+                and_(
+                    latest_revisions.c.dataset_id == revision_table.c.dataset_id,
+                    latest_revisions.c.revision_id == revision_table.c.revision_id,
+                ),
+            )
+        )
 
-            datasets.append(
-                Dataset.model_validate({**dataset_row._mapping, "revisions": revisions})
+        latest_files = (
+            select(
+                file_table.c.dataset_id,
+                file_table.c.file_id,
+                func.max(file_table.c.revision_id).label("revision_id"),
             )
-        return datasets
+            .select_from(
+                file_table.join(
+                    dataset_ids_cte,
+                    dataset_ids_cte.c.dataset_id == file_table.c.dataset_id,
+                )
+            )
+            .group_by(file_table.c.dataset_id, file_table.c.file_id)
+            .subquery("latest_files")
+        )
+        file_rows = (
+            self.session.query(
+                file_table, revision_table.c.state.label("revision_state")
+            )
+            .select_from(
+                file_table.join(
+                    latest_files,
+                    and_(
+                        latest_files.c.dataset_id == file_table.c.dataset_id,
+                        latest_files.c.file_id == file_table.c.file_id,
+                        latest_files.c.revision_id == file_table.c.revision_id,
+                    ),
+                ).join(
+                    revision_table,
+                    and_(
+                        revision_table.c.dataset_id == file_table.c.dataset_id,
+                        revision_table.c.revision_id == file_table.c.revision_id,
+                    ),
+                )
+            )
+            .order_by(file_table.c.dataset_id, file_table.c.file_id)
+        )
+
+        files_per_dataset = {}
+        for dataset_id, rows in itertools.groupby(
+            file_rows, key=lambda row: row.dataset_id
+        ):
+            files_per_dataset[dataset_id] = list(rows)
+
+        result = {}
+        for revision_row in revision_rows:
+            dataset_id = revision_row.dataset_id
+            rows = files_per_dataset.get(dataset_id, [])
+            files = [File.model_validate(row) for row in rows]
+            if revision_row.revision_id == 0:
+                # A single revision doesn't need squashing
+                revision = Revision.model_validate(
+                    {**revision_row._mapping, "modified_files": files}
+                )
+            else:
+                # Same state derivation as Dataset.current_revision: a current
+                # file from a VALIDATION_FAILED revision invalidates the dataset
+                revision = Revision(
+                    revision_id=revision_row.revision_id,
+                    created_at=revision_row.created_at,
+                    description="Squashed revision",
+                    is_squashed=True,
+                    state=RevisionState.VALIDATION_FAILED
+                    if any(
+                        row.revision_state == RevisionState.VALIDATION_FAILED
+                        for row in rows
+                    )
+                    else revision_row.state,
+                    modified_files=files,
+                    source=RevisionSource(
+                        source_type=SourceType.SQUASHED, source_id=""
+                    ),
+                )
+            result[dataset_id] = [revision]
+        return result
+
+    def _after_cursor(self, cursor: DatasetCursor):
+        created_at = self.dataset_table.c.created_at
+        dataset_id = self.dataset_table.c.dataset_id
+        if self.dialect.name == "mysql":
+            # MySQL doesn't use an index for row value comparisons
+            return or_(
+                created_at > cursor.created_at,
+                and_(created_at == cursor.created_at, dataset_id > cursor.dataset_id),
+            )
+        return tuple_(created_at, dataset_id) > tuple_(
+            cursor.created_at, cursor.dataset_id
+        )
 
     def _debug_query(self, q: Query):
         text_ = q.statement.compile(
@@ -629,68 +1324,80 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
         bucket: str,
         provider: str,
         dataset_type: str,
+        selector: Optional[Selector] = None,
+        updated_since: Optional[datetime] = None,
+        summary_map: Optional[DatasetSummaryMap] = None,
     ) -> DatasetSummaryMap:
         with self.session:
             ds = self.dataset_table
-            rev = self.revision_table
-
-            # The current revision is the highest revision_id per dataset.
-            # Compute it as a grouped subquery (portable — no Postgres-only
-            # DISTINCT ON, no correlated subquery-in-join) restricted to this
-            # provider/dataset_type, then LEFT JOIN back to fetch its
-            # created_at/state. LEFT JOIN so datasets without any revision still
-            # show up (has_revisions=False).
-            latest = (
-                self.session.query(
-                    rev.c.dataset_id.label("dataset_id"),
-                    func.max(rev.c.revision_id).label("revision_id"),
-                )
-                .select_from(rev.join(ds, ds.c.dataset_id == rev.c.dataset_id))
-                .filter(ds.c.bucket == bucket)
-                .filter(ds.c.provider == provider)
-                .filter(ds.c.dataset_type == dataset_type)
-                .group_by(rev.c.dataset_id)
-                .subquery()
-            )
-            query = (
-                self.session.query(
-                    ds.c.identifier,
-                    ds.c.last_modified_at,
-                    latest.c.revision_id,
-                    rev.c.created_at,
-                    rev.c.state,
-                )
-                .select_from(
-                    ds.outerjoin(
-                        latest, latest.c.dataset_id == ds.c.dataset_id
-                    ).outerjoin(
-                        rev,
-                        and_(
-                            rev.c.dataset_id == latest.c.dataset_id,
-                            rev.c.revision_id == latest.c.revision_id,
-                        ),
-                    )
+
+            # The current revision is kept on the dataset row, so this is a
+            # scan of the (bucket, provider, dataset_type, ...) index, or of
+            # the identifier index for a selector
+            def query(*columns):
+                query_ = self._filter_query(
+                    self.session.query(
+                        *columns,
+                        ds.c.last_modified_at,
+                        ds.c.updated_at,
+                        ds.c.current_revision_id,
+                        ds.c.current_revision_created_at,
+                        ds.c.current_revision_state,
+                    ),
+                    bucket=bucket,
+                    provider=provider,
+                    dataset_type=dataset_type,
+                    selector=selector,
+                )
+                if updated_since is not None:
+                    query_ = query_.filter(ds.c.updated_at >= updated_since)
+                return query_
+
+            def add(key: str, row):
+                result.add(
+                    key,
+                    last_modified=row.last_modified_at,
+                    current_created_at=row.current_revision_created_at,
+                    current_state=row.current_revision_state,
+                    has_revisions=row.current_revision_id is not None,
+                    updated_at=row.updated_at,
                 )
-                .filter(ds.c.bucket == bucket)
-                .filter(ds.c.provider == provider)
-                .filter(ds.c.dataset_type == dataset_type)
+
+            # Build the map straight from the cursor. The identifier_key column
+            # holds Identifier.key, except for long keys that are hashed:
+            # only for those the identifier itself is decoded.
+            hashed_key = or_(
+                ds.c.identifier_key.is_(None), ds.c.identifier_key.startswith("sha1:")
             )
+            result = summary_map if summary_map is not None else DatasetSummaryMap()
+            for row in query(ds.c.identifier_key).filter(~hashed_key).yield_per(10_000):
+                add(row.identifier_key, row)
 
-            result: DatasetSummaryMap = {}
-            for row in query:
+            for row in query(ds.c.identifier).filter(hashed_key).yield_per(10_000):
                 identifier = (
                     row.identifier
                     if isinstance(row.identifier, dict)
                     else json.loads(row.identifier)
                 )
-                result[key_from_dict(identifier)] = DatasetSummary(
-                    last_modified=row.last_modified_at,
-                    current_created_at=row.created_at,
-                    current_state=row.state,
-                    has_revisions=row.revision_id is not None,
-                )
+                add(key_from_dict(identifier), row)
             return result
 
+    def count_datasets(
+        self,
+        bucket: str,
+        provider: str,
+        dataset_type: str,
+        selector: Optional[Selector] = None,
+    ) -> int:
+        with self.session:
+            return self._filter_query(
+                self.session.query(func.count(self.dataset_table.c.dataset_id)),
+                bucket=bucket,
+                provider=provider,
+                dataset_type=dataset_type,
+                selector=selector,
+            ).scalar()
+
     def get_dataset_collection(
         self,
         bucket: str,
@@ -702,7 +1409,13 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
         page: Optional[int] = None,
         page_size: Optional[int] = None,
         dataset_state: Optional[List[DatasetState]] = None,
+        after: Optional[DatasetCursor] = None,
+        revisions: str = "all",
+        identifiers: Optional[List[Identifier]] = None,
     ) -> DatasetCollection:
+        if revisions not in ("all", "current"):
+            raise ValueError(f"Unknown revisions mode: {revisions}")
+
         def apply_query_filter(query):
             return self._filter_query(
                 query,
@@ -712,25 +1425,49 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                 dataset_id=dataset_id,
                 selector=selector,
                 dataset_state=dataset_state,
+                identifiers=identifiers,
             )
 
         with self.session:
             # Use a contextmanager to make sure it's closed afterwards
 
             if not metadata_only:
-                # Apply sorting by created_at in ascending order
+                # Apply sorting by created_at in ascending order. The dataset_id
+                # makes the order stable for datasets created at the same time.
                 dataset_query = apply_query_filter(
-                    self.session.query(self.dataset_table.c.dataset_id)
-                ).order_by(self.dataset_table.c.created_at.asc())
+                    self.session.query(
+                        self.dataset_table.c.dataset_id,
+                        self.dataset_table.c.created_at,
+                    )
+                ).order_by(
+                    self.dataset_table.c.created_at.asc(),
+                    self.dataset_table.c.dataset_id.asc(),
+                )
 
+                if after is not None:
+                    # Keyset pagination: seek past the cursor using the
+                    # (bucket, created_at, dataset_id) index
+                    dataset_query = dataset_query.filter(self._after_cursor(after))
+                    if page_size is not None:
+                        dataset_query = dataset_query.limit(page_size)
                 # Apply pagination if both page and page_size are provided
-                if page is not None and page_size is not None:
+                elif page is not None and page_size is not None:
                     offset = (page - 1) * page_size
                     dataset_query = dataset_query.offset(offset).limit(page_size)
 
                 self._debug_query(dataset_query)
-                dataset_ids = [row.dataset_id for row in dataset_query]
-                datasets = self._load_datasets(dataset_ids)
+                rows = list(dataset_query)
+                datasets_by_id = {
+                    dataset.dataset_id: dataset
+                    for dataset in self._load_datasets(
+                        [row.dataset_id for row in rows], revisions=revisions
+                    )
+                }
+                datasets = [
+                    datasets_by_id[row.dataset_id]
+                    for row in rows
+                    if row.dataset_id in datasets_by_id
+                ]
 
                 last_modified_values = [
                     dataset.last_modified_at
@@ -742,6 +1479,11 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                     if last_modified_values
                     else None,
                     row_count=len(datasets),
+                    next_cursor=DatasetCursor(
+                        created_at=rows[-1].created_at, dataset_id=rows[-1].dataset_id
+                    )
+                    if page_size is not None and rows and len(rows) == page_size
+                    else None,
                 )
             else:
                 datasets = []
@@ -774,21 +1516,49 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
 
         self._save([dataset])
 
+    def save_many(self, bucket: str, datasets: list[Dataset]):
+        for dataset in datasets:
+            dataset.bucket = bucket
+
+        self._save(datasets)
+
     def connect(self):
         return self.session_provider.engine.connect()
 
     def __del__(self):
-        self.session_provider.close()
+        # Not set when __init__ raised
+        session_provider = getattr(self, "session_provider", None)
+        if session_provider is not None:
+            session_provider.close()
 
     def _save(self, datasets: list[Dataset]):
-        """Only do upserts. Never delete. Rows get only deleted when an entire Dataset is removed."""
+        """Only do upserts. Never delete. Rows get only deleted when an entire Dataset is removed.
+
+        Revisions and files are immutable: only the revisions that are not stored
+        yet are written, next to the dataset row itself."""
         datasets_entities = []
         revision_entities = []
         file_entities = []
 
         for dataset in datasets:
-            datasets_entities.append(dataset.model_dump(exclude={"revisions"}))
-            for revision in dataset.revisions:
+            unsaved_revisions = dataset.unsaved_revisions
+            # Move the head pointer to the newest revision. Without new
+            # revisions the stored pointer is kept, see HEAD_REVISION_COLUMNS.
+            head = (
+                max(unsaved_revisions, key=lambda revision: revision.revision_id)
+                if unsaved_revisions
+                else None
+            )
+            datasets_entities.append(
+                {
+                    **dataset.model_dump(exclude={"revisions"}),
+                    "identifier_key": get_identifier_key(dataset.identifier),
+                    "current_revision_id": head.revision_id if head else None,
+                    "current_revision_state": head.state if head else None,
+                    "current_revision_created_at": head.created_at if head else None,
+                }
+            )
+            for revision in unsaved_revisions:
                 revision_entities.append(
                     {
                         **revision.model_dump(
@@ -808,7 +1578,12 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
 
         with self.connect() as connection:
             try:
-                self._upsert(connection, self.dataset_table, datasets_entities)
+                self._upsert(
+                    connection,
+                    self.dataset_table,
+                    datasets_entities,
+                    keep_existing=HEAD_REVISION_COLUMNS,
+                )
                 self._upsert(
                     connection,
                     self.revision_table,
@@ -824,6 +1599,9 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
             else:
                 connection.commit()
 
+        for dataset in datasets:
+            dataset.mark_saved()
+
     def invalidate_revision(self, dataset: Dataset):
         self.invalidate_revisions([dataset])
 
@@ -841,18 +1619,27 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
                 .values(state=RevisionState.VALIDATION_FAILED)
             )
             # Batch reset last_modified_at
+            now = utcnow()
             connection.execute(
                 self.dataset_table.update()
                 .where(self.dataset_table.c.dataset_id.in_(dataset_ids))
-                .values(last_modified_at=None)
+                .values(last_modified_at=None, updated_at=now)
+            )
+            connection.execute(
+                self.dataset_table.update()
+                .where(
+                    self.dataset_table.c.dataset_id.in_(dataset_ids),
+                    self.dataset_table.c.current_revision_id.is_not(None),
+                )
+                .values(current_revision_state=RevisionState.VALIDATION_FAILED)
             )
             connection.commit()
 
         # Update in-memory state
         for dataset in datasets:
-            if dataset.current_revision:
-                dataset.current_revision.state = RevisionState.VALIDATION_FAILED
+            dataset.set_revision_state(RevisionState.VALIDATION_FAILED)
             dataset.last_modified_at = None
+            dataset.updated_at = now
 
     def destroy(self, dataset: Dataset):
         with self.connect() as connection:
@@ -979,6 +1766,29 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
             )
         return ingestion_job_summaries
 
+    def get_blobs(self, bucket: str, content_hashes: list[str]) -> dict[str, Blob]:
+        if not content_hashes:
+            return {}
+
+        with self.session:
+            rows = self.session.query(self.blob_table).filter(
+                self.blob_table.c.bucket == bucket,
+                self.blob_table.c.content_hash.in_(content_hashes),
+            )
+            return {row.content_hash: Blob.model_validate(row) for row in rows}
+
+    def save_blobs(self, bucket: str, blobs: list[Blob]):
+        entities = [{"bucket": bucket, **blob.model_dump()} for blob in blobs]
+        with self.connect() as connection:
+            try:
+                # Another process may have stored the same content: keep the
+                # first one
+                self._upsert(connection, self.blob_table, entities, immutable_rows=True)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
     def get_store_version(self) -> Optional[str]:
         """Get the current Ingestify version stored for this store."""
         with self.session:
@@ -989,8 +1799,6 @@ class SqlAlchemyDatasetRepository(DatasetRepository):
 
     def set_store_version(self, version: str):
         """Set the Ingestify version for this store."""
-        from ingestify.utils import utcnow
-
         now = utcnow()
         entity = {
             "id": 1,
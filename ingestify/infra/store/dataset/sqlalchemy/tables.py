@@ -119,7 +119,9 @@ class RevisionStateString(TypeDecorator):
     cache_ok = True
     impl = String(255)
 
-    def process_bind_param(self, value: RevisionState, dialect):
+    def process_bind_param(self, value: Optional[RevisionState], dialect):
+        if value is None:
+            return None
         return value.value
 
     def process_result_value(self, value, dialect):
@@ -201,6 +203,13 @@ def get_tables(table_prefix: str = ""):
         Column("created_at", TZDateTime(6)),
         Column("updated_at", TZDateTime(6)),
         Column("last_modified_at", TZDateTime(6)),
+        # Identifier.key, for indexed exact-identifier lookups on every dialect
+        Column("identifier_key", String(255)),
+        # The latest revision (highest revision_id), written in the same
+        # transaction as the revision rows
+        Column("current_revision_id", Integer),
+        Column("current_revision_state", RevisionStateString),
+        Column("current_revision_created_at", TZDateTime(6)),
         # Required for performance querying when there are a lot of Datasets
         # with the same provider and dataset_type
         Index(
@@ -210,6 +219,33 @@ def get_tables(table_prefix: str = ""):
             "dataset_type",
             "last_modified_at",
         ),
+        Index(
+            f"{table_prefix}idx_bucket_provider_type_identifier_key",
+            "bucket",
+            "provider",
+            "dataset_type",
+            "identifier_key",
+            unique=True,
+            # Stay below the maximum key length of InnoDB (3072 bytes)
+            mysql_length={"bucket": 100, "provider": 100, "dataset_type": 100},
+        ),
+        # Incremental refreshes of the summary map read the datasets
+        # updated since the previous run
+        Index(
+            f"{table_prefix}idx_bucket_provider_type_updated_at",
+            "bucket",
+            "provider",
+            "dataset_type",
+            "updated_at",
+            mysql_length={"bucket": 100, "provider": 100, "dataset_type": 100},
+        ),
+        # Keyset pagination seeks on (created_at, dataset_id)
+        Index(
+            f"{table_prefix}idx_bucket_created_at_dataset_id",
+            "bucket",
+            "created_at",
+            "dataset_id",
+        ),
     )
 
     revision_table = Table(
@@ -338,6 +374,18 @@ def get_tables(table_prefix: str = ""):
         ),
     )
 
+    # Existence index of the content-addressed file layout
+    blob_table = Table(
+        f"{table_prefix}blob",
+        metadata,
+        Column("bucket", String(255), primary_key=True),
+        Column("content_hash", String(40), primary_key=True),
+        Column("storage_path", PathString),
+        Column("storage_size", BigInteger),
+        Column("storage_compression_method", String(255)),
+        Column("created_at", TZDateTime(6)),
+    )
+
     store_version_table = Table(
         f"{table_prefix}store_version",
         metadata,
@@ -355,6 +403,7 @@ def get_tables(table_prefix: str = ""):
         "ingestion_job_summary_table": ingestion_job_summary_table,
         "task_summary_table": task_summary_table,
         "store_version_table": store_version_table,
+        "blob_table": blob_table,
     }
 
 
@@ -367,6 +416,7 @@ file_table = _default_tables["file_table"]
 ingestion_job_summary_table = _default_tables["ingestion_job_summary_table"]
 task_summary_table = _default_tables["task_summary_table"]
 store_version_table = _default_tables["store_version_table"]
+blob_table = _default_tables["blob_table"]
 #
 #
 # mapper_registry = registry()
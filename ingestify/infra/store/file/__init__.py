@@ -1,3 +1,4 @@
+from .caching_file_repository import CachingFileRepository
 from .gcs_file_repository import GCSFileRepository
 from .local_file_repository import LocalFileRepository
 from .s3_file_repository import S3FileRepository
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from ingestify.domain.models import Dataset, FileRepository
+
+logger = logging.getLogger(__name__)
+
+# Evict down to this fraction of max_size, so not every fill has to scan
+_LOW_WATERMARK = 0.9
+# Temporary files older than this are left behind by a crashed fill
+_STALE_TMP_SECONDS = 3600
+
+
+class CachingFileRepository(FileRepository):
+    """Read-through cache on local disk in front of another FileRepository.
+
+    Files are kept by `storage_path` and `tag`, so a new version of a file
+    is never served from an old entry. Reads without a tag (like the pointer
+    files of the codecs) aren't cached. The least recently used entries are
+    removed when the cache grows over `max_size` bytes.
+
+    Several processes can share `cache_dir`: entries are written to a
+    temporary file and renamed into place, so a reader sees a complete file
+    or none. Each process keeps its own estimate of the size, which is
+    corrected by a scan of the directory on every eviction.
+    """
+
+    def __init__(
+        self,
+        repository: FileRepository,
+        cache_dir: str,
+        max_size: int = 10 * 1024**3,
+    ):
+        self.repository = repository
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def __getstate__(self):
+        return {
+            "repository": self.repository,
+            "cache_dir": self.cache_dir,
+            "max_size": self.max_size,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._size = None
+
+    @property
+    def base_dir(self) -> Path:
+        return self.repository.base_dir
+
+    @property
+    def identifier_transformer(self):
+        return self.repository.identifier_transformer
+
+    def get_write_path(
+        self, bucket: str, dataset: Dataset, revision_id: int, filename: str
+    ) -> Path:
+        return self.repository.get_write_path(bucket, dataset, revision_id, filename)
+
+    def save_content(
+        self,
+        bucket: str,
+        dataset: Dataset,
+        revision_id: int,
+        filename: str,
+        stream: BinaryIO,
+    ) -> Path:
+        return self.repository.save_content(
+            bucket, dataset, revision_id, filename, stream
+        )
+
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        return self.repository.save_content_at(storage_path, stream)
+
+    def get_read_path(self, storage_path: str) -> Path:
+        return self.repository.get_read_path(storage_path)
+
+    def get_relative_path(self, path: Path) -> Path:
+        return self.repository.get_relative_path(path)
+
+    def load_content(self, storage_path: str) -> BinaryIO:
+        return self.repository.load_content(storage_path)
+
+    def load_file_content(
+        self, storage_path: str, tag: Optional[str] = None
+    ) -> BinaryIO:
+        if tag is None:
+            return self.repository.load_content(storage_path)
+
+        path = self._entry_path(storage_path, tag)
+        try:
+            stream = open(path, "rb")
+        except FileNotFoundError:
+            # A miss, or removed by the eviction of another process
+            stream = self._fill(storage_path, path)
+            self._evict_if_needed()
+        else:
+            self._touch(path)
+        return stream
+
+    def fill(self, storage_path: str, tag: str) -> bool:
+        """Put a file in the cache without reading it. Returns False when it
+        was already there."""
+        path = self._entry_path(storage_path, tag)
+        if path.exists():
+            self._touch(path)
+            return False
+        self._fill(storage_path, path).close()
+        self._evict_if_needed()
+        return True
+
+    @classmethod
+    def supports(cls, url: str) -> bool:
+        return False
+
+    def _entry_path(self, storage_path: str, tag: str) -> Path:
+        key = hashlib.sha1(f"{storage_path}\n{tag}".encode("utf-8")).hexdigest()
+        return self.cache_dir / key[:2] / key
+
+    @staticmethod
+    def _touch(path: Path):
+        # The modification time records the last use
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _fill(self, storage_path: str, path: Path) -> BinaryIO:
+        """Copy a file into the cache at `path`. Returns the new entry, opened
+        for reading: it stays readable when the entry is evicted or replaced
+        right after."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        fp = os.fdopen(fd, "w+b")
+        try:
+            source = self.repository.load_content(storage_path)
+            try:
+                shutil.copyfileobj(source, fp, length=1024 * 1024)
+            finally:
+                source.close()
+            size = fp.tell()
+            fp.flush()
+            os.replace(tmp_name, path)
+        except BaseException:
+            fp.close()
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+        fp.seek(0)
+        return fp
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size:
+                return
+            self._size = self._evict()
+
+    def _scan(self):
+        now = time.time()
+        entries = []
+        for subdir in os.scandir(self.cache_dir):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith("."):
+                    if now - stat.st_mtime > _STALE_TMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Removed by another process
+            return True
+        except OSError:
+            # Open on a platform that doesn't allow removing open files
+            return False
+        return True
+
+    def _evict(self) -> int:
+        entries = self._scan()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size <= self.max_size:
+            return size
+
+        target = self.max_size * _LOW_WATERMARK
+        for _, entry_size, path in sorted(entries):
+            if size <= target:
+                break
+            if self._remove(path):
+                size -= entry_size
+
+        logger.debug(f"Evicted files from {self.cache_dir}, {size} bytes left")
+        return size
@@ -27,5 +27,12 @@ class DummyFileRepository(FileRepository):
 
         return path
 
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        path = self.base_dir / storage_path
+
+        logger.info(f"Dummy save content to {path}")
+
+        return path
+
     def load_content(self, storage_path: str) -> BinaryIO:
         return BinaryIO()
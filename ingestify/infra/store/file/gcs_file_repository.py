@@ -1,13 +1,38 @@
+import uuid
+from collections import deque
+from io import BytesIO
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 
 from ingestify.domain import Dataset
 from ingestify.domain.models import FileRepository
+from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
+
+from .transfer import TransferOptions, TransferPool, stream_size
+
+# The maximum number of sources of a compose request
+_MAX_COMPOSE_SOURCES = 32
 
 
 class GCSFileRepository(FileRepository):
+    """Files in Google Cloud Storage.
+
+    Objects over the threshold of the transfer options are uploaded as parts
+    in parallel and composed into one object, and downloaded with parallel
+    ranged reads."""
+
     _client = None
 
+    def __init__(
+        self,
+        url: str,
+        identifier_transformer: IdentifierTransformer,
+        transfer_options: Optional[TransferOptions] = None,
+    ):
+        super().__init__(url, identifier_transformer)
+        self.transfer_options = transfer_options or TransferOptions()
+        self._transfer_pool = TransferPool(self.transfer_options)
+
     @property
     def client(self):
         if not self._client:
@@ -21,8 +46,83 @@ class GCSFileRepository(FileRepository):
             "base_dir": self.base_dir,
             "_client": None,
             "identifier_transformer": self.identifier_transformer,
+            "transfer_options": self.transfer_options,
+            "_transfer_pool": self._transfer_pool,
         }
 
+    def _get_blob(self, key: Path):
+        gcs_bucket = Path(key.parts[0])
+        return self.client.bucket(str(gcs_bucket)).blob(
+            str(key.relative_to(gcs_bucket))
+        )
+
+    def _upload(self, key: Path, stream: BinaryIO):
+        blob = self._get_blob(key)
+        size = stream_size(stream)
+        if size is not None and size <= self.transfer_options.threshold:
+            blob.upload_from_file(stream)
+            return
+
+        # Upload the parts as temporary objects next to the target
+        bucket = blob.bucket
+        prefix = f"{blob.name}.parts-{uuid.uuid4().hex}"
+        part_size = self.transfer_options.part_size
+        if size is not None:
+            # A compose request takes a limited number of sources
+            part_size = max(part_size, -(-size // _MAX_COMPOSE_SOURCES))
+
+        def upload_part(index: int, data: bytes):
+            part = bucket.blob(f"{prefix}/{index:05}")
+            part.upload_from_string(data)
+            return part
+
+        executor = self._transfer_pool.executor
+        futures = deque()
+        parts = []
+        try:
+            index = 0
+            while data := stream.read(part_size):
+                futures.append(executor.submit(upload_part, index, data))
+                index += 1
+                if len(futures) >= self.transfer_options.concurrency:
+                    parts.append(futures.popleft().result())
+            parts.extend(future.result() for future in futures)
+            futures.clear()
+
+            if not parts:
+                blob.upload_from_string(b"")
+                return
+
+            # Compose in rounds when there are more parts than a request takes
+            while len(parts) > _MAX_COMPOSE_SOURCES:
+                composed = []
+                for i in range(0, len(parts), _MAX_COMPOSE_SOURCES):
+                    group = bucket.blob(f"{prefix}/composed-{len(parts)}-{i:05}")
+                    group.compose(parts[i : i + _MAX_COMPOSE_SOURCES])
+                    composed.append(group)
+                self._delete(parts)
+                parts = composed
+            blob.compose(parts)
+        finally:
+            for future in futures:
+                future.cancel()
+            parts.extend(
+                future.result()
+                for future in futures
+                if not future.cancelled() and not future.exception()
+            )
+            self._delete(parts)
+
+    @staticmethod
+    def _delete(blobs):
+        for blob in blobs:
+            try:
+                blob.delete()
+            except Exception:
+                # Already deleted. Leftovers are harmless, but take space
+                pass
+        blobs.clear()
+
     def save_content(
         self,
         bucket: str,
@@ -32,19 +132,36 @@ class GCSFileRepository(FileRepository):
         stream: BinaryIO,
     ) -> Path:
         key = self.get_write_path(bucket, dataset, revision_id, filename)
-        gcs_bucket = Path(key.parts[0])
-        self.client.bucket(str(gcs_bucket)).blob(
-            str(key.relative_to(gcs_bucket))
-        ).upload_from_file(stream)
+        self._upload(key, stream)
+        return key
+
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        key = self.base_dir / storage_path
+        self._upload(key, stream)
         return key
 
     def load_content(self, storage_path: str) -> BinaryIO:
         key = self.get_read_path(storage_path)
         gcs_bucket = Path(key.parts[0])
-        return (
-            self.client.bucket(str(gcs_bucket))
-            .blob(str(key.relative_to(gcs_bucket)))
-            .open("rb")
+        blob = self.client.bucket(str(gcs_bucket)).get_blob(
+            str(key.relative_to(gcs_bucket))
+        )
+        if blob is None:
+            raise FileNotFoundError(f"{key} not found")
+        if blob.size <= self.transfer_options.threshold:
+            return BytesIO(blob.download_as_bytes(if_generation_match=blob.generation))
+
+        def fetch(start: int, end: int) -> bytes:
+            # Pin the generation, so all parts come from the same version
+            return blob.download_as_bytes(
+                start=start,
+                end=end,
+                checksum=None,
+                if_generation_match=blob.generation,
+            )
+
+        return self._transfer_pool.download(
+            fetch(0, self.transfer_options.threshold - 1), blob.size, fetch
         )
 
     @classmethod
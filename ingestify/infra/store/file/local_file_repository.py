@@ -26,5 +26,13 @@ class LocalFileRepository(FileRepository):
             shutil.copyfileobj(stream, fp)
         return path
 
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        path = self.base_dir / storage_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(path, "wb") as fp:
+            shutil.copyfileobj(stream, fp)
+        return path
+
     def load_content(self, storage_path: str) -> BinaryIO:
         return open(self.get_read_path(storage_path), "rb")
@@ -1,24 +1,50 @@
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 
 import boto3 as boto3
 import botocore.config
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 
 from ingestify.domain import Dataset
 from ingestify.domain.models import FileRepository
-from ingestify.utils import get_concurrency
+from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
+from ingestify.utils import BufferedStream, get_concurrency
+
+from .transfer import TransferOptions, TransferPool, stream_size
 
 
 class S3FileRepository(FileRepository):
+    """Files in S3 (or an S3 compatible store, with `endpoint_url`).
+
+    Objects over the threshold of the transfer options are uploaded as
+    multipart uploads and downloaded with parallel ranged GETs."""
+
     _s3 = None
 
+    def __init__(
+        self,
+        url: str,
+        identifier_transformer: IdentifierTransformer,
+        transfer_options: Optional[TransferOptions] = None,
+        endpoint_url: Optional[str] = None,
+    ):
+        super().__init__(url, identifier_transformer)
+        self.transfer_options = transfer_options or TransferOptions()
+        self.endpoint_url = endpoint_url
+        self._transfer_pool = TransferPool(self.transfer_options)
+
     @property
     def s3(self):
         if not self._s3:
             client_config = botocore.config.Config(
-                max_pool_connections=get_concurrency(),
+                max_pool_connections=get_concurrency()
+                + self.transfer_options.concurrency,
+                retries={"mode": "standard"},
+            )
+            self._s3 = boto3.resource(
+                "s3", config=client_config, endpoint_url=self.endpoint_url
             )
-            self._s3 = boto3.resource("s3", config=client_config)
         return self._s3
 
     def __getstate__(self):
@@ -26,8 +52,33 @@ class S3FileRepository(FileRepository):
             "base_dir": self.base_dir,
             "_s3": None,
             "identifier_transformer": self.identifier_transformer,
+            "transfer_options": self.transfer_options,
+            "endpoint_url": self.endpoint_url,
+            "_transfer_pool": self._transfer_pool,
         }
 
+    def _split_key(self, key: Path):
+        s3_bucket = Path(key.parts[0])
+        return str(s3_bucket), str(key.relative_to(s3_bucket))
+
+    def _upload(self, key: Path, stream: BinaryIO):
+        s3_bucket, s3_key = self._split_key(key)
+        size = stream_size(stream)
+        if size is not None and size <= self.transfer_options.threshold:
+            self.s3.meta.client.put_object(Bucket=s3_bucket, Key=s3_key, Body=stream)
+            return
+
+        self.s3.meta.client.upload_fileobj(
+            stream,
+            s3_bucket,
+            s3_key,
+            Config=TransferConfig(
+                multipart_threshold=self.transfer_options.threshold,
+                multipart_chunksize=self.transfer_options.part_size,
+                max_concurrency=self.transfer_options.concurrency,
+            ),
+        )
+
     def save_content(
         self,
         bucket: str,
@@ -37,17 +88,46 @@ class S3FileRepository(FileRepository):
         stream: BinaryIO,
     ) -> Path:
         key = self.get_write_path(bucket, dataset, revision_id, filename)
-        s3_bucket = Path(key.parts[0])
+        self._upload(key, stream)
+        return key
 
-        self.s3.Object(str(s3_bucket), str(key.relative_to(s3_bucket))).put(Body=stream)
+    def save_content_at(self, storage_path: str, stream: BinaryIO) -> Path:
+        key = self.base_dir / storage_path
+        self._upload(key, stream)
         return key
 
     def load_content(self, storage_path: str) -> BinaryIO:
-        key = self.get_read_path(storage_path)
-        s3_bucket = Path(key.parts[0])
-        return self.s3.Object(str(s3_bucket), str(key.relative_to(s3_bucket))).get()[
-            "Body"
-        ]
+        s3_bucket, s3_key = self._split_key(self.get_read_path(storage_path))
+        client = self.s3.meta.client
+
+        # The first part tells the size of the object, so small objects still
+        # take a single request
+        try:
+            response = client.get_object(
+                Bucket=s3_bucket,
+                Key=s3_key,
+                Range=f"bytes=0-{self.transfer_options.threshold - 1}",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                # An empty object
+                return BufferedStream()
+            raise
+
+        size = int(response["ContentRange"].rsplit("/", 1)[1])
+        if size <= self.transfer_options.threshold:
+            return response["Body"]
+
+        def fetch(start: int, end: int) -> bytes:
+            # IfMatch: all parts come from the same version of the object
+            return client.get_object(
+                Bucket=s3_bucket,
+                Key=s3_key,
+                Range=f"bytes={start}-{end}",
+                IfMatch=response["ETag"],
+            )["Body"].read()
+
+        return self._transfer_pool.download(response["Body"].read(), size, fetch)
 
     @classmethod
     def supports(cls, url: str) -> bool:
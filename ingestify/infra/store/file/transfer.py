@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from ingestify.utils import BufferedStream, parse_size
+
+
+@dataclass
+class TransferOptions:
+    """How large files are moved to and from an object store.
+
+    Objects over `threshold` bytes are uploaded and downloaded in parts of
+    `part_size` bytes, `concurrency` at a time. Every part is a request of
+    its own, retried by itself when it fails."""
+
+    threshold: int = 16 * 1024**2
+    part_size: int = 8 * 1024**2
+    concurrency: int = 8
+
+    @classmethod
+    def from_dict(cls, options: Optional[dict]) -> "TransferOptions":
+        options = options or {}
+        defaults = cls()
+        return cls(
+            threshold=parse_size(options.get("threshold", defaults.threshold)),
+            part_size=parse_size(options.get("part_size", defaults.part_size)),
+            concurrency=int(options.get("concurrency", defaults.concurrency)),
+        )
+
+
+class TransferPool:
+    """Threads for the parts of transfers, shared by all transfers of a
+    repository and created on first use"""
+
+    def __init__(self, options: TransferOptions):
+        self.options = options
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.options.concurrency,
+                    thread_name_prefix="transfer",
+                )
+            return self._executor
+
+    def __getstate__(self):
+        return {"options": self.options}
+
+    def __setstate__(self, state):
+        self.__init__(state["options"])
+
+    def ranges(self, start: int, size: int) -> Iterator[Tuple[int, int]]:
+        """Inclusive byte ranges of the parts from `start` up to `size`"""
+        for offset in range(start, size, self.options.part_size):
+            yield offset, min(offset + self.options.part_size, size) - 1
+
+    def download(
+        self, first_part: bytes, size: int, fetch: Callable[[int, int], bytes]
+    ) -> BinaryIO:
+        """Download an object of `size` bytes, of which `first_part` is already
+        read, by fetching the other (inclusive) byte ranges in parallel."""
+        buffer = BufferedStream()
+        buffer.write(first_part)
+
+        # Keep at most `concurrency` parts in memory
+        pending = deque()
+        for start, end in self.ranges(len(first_part), size):
+            pending.append(self.executor.submit(fetch, start, end))
+            if len(pending) >= self.options.concurrency:
+                buffer.write(pending.popleft().result())
+        for future in pending:
+            buffer.write(future.result())
+
+        if buffer.tell() != size:
+            raise IOError(f"Downloaded {buffer.tell()} of {size} bytes")
+        buffer.seek(0)
+        return buffer
+
+
+def stream_size(stream: BinaryIO) -> Optional[int]:
+    """Remaining bytes of a seekable stream, or None when it can't seek"""
+    try:
+        if not stream.seekable():
+            return None
+        position = stream.tell()
+        size = stream.seek(0, 2) - position
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
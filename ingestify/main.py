@@ -8,6 +8,7 @@ from typing import Optional, Type
 from pyaml_env import parse_config
 
 from ingestify import Source
+from ingestify.application.compression import CodecRegistry
 from ingestify.application.dataset_store import DatasetStore
 from ingestify.application.ingestion_engine import IngestionEngine
 from ingestify.application.secrets_manager import SecretsManager
@@ -21,12 +22,15 @@ from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
 from ingestify.domain.models.fetch_policy import FetchPolicy
 from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
 from ingestify.exceptions import ConfigurationError
+from ingestify.utils import parse_size
 from ingestify.infra import S3FileRepository, LocalFileRepository, GCSFileRepository
 from ingestify.infra.store.dataset.sqlalchemy import SqlAlchemyDatasetRepository
 from ingestify.infra.store.dataset.sqlalchemy.repository import (
     SqlAlchemySessionProvider,
 )
+from ingestify.infra.store.file.caching_file_repository import CachingFileRepository
 from ingestify.infra.store.file.dummy_file_repository import DummyFileRepository
+from ingestify.infra.store.file.transfer import TransferOptions
 
 logger = logging.getLogger(__name__)
 
@@ -62,14 +66,24 @@ def import_cls(name):
     return getattr(mod, components[-1])
 
 
-def build_file_repository(file_url: str, identifier_transformer) -> FileRepository:
+def build_file_repository(
+    file_url: str, identifier_transformer, storage_options: dict = None
+) -> FileRepository:
+    if storage_options is None:
+        storage_options = {}
+
     if file_url.startswith("s3://"):
         repository = S3FileRepository(
-            url=file_url, identifier_transformer=identifier_transformer
+            url=file_url,
+            identifier_transformer=identifier_transformer,
+            transfer_options=TransferOptions.from_dict(storage_options.get("transfer")),
+            endpoint_url=storage_options.get("endpoint_url"),
         )
     elif file_url.startswith("gcs://"):
         repository = GCSFileRepository(
-            url=file_url, identifier_transformer=identifier_transformer
+            url=file_url,
+            identifier_transformer=identifier_transformer,
+            transfer_options=TransferOptions.from_dict(storage_options.get("transfer")),
         )
     elif file_url.startswith("file://"):
         repository = LocalFileRepository(
@@ -91,6 +105,7 @@ def get_dataset_store_by_urls(
     bucket: str,
     dataset_types,
     metadata_options: dict = None,
+    storage_options: dict = None,
 ) -> DatasetStore:
     """
     Initialize a DatasetStore by a DatasetRepository and a FileRepository
@@ -101,12 +116,15 @@ def get_dataset_store_by_urls(
         bucket: Bucket name
         dataset_types: Dataset type configurations
         metadata_options: Optional dict with metadata store options (e.g., table_prefix)
+        storage_options: Optional dict with file storage options (e.g., codec)
     """
     if not bucket:
         raise Exception("Bucket is not specified")
 
     if metadata_options is None:
         metadata_options = {}
+    if storage_options is None:
+        storage_options = {}
 
     identifier_transformer = IdentifierTransformer()
     for dataset_type in dataset_types:
@@ -120,8 +138,18 @@ def get_dataset_store_by_urls(
             )
 
     file_repository = build_file_repository(
-        file_url, identifier_transformer=identifier_transformer
+        file_url,
+        identifier_transformer=identifier_transformer,
+        storage_options=storage_options,
     )
+    if file_cache := storage_options.get("file_cache"):
+        if "path" not in file_cache:
+            raise ConfigurationError("`storage_options.file_cache` requires a path")
+        file_repository = CachingFileRepository(
+            file_repository,
+            cache_dir=file_cache["path"],
+            max_size=parse_size(file_cache.get("max_size", "10GB")),
+        )
 
     if secrets_manager.supports(metadata_url):
         metadata_url = secrets_manager.load_as_db_url(metadata_url)
@@ -137,7 +165,9 @@ def get_dataset_store_by_urls(
     )
 
     dataset_repository = SqlAlchemyDatasetRepository(
-        sqlalchemy_session_provider, identifier_transformer=identifier_transformer
+        sqlalchemy_session_provider,
+        identifier_transformer=identifier_transformer,
+        lookup_strategy=metadata_options.get("lookup_strategy", "array"),
     )
 
     identifier_index_configs = [
@@ -162,6 +192,17 @@ def get_dataset_store_by_urls(
         file_repository=file_repository,
         bucket=bucket,
         identifier_index_configs=identifier_index_configs,
+        codecs=CodecRegistry(
+            default=storage_options.get("codec", "gzip"),
+            dataset_types={
+                (dt["provider"], dt["dataset_type"]): dt["storage_codec"]
+                for dt in dataset_types
+                if dt.get("storage_codec")
+            },
+            level=storage_options.get("compression_level"),
+            levels=storage_options.get("compression_levels"),
+        ),
+        content_addressed=storage_options.get("content_addressed", False),
     )
 
 
@@ -178,6 +219,7 @@ def get_datastore(config_file, bucket: Optional[str] = None) -> DatasetStore:
         bucket=bucket or main_config.get("default_bucket"),
         dataset_types=config.get("dataset_types", []),
         metadata_options=metadata_options,
+        storage_options=main_config.get("storage_options"),
     )
 
 
@@ -316,6 +358,7 @@ def get_engine(
         bucket=bucket or config["main"].get("default_bucket"),
         dataset_types=config.get("dataset_types", []),
         metadata_options=metadata_options,
+        storage_options=config["main"].get("storage_options"),
     )
 
     # Setup an EventBus and wire some more components
@@ -334,6 +377,8 @@ def get_engine(
 
     ingestion_engine = IngestionEngine(
         store=store,
+        # thread (default), process or hybrid. Falls back to INGESTIFY_EXECUTOR
+        executor_backend=config["main"].get("executor"),
     )
 
     logger.info("Adding IngestionPlans...")
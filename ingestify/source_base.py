@@ -7,6 +7,7 @@ from ingestify.domain.models import (
     Identifier,
     Selector,
     Source,
+    AsyncSource,
     Revision,
 )
 
@@ -14,6 +15,7 @@ __all__ = [
     "Selector",
     "Identifier",
     "Source",
+    "AsyncSource",
     "DatasetStore",
     "Dataset",
     "DatasetResource",
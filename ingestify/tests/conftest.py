@@ -4,6 +4,8 @@ import os
 
 import pytest
 
+from ingestify.domain import DatasetState, DraftFile, Identifier
+from ingestify.domain.models.dataset.revision import RevisionSource, SourceType
 from ingestify.main import get_engine
 
 
@@ -57,3 +59,32 @@ def engine(config_file, db_cleanup):
     yield engine
 
     db_cleanup(engine)
+
+
+def revision_source() -> RevisionSource:
+    return RevisionSource(source_type=SourceType.MANUAL, source_id="test")
+
+
+def draft_files(**contents) -> dict:
+    """A DraftFile per keyword argument, keyed by data_feed_key"""
+    return {
+        key: DraftFile.from_input(content, data_feed_key=key)
+        for key, content in contents.items()
+    }
+
+
+def create_dataset(store, item_id=1, dataset_type="test", **contents):
+    """Create a dataset with a file per keyword argument. Returns the stored
+    dataset, or None when it's not saved yet (with an upload queue)."""
+    store.create_dataset(
+        dataset_type=dataset_type,
+        provider="test_provider",
+        dataset_identifier=Identifier(item_id=item_id),
+        name=f"item-{item_id}",
+        state=DatasetState.COMPLETE,
+        metadata={},
+        files=draft_files(**contents),
+        revision_source=revision_source(),
+    )
+    datasets = store.get_dataset_collection(item_id=item_id)
+    return datasets.first() if len(datasets) else None
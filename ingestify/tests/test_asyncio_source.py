@@ -0,0 +1,185 @@
+"""Tests for AsyncSource: async discovery and coroutine file loaders."""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from ingestify import AsyncSource, DatasetResource
+from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.dataset.file import NotModifiedFile
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.utils import utcnow
+
+
+class ConcurrentAsyncSource(AsyncSource):
+    """Every file loader waits until `expected_in_flight` loaders run at the
+    same time. That only works when the tasks run concurrently on the loop."""
+
+    provider = "test_provider"
+
+    def __init__(self, name, item_count=50, expected_in_flight=50):
+        super().__init__(name)
+        self.item_count = item_count
+        self.expected_in_flight = expected_in_flight
+        self.in_flight = 0
+        self.all_in_flight = None
+        self.selectors_discovered = False
+        self.competition_ids = []
+
+    async def discover_selectors(self, dataset_type):
+        await asyncio.sleep(0)
+        self.selectors_discovered = True
+        return [{"competition_id": 1}]
+
+    async def _loader(self, file_resource, current_file, **kwargs):
+        if self.all_in_flight is None:
+            self.all_in_flight = asyncio.Event()
+        self.in_flight += 1
+        if self.in_flight >= self.expected_in_flight:
+            self.all_in_flight.set()
+        await asyncio.wait_for(self.all_in_flight.wait(), timeout=5)
+
+        item_id = file_resource.dataset_resource.dataset_resource_id["item_id"]
+        return DraftFile.from_input(f"item-{item_id}", data_feed_key="f1")
+
+    @staticmethod
+    def _blocking_loader(file_resource, current_file, **kwargs):
+        return DraftFile.from_input("blocking", data_feed_key="f2")
+
+    async def find_datasets(
+        self,
+        dataset_type,
+        data_spec_versions,
+        dataset_collection_metadata,
+        competition_id=None,
+        **kwargs,
+    ):
+        self.competition_ids.append(competition_id)
+        await asyncio.sleep(0)
+
+        batch = []
+        for i in range(self.item_count):
+            r = DatasetResource(
+                dataset_resource_id={"competition_id": competition_id, "item_id": i},
+                provider=self.provider,
+                dataset_type="test",
+                name=f"item-{i}",
+            )
+            r.add_file(
+                last_modified=utcnow(),
+                data_feed_key="f1",
+                data_spec_version="v1",
+                file_loader=self._loader,
+            )
+            r.add_file(
+                last_modified=utcnow(),
+                data_feed_key="f2",
+                data_spec_version="v1",
+                file_loader=self._blocking_loader,
+            )
+            batch.append(r)
+        yield batch
+
+
+def _setup(engine, source):
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=source,
+            fetch_policy=FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+
+
+def test_async_source_runs_tasks_concurrently(engine, monkeypatch):
+    monkeypatch.delenv("INGESTIFY_RUN_EAGER")
+    source = ConcurrentAsyncSource("s")
+    _setup(engine, source)
+
+    engine.run()
+
+    assert source.selectors_discovered
+    assert source.competition_ids == [1]
+
+    summaries = engine.store.dataset_repository.load_ingestion_job_summaries()
+    assert summaries[0].successful_tasks == 50
+
+    datasets = engine.store.get_dataset_collection()
+    assert len(datasets) == 50
+    dataset = datasets.first()
+    files = engine.store.load_files(dataset)
+    item_id = dataset.identifier["item_id"]
+    assert files.get_file("f1").stream.read() == f"item-{item_id}".encode()
+    assert files.get_file("f2").stream.read() == b"blocking"
+
+
+def test_async_source_in_eager_mode(engine):
+    """With INGESTIFY_RUN_EAGER the coroutines run one at a time."""
+    source = ConcurrentAsyncSource("s", item_count=3, expected_in_flight=1)
+    _setup(engine, source)
+
+    engine.run()
+
+    assert len(engine.store.get_dataset_collection()) == 3
+
+
+def test_retrieve_http_async(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+
+    from ingestify.infra.fetch import http
+
+    def handler(request):
+        if request.headers.get("if-none-match") == "abc":
+            return httpx.Response(304)
+        return httpx.Response(200, content=b'{"a": 1}', headers={"etag": "abc"})
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http, "get_async_client", lambda: client)
+
+        file = await http.retrieve_http_async(
+            "https://example.com/a.json",
+            file_data_feed_key="a",
+            file_data_spec_version="v1",
+            file_data_serialization_format="json",
+        )
+        assert file.tag == "abc"
+        assert file.size == 8
+        assert file.stream.read() == b'{"a": 1}'
+
+        # Changed according to last_modified, but the server says it's not
+        current_file = type(
+            "CurrentFile",
+            (),
+            {"tag": "abc", "modified_at": datetime(2020, 1, 1, tzinfo=timezone.utc)},
+        )()
+        not_modified = await http.retrieve_http_async(
+            "https://example.com/a.json",
+            current_file=current_file,
+            last_modified=utcnow(),
+        )
+        assert isinstance(not_modified, NotModifiedFile)
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_executor_shutdown_closes_async_client():
+    pytest.importorskip("httpx")
+
+    from ingestify.infra.fetch import http
+    from ingestify.utils import AsyncioExecutor
+
+    async def get_client():
+        return http.get_async_client()
+
+    executor = AsyncioExecutor()
+    client = executor.submit(get_client).result()
+    assert not client.is_closed
+
+    executor.shutdown()
+    assert client.is_closed
@@ -0,0 +1,137 @@
+"""CachingFileRepository: a read-through cache on local disk."""
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
+from ingestify.exceptions import ConfigurationError
+from ingestify.infra import CachingFileRepository, LocalFileRepository
+from ingestify.tests.conftest import create_dataset
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = LocalFileRepository(
+        url=f"file://{tmp_path}/data", identifier_transformer=IdentifierTransformer()
+    )
+    for name in ("a", "b", "c"):
+        repository.save_content_at(f"main/{name}", BytesIO(name.encode() * 100))
+    return repository
+
+
+def _cached_files(cache_dir):
+    return sorted(
+        path.name for path in cache_dir.glob("*/*") if not path.name.startswith(".")
+    )
+
+
+def test_reads_are_served_from_the_cache(repository, tmp_path):
+    cache = CachingFileRepository(repository, cache_dir=tmp_path / "cache")
+
+    with patch.object(
+        repository, "load_content", wraps=repository.load_content
+    ) as load_content:
+        for _ in range(3):
+            with cache.load_file_content("main/a", tag="1") as stream:
+                assert stream.read() == b"a" * 100
+        assert load_content.call_count == 1
+
+        # A new version of the file
+        cache.load_file_content("main/a", tag="2").close()
+        assert load_content.call_count == 2
+
+        # Without a tag the version is unknown
+        cache.load_file_content("main/a").close()
+        assert load_content.call_count == 3
+
+    assert len(_cached_files(tmp_path / "cache")) == 2
+
+
+def test_filled_entry_is_read_when_evicted_right_away(repository, tmp_path):
+    cache = CachingFileRepository(repository, cache_dir=tmp_path / "cache")
+    replace = os.replace
+
+    def replace_and_evict(src, dst):
+        replace(src, dst)
+        # Another process evicts the entry before it's read
+        os.unlink(dst)
+
+    with patch("os.replace", replace_and_evict):
+        stream = cache.load_file_content("main/a", tag="1")
+    with stream:
+        assert stream.read() == b"a" * 100
+
+
+def test_least_recently_used_files_are_evicted(repository, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = CachingFileRepository(repository, cache_dir=cache_dir, max_size=250)
+
+    assert cache.fill("main/a", "1")
+    assert cache.fill("main/b", "1")
+    assert not cache.fill("main/a", "1")
+    a, b = (cache._entry_path(f"main/{name}", "1") for name in "ab")
+    os.utime(a, (1000, 1000))
+    os.utime(b, (2000, 2000))
+
+    cache.load_file_content("main/c", tag="1").close()
+    assert not a.exists()
+    assert b.exists()
+
+    # The other processes sharing the directory see the same entries
+    other = CachingFileRepository(repository, cache_dir=cache_dir, max_size=250)
+    assert not other.fill("main/b", "1")
+    assert other.fill("main/a", "1")
+    assert len(_cached_files(cache_dir)) == 2
+
+
+def test_concurrent_reads_of_a_missing_file(repository, tmp_path):
+    cache = CachingFileRepository(repository, cache_dir=tmp_path / "cache")
+
+    def read(_):
+        with cache.load_file_content("main/b", tag="1") as stream:
+            return stream.read()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert set(executor.map(read, range(32))) == {b"b" * 100}
+    assert len(_cached_files(tmp_path / "cache")) == 1
+
+
+def test_failed_download_leaves_no_entry(repository, tmp_path):
+    cache = CachingFileRepository(repository, cache_dir=tmp_path / "cache")
+
+    with pytest.raises(FileNotFoundError):
+        cache.load_file_content("main/missing", tag="1")
+    assert list((tmp_path / "cache").glob("*/*")) == []
+
+
+def test_pickle(repository, tmp_path):
+    cache = pickle.loads(
+        pickle.dumps(CachingFileRepository(repository, cache_dir=tmp_path / "cache"))
+    )
+    assert cache.load_file_content("main/c", tag="1").read() == b"c" * 100
+
+
+def test_warm_cache(engine, tmp_path):
+    store = engine.store
+    with pytest.raises(ConfigurationError):
+        engine.warm_cache()
+
+    store.file_repository = CachingFileRepository(
+        store.file_repository, cache_dir=tmp_path / "cache"
+    )
+    for i in range(3):
+        create_dataset(store, i, events=f"events-{i}", lineups=f"lineups-{i}")
+
+    assert engine.warm_cache(data_feed_keys=["events"], item_id=1) == 1
+    assert engine.warm_cache(provider="test_provider") == 5
+    assert engine.warm_cache(provider="test_provider") == 0
+
+    dataset = store.get_dataset_collection(item_id=2).first()
+    with patch.object(store.file_repository.repository, "load_content") as load_content:
+        files = store.load_files(dataset)
+    load_content.assert_not_called()
+    assert files.get_file("lineups").stream.read() == b"lineups-2"
@@ -15,8 +15,11 @@ A ``can_skip`` that works avoids both on an up-to-date dataset. (Revision count
 can't tell a skip apart from a refetch-that-got-squashed-to-ignored, so it isn't
 used here.)
 """
+from datetime import timedelta
+
 from ingestify import Source, DatasetResource
 from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.dataset.dataset import DatasetSummary
 from ingestify.domain.models.fetch_policy import FetchPolicy
 from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
 from ingestify.utils import utcnow
@@ -121,3 +124,65 @@ def test_base_fetch_policy_still_fetches_can_skip_false(engine):
     assert (
         policy.should_refetch_calls == 5
     ), "base policy must still reach should_refetch on the second run"
+
+
+class BatchPolicy(CountingPolicy):
+    """Decides with the batch hooks only."""
+
+    def __init__(self):
+        super().__init__()
+        self.can_skip_many_calls = []
+        self.should_refetch_many_calls = []
+
+    def can_skip_many(self, summaries, dataset_resources):
+        self.can_skip_many_calls.append(len(dataset_resources))
+        return [
+            summary is not None and i % 2 == 0 for i, summary in enumerate(summaries)
+        ]
+
+    def should_refetch_many(self, datasets, dataset_resources):
+        self.should_refetch_many_calls.append(len(datasets))
+        return [False] * len(datasets)
+
+
+def test_batch_hooks_are_called_once_per_batch(engine):
+    source = CountingSource("s")
+    policy = BatchPolicy()
+    _add_plan(engine, source, policy)
+
+    engine.run()
+    engine.run()
+
+    assert source.load_calls == 5
+    assert policy.can_skip_many_calls == [5]
+    # The skipped resources don't reach should_refetch_many
+    assert policy.should_refetch_many_calls == [2]
+    assert policy.should_refetch_calls == 0
+
+
+def test_base_can_skip_many_matches_can_skip():
+    policy = FetchPolicy()
+    now = utcnow()
+    resources = []
+    for i in range(4):
+        resource = DatasetResource(
+            dataset_resource_id={"item_id": i},
+            provider="test_provider",
+            dataset_type="test",
+            name=f"item-{i}",
+        )
+        if i:
+            resource.add_file(last_modified=now, data_feed_key="f1")
+        resources.append(resource)
+
+    summaries = [
+        DatasetSummary(now, None, None, True),
+        None,
+        DatasetSummary(now - timedelta(seconds=1), None, None, True),
+        DatasetSummary(now, None, None, True),
+    ]
+    assert policy.can_skip_many(summaries, resources) == [False, False, False, True]
+    assert [
+        summary is not None and policy.can_skip(summary, resource)
+        for summary, resource in zip(summaries, resources)
+    ] == [False, False, False, True]
@@ -0,0 +1,180 @@
+"""Storage codecs: parallel gzip members, a level per data_feed_key and
+dispatch on the recorded compression method when reading."""
+import gzip
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+from ingestify.application.compression import (
+    CodecRegistry,
+    GzipCodec,
+    gzip_compress,
+)
+from ingestify.exceptions import ConfigurationError
+from ingestify.tests.conftest import create_dataset
+
+
+def _member_count(data: bytes) -> int:
+    count = 0
+    while data:
+        decompressor = zlib.decompressobj(wbits=31)
+        decompressor.decompress(data)
+        data = decompressor.unused_data
+        count += 1
+    return count
+
+
+def test_parallel_members_form_a_single_gzip_file():
+    content = os.urandom(50_000) * 10
+    compressor = GzipCodec(member_size=100_000)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        compressed, method = compressor.compress(
+            BytesIO(content), "events", executor=executor
+        )
+        compressed = compressed.read()
+
+    assert method == "gzip"
+    assert _member_count(compressed) == 5
+    assert gzip.decompress(compressed) == content
+
+    single = GzipCodec().compress(BytesIO(content), "events")[0].read()
+    assert _member_count(single) == 1
+    assert gzip.decompress(single) == content
+
+
+def test_parallel_members_without_executor():
+    content = os.urandom(50_000) * 10
+    compressor = GzipCodec(member_size=100_000)
+
+    threads = set()
+
+    def compress(data, level):
+        threads.add(threading.current_thread().name)
+        return gzip_compress(data, level)
+
+    with patch("ingestify.application.compression.gzip_compress", compress):
+        compressed = compressor.compress(BytesIO(content), "events")[0].read()
+
+    assert _member_count(compressed) == 5
+    assert gzip.decompress(compressed) == content
+    # The members were compressed in the shared thread pool
+    assert threads and all(name.startswith("gzip") for name in threads)
+
+
+def test_empty_stream():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        compressed, _ = GzipCodec().compress(BytesIO(b""), "events", executor)
+    assert gzip.decompress(compressed.read()) == b""
+    compressed, _ = GzipCodec().compress(BytesIO(b""), "events")
+    assert gzip.decompress(compressed.read()) == b""
+
+
+def test_level_per_data_feed_key():
+    compressor = GzipCodec(level=9, levels={"events": 1})
+    assert compressor.level_for("events") == 1
+    assert compressor.level_for("lineups") == 9
+
+    # The XFL byte of the gzip header records the fastest (4) or best (2) level
+    fast = compressor.compress(BytesIO(b"data"), "events")[0].read()
+    best = compressor.compress(BytesIO(b"data"), "lineups")[0].read()
+    assert (fast[8], best[8]) == (4, 2)
+
+
+def test_store_reports_compressed_size(engine):
+    store = engine.store
+    store.codecs.register(GzipCodec(member_size=1000))
+    content = b"".join(b"%d," % i for i in range(10_000))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with store.with_compression_executor(executor):
+            dataset = create_dataset(store, 1, events=content)
+
+    file = dataset.current_revision.modified_files_map["events"]
+    assert file.storage_compression_method == "gzip"
+    stored = store.file_repository.load_content(storage_path=file.storage_path).read()
+    assert file.storage_size == len(stored)
+    assert _member_count(stored) > 1
+
+    loaded = store.load_files(dataset)
+    assert loaded.get_file("events").stream.read() == content
+
+
+def test_reads_dispatch_on_recorded_method(engine):
+    store = engine.store
+    gzipped = create_dataset(store, 1, events="gzipped")
+
+    # Switch the store to uncompressed files
+    store.codecs = CodecRegistry(default="none")
+    store.codecs.bind(store.file_repository, store.bucket)
+    plain = create_dataset(store, 2, events="plain")
+
+    assert plain.current_revision.modified_files[0].storage_compression_method is None
+    assert str(plain.current_revision.modified_files[0].storage_path).endswith(".txt")
+
+    assert store.load_files(gzipped).get_file("events").stream.read() == b"gzipped"
+    assert store.load_files(plain).get_file("events").stream.read() == b"plain"
+
+
+def test_codec_per_dataset_type(engine):
+    store = engine.store
+    store.codecs = CodecRegistry(dataset_types={("test_provider", "plain"): "none"})
+    store.codecs.bind(store.file_repository, store.bucket)
+
+    gzipped = create_dataset(store, 1, events="data")
+    plain = create_dataset(store, 2, dataset_type="plain", events="data")
+    assert gzipped.current_revision.modified_files[0].storage_compression_method == (
+        "gzip"
+    )
+    assert plain.current_revision.modified_files[0].storage_compression_method is None
+
+
+def test_unknown_codec():
+    with pytest.raises(ConfigurationError):
+        CodecRegistry(default="lzma")
+
+
+def test_zstd_dictionary_is_trained_and_used(engine):
+    pytest.importorskip("zstandard")
+    from ingestify.application.compression import ZstdDictCodec
+
+    store = engine.store
+    store.codecs = CodecRegistry(default="zstd-dict")
+    store.codecs.bind(store.file_repository, store.bucket)
+    store.codecs.register(ZstdDictCodec(dictionary_size=4096, sample_count=100))
+
+    def lineup(i):
+        return (
+            '{"team_id": %d, "lineup": [%s]}'
+            % (
+                i,
+                ", ".join(
+                    '{"player_id": %d, "player_name": "Player %d", "jersey_number": %d}'
+                    % (i * 100 + j, j, j)
+                    for j in range(11)
+                ),
+            )
+        ).encode()
+
+    datasets = [create_dataset(store, i, lineups=lineup(i)) for i in range(110)]
+    methods = [
+        dataset.current_revision.modified_files[0].storage_compression_method
+        for dataset in datasets
+    ]
+    assert methods[0] == "zstd"
+    assert methods[-1].startswith("zstd-dict:")
+
+    # A new store (next run) reads both, and keeps using the dictionary
+    store.codecs = CodecRegistry(default="zstd-dict")
+    store.codecs.bind(store.file_repository, store.bucket)
+    for i, dataset in enumerate(datasets):
+        assert store.load_files(dataset).get_file("lineups").stream.read() == lineup(i)
+    dataset = create_dataset(store, 1000, lineups=lineup(1000))
+    assert dataset.current_revision.modified_files[0].storage_compression_method == (
+        methods[-1]
+    )
@@ -0,0 +1,65 @@
+"""Content-addressed file layout: identical contents are stored once."""
+from unittest.mock import patch
+
+from ingestify.tests.conftest import create_dataset, draft_files, revision_source
+
+
+def test_identical_contents_are_stored_once(engine):
+    store = engine.store
+    store.content_addressed = True
+
+    with patch.object(
+        store.file_repository,
+        "save_content_at",
+        wraps=store.file_repository.save_content_at,
+    ) as save_content_at:
+        first = create_dataset(store, 1, match="{}", lineups="[1, 2]")
+        second = create_dataset(store, 2, match="{}", lineups="[3, 4]")
+
+    # "{}" is uploaded once
+    assert save_content_at.call_count == 3
+
+    first_match = first.current_revision.modified_files_map["match"]
+    second_match = second.current_revision.modified_files_map["match"]
+    assert first_match.storage_path == second_match.storage_path
+    assert str(first_match.storage_path).startswith("main/blobs/")
+    assert first_match.storage_compression_method == "gzip"
+    assert first_match.storage_size > 0
+
+    files = store.load_files(second)
+    assert files.get_file("match").stream.read() == b"{}"
+    assert files.get_file("lineups").stream.read() == b"[3, 4]"
+
+
+def test_new_revision_reuses_stored_content(engine):
+    store = engine.store
+    store.content_addressed = True
+    create_dataset(store, 1, lineups="[1, 2]")
+    dataset = create_dataset(store, 2, lineups="[3, 4]")
+
+    with patch.object(store.file_repository, "save_content_at") as save_content_at:
+        # The content of the other dataset
+        store.add_revision(dataset, draft_files(lineups="[1, 2]"), revision_source())
+    save_content_at.assert_not_called()
+
+    dataset = store.get_dataset_collection(item_id=2).first()
+    assert store.load_files(dataset).get_file("lineups").stream.read() == b"[1, 2]"
+
+
+def test_blob_index(engine):
+    repository = engine.store.dataset_repository
+    engine.store.content_addressed = True
+    create_dataset(engine.store, 1, match="{}")
+
+    content_hash = "bf21a9e8fbc5a3846fb05b4fa0859e0917b2202f"
+    blobs = repository.get_blobs("main", [content_hash, "0" * 40])
+    assert list(blobs) == [content_hash]
+    assert repository.get_blobs("other_bucket", [content_hash]) == {}
+
+    # The first stored blob is kept
+    blob = blobs[content_hash]
+    repository.save_blobs("main", [blob.model_copy(update={"storage_size": 1})])
+    assert (
+        repository.get_blobs("main", [content_hash])[content_hash].storage_size
+        == blob.storage_size
+    )
@@ -0,0 +1,98 @@
+"""Loading datasets with revisions="current" squashes the history in SQL."""
+from ingestify.domain.models.dataset.revision import RevisionState
+from ingestify.tests.conftest import create_dataset, draft_files, revision_source
+
+
+def _current_files(dataset):
+    return {
+        file_id: (file.tag, file.revision_id, file.storage_path)
+        for file_id, file in dataset.current_revision.modified_files_map.items()
+    }
+
+
+def test_current_revision_matches_squashed_history(engine):
+    store = engine.store
+    dataset = create_dataset(store, f1="a", f2="b")
+    store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+    store.add_revision(dataset, draft_files(f2="b2", f3="c"), revision_source())
+
+    full = store.get_dataset_collection().first()
+    current = store.get_dataset_collection(revisions="current").first()
+
+    assert len(full.revisions) == 3
+    assert len(current.revisions) == 1
+    assert current.current_revision.is_squashed
+    assert current.current_revision.revision_id == 2
+    assert current.current_revision.state == full.current_revision.state
+    assert _current_files(current) == _current_files(full)
+
+    files = store.load_files(current)
+    assert files.get_file("f1").stream.read() == b"a2"
+    assert files.get_file("f2").stream.read() == b"b2"
+
+
+def test_single_revision_is_not_squashed(engine):
+    store = engine.store
+    create_dataset(store, f1="a")
+
+    current = store.get_dataset_collection(revisions="current").first()
+    assert not current.current_revision.is_squashed
+    assert current.current_revision.description == "Create"
+
+
+def test_current_revision_state_from_contributing_revisions(engine):
+    store = engine.store
+    dataset = create_dataset(store, f1="a", f2="b")
+    store.invalidate_revision(dataset)
+    # Only replaces f1; f2 still comes from the invalid revision
+    store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+
+    full = store.get_dataset_collection().first()
+    current = store.get_dataset_collection(revisions="current").first()
+    assert full.current_revision.state == RevisionState.VALIDATION_FAILED
+    assert current.current_revision.state == RevisionState.VALIDATION_FAILED
+
+
+def test_add_revision_to_dataset_loaded_with_current_revision(engine):
+    store = engine.store
+    dataset = create_dataset(store, f1="a", f2="b")
+    store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+
+    current = store.get_dataset_collection(revisions="current").first()
+    # Unchanged content doesn't create a revision
+    assert store.add_revision(current, draft_files(f1="a2"), revision_source()) is None
+
+    revision = store.add_revision(current, draft_files(f2="b2"), revision_source())
+    assert revision.revision_id == 2
+
+    full = store.get_dataset_collection().first()
+    assert [revision.revision_id for revision in full.revisions] == [0, 1, 2]
+    assert [len(revision.modified_files) for revision in full.revisions] == [2, 1, 1]
+
+
+def test_current_revision_is_cached_until_changed(engine):
+    store = engine.store
+    dataset = create_dataset(store, f1="a", f2="b")
+    store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+
+    current = dataset.current_revision
+    assert dataset.current_revision is current
+    assert current.modified_files_map is current.modified_files_map
+    # Assigning modified_files resets the map, also with a list of the same length
+    current.modified_files = [
+        file.model_copy(update={"file_id": f"{file.file_id}-copy"})
+        for file in current.modified_files
+    ]
+    assert sorted(current.modified_files_map) == ["f1-copy", "f2-copy"]
+
+    store.add_revision(dataset, draft_files(f2="b2"), revision_source())
+    assert dataset.current_revision is not current
+    assert dataset.current_revision.revision_id == 2
+
+    # Invalidation reaches the cached squashed revision as well
+    store.invalidate_revision(dataset)
+    assert dataset.current_revision.state == RevisionState.VALIDATION_FAILED
+    assert all(
+        revision.state == RevisionState.VALIDATION_FAILED
+        for revision in dataset.revisions
+    )
@@ -0,0 +1,53 @@
+"""Saving a dataset only writes the revisions that are not stored yet."""
+from unittest.mock import patch
+
+import pytest
+
+from ingestify.tests.conftest import create_dataset, draft_files, revision_source
+
+
+def _add_revision(store, dataset, content):
+    return store.add_revision(dataset, draft_files(f1=content), revision_source())
+
+
+def test_only_new_revisions_are_written(engine):
+    store = engine.store
+    dataset = create_dataset(store, 1, f1="v0")
+    assert dataset.unsaved_revisions == []
+
+    repository = store.dataset_repository
+    with patch.object(repository, "_upsert", wraps=repository._upsert) as upsert:
+        for i in range(1, 4):
+            _add_revision(store, dataset, f"v{i}")
+
+    written = {}
+    for call in upsert.call_args_list:
+        table, entities = call.args[1], call.args[2]
+        written.setdefault(table.name, []).append(len(entities))
+
+    # One dataset, one revision and one file row per save
+    assert written[repository.dataset_table.name] == [1, 1, 1]
+    assert written[repository.revision_table.name] == [1, 1, 1]
+    assert written[repository.file_table.name] == [1, 1, 1]
+
+    dataset = store.get_dataset_collection().first()
+    assert [revision.revision_id for revision in dataset.revisions] == [0, 1, 2, 3]
+    files = store.load_files(dataset)
+    assert files.get_file("f1").stream.read() == b"v3"
+
+
+def test_failed_save_is_retried_in_full(engine):
+    store = engine.store
+    dataset = create_dataset(store, 1, f1="v0")
+
+    repository = store.dataset_repository
+    with patch.object(repository, "_upsert", side_effect=RuntimeError("db down")):
+        with pytest.raises(RuntimeError):
+            _add_revision(store, dataset, "v1")
+
+    # The revision that failed to save is still written by the next save
+    assert [r.revision_id for r in dataset.unsaved_revisions] == [1]
+    _add_revision(store, dataset, "v2")
+
+    dataset = store.get_dataset_collection().first()
+    assert [revision.revision_id for revision in dataset.revisions] == [0, 1, 2]
@@ -1,4 +1,5 @@
 import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 from unittest.mock import Mock
 
 from ingestify import DatasetResource
@@ -18,6 +19,8 @@ class TestIngestionJobEventEmission:
     def setup_method(self):
         """Set up test fixtures."""
         self.mock_store = Mock()
+        # No background uploads failed
+        self.mock_store.flush_uploads.return_value = []
 
         # Create a proper mock source that inherits from Source
         class MockTestSource(Source):
@@ -133,7 +136,7 @@ class TestIngestionJobEventEmission:
         self.mock_source._find_datasets_mock.return_value = iter([[dataset_resource]])
 
         # Mock fetch policy says don't refetch
-        self.mock_fetch_policy.should_refetch.return_value = False
+        self.mock_fetch_policy.should_refetch_many.return_value = [False]
 
         # Execute
         task_executor = TaskExecutor(dry_run=True)
@@ -181,16 +184,23 @@ class TestIngestionJobEventEmission:
         # Execute with a simple task executor that doesn't fail on None tasks
         task_executor = TaskExecutor(dry_run=True)
 
-        # Mock the task executor to simulate task execution
+        # Mock the task executor to simulate task execution. Tasks are submitted
+        # one by one and complete immediately.
         mock_task_summary = Mock()
-        mock_executor = Mock()
-        mock_executor.map.return_value = [mock_task_summary]
+
+        def submit(func, task):
+            future = Future()
+            future.set_result(mock_task_summary)
+            return future
+
+        mock_executor = Mock(spec=ThreadPoolExecutor)
+        mock_executor.submit.side_effect = submit
         task_executor.executor = mock_executor
 
         summaries = list(self.ingestion_job.execute(self.mock_store, task_executor))
 
         # Verify tasks were executed (mock executor was called)
-        assert mock_executor.map.called
+        assert mock_executor.submit.called
 
         # Verify no skipping events were dispatched (tasks should be created and executed instead)
         skipping_event_calls = [
@@ -0,0 +1,107 @@
+"""Tests for the thread/process/hybrid task executor backends."""
+import sys
+from queue import Queue
+
+import pytest
+
+from ingestify import Source, DatasetResource
+from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.dataset.events import RevisionAdded
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.exceptions import ConfigurationError
+from ingestify.utils import TaskExecutor, utcnow
+
+
+def json_loader(file_resource, current_file, **kwargs):
+    item_id = file_resource.dataset_resource.dataset_resource_id["item_id"]
+    return DraftFile.from_input(f'{{"item_id": {item_id}}}' * 1000, data_feed_key="f1")
+
+
+class SimpleSource(Source):
+    provider = "test_provider"
+    max_concurrency = 2
+
+    def find_datasets(
+        self, dataset_type, data_spec_versions, dataset_collection_metadata, **kwargs
+    ):
+        for i in range(4):
+            r = DatasetResource(
+                dataset_resource_id={"item_id": i},
+                provider=self.provider,
+                dataset_type="test",
+                name=f"item-{i}",
+            )
+            r.add_file(
+                last_modified=utcnow(),
+                data_feed_key="f1",
+                data_spec_version="v1",
+                file_loader=json_loader,
+            )
+            yield r
+
+
+def _setup(engine, backend):
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+    engine.loader.executor_backend = backend
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=SimpleSource("s"),
+            fetch_policy=FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown executor"):
+        TaskExecutor(backend="fibers")
+
+
+def test_process_backend_requires_cloudpickle(monkeypatch):
+    monkeypatch.delenv("INGESTIFY_RUN_EAGER")
+    monkeypatch.setitem(sys.modules, "cloudpickle", None)
+
+    with pytest.raises(ConfigurationError, match="cloudpickle"):
+        TaskExecutor(backend="process")
+
+
+def test_backend_from_environment(monkeypatch):
+    monkeypatch.delenv("INGESTIFY_RUN_EAGER")
+    monkeypatch.setenv("INGESTIFY_EXECUTOR", "hybrid")
+
+    with TaskExecutor(processes=1) as executor:
+        assert executor.backend == "hybrid"
+        assert executor.cpu_executor is not None
+        assert not executor.runs_in_processes
+
+
+@pytest.mark.parametrize("backend", ["process", "hybrid"])
+def test_ingest_with_backend(engine, monkeypatch, backend):
+    monkeypatch.delenv("INGESTIFY_RUN_EAGER")
+    _setup(engine, backend)
+
+    events = Queue()
+    engine.store.event_bus.register_queue(events)
+
+    engine.run()
+
+    datasets = engine.store.get_dataset_collection()
+    assert len(datasets) == 4
+    for dataset in datasets:
+        item_id = dataset.identifier["item_id"]
+        files = engine.store.load_files(dataset)
+        assert files.get_file("f1").stream.read() == (
+            f'{{"item_id": {item_id}}}' * 1000
+        ).encode("utf-8")
+
+    summaries = engine.store.dataset_repository.load_ingestion_job_summaries()
+    assert summaries[0].successful_tasks == 4
+
+    # Events dispatched in the workers reach the parent's EventBus
+    revisions_added = [
+        event for event in list(events.queue) if isinstance(event, RevisionAdded)
+    ]
+    assert len(revisions_added) == 4
@@ -1,11 +1,17 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from io import BytesIO
 from unittest.mock import patch
 from datetime import datetime, timezone
 
+from ingestify.application.file_cache import FileCache, FileCacheStats
 from ingestify.main import get_engine
 from ingestify.domain import Dataset, Identifier, Revision, File
 from ingestify.domain.models.dataset.revision import RevisionSource, SourceType
+from ingestify.tests.conftest import create_dataset
 
 
 def test_file_cache(engine):
@@ -95,3 +101,82 @@ def test_file_cache(engine):
 
         # Should have called load_content again
         assert mock_load_content.call_count == 2
+
+
+def test_lru_eviction_and_stats():
+    cache = FileCache(max_size=10)
+    cache.get("a", lambda: b"aaaa")
+    cache.get("b", lambda: b"bbbb")
+    assert cache.get("a", lambda: b"") == b"aaaa"
+
+    # Evicts "b", the least recently used
+    cache.get("c", lambda: b"cccc")
+    assert cache.stats == FileCacheStats(hits=1, misses=3, evictions=1, size=8, count=2)
+    assert cache.get("b", lambda: b"new") == b"new"
+
+    # Too large to keep
+    assert cache.get("large", lambda: b"x" * 11) == b"x" * 11
+    assert cache.get("large", lambda: b"y" * 11) == b"y" * 11
+
+
+def test_concurrent_misses_load_once():
+    cache = FileCache(max_size=1000)
+    calls = []
+    started = threading.Event()
+
+    def load():
+        calls.append(1)
+        started.wait(1)
+        return b"content"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get, "key", load) for _ in range(4)]
+        time.sleep(0.05)
+        started.set()
+        assert [future.result() for future in futures] == [b"content"] * 4
+    assert len(calls) == 1
+
+
+def test_failed_load_is_not_cached():
+    cache = FileCache(max_size=1000)
+
+    def load():
+        raise IOError("Failed")
+
+    with pytest.raises(IOError):
+        cache.get("key", load)
+    assert cache.get("key", lambda: b"content") == b"content"
+
+
+def test_cached_files_have_independent_streams(engine):
+    store = engine.store
+    dataset = create_dataset(store, events="0123456789")
+
+    with store.with_file_cache() as file_cache:
+        first = store.load_files(dataset).get_file("events").stream
+        second = store.load_files(dataset).get_file("events").stream
+
+        assert first.read(4) == b"0123"
+        assert second.read() == b"0123456789"
+        assert first.read() == b"456789"
+        assert (file_cache.stats.hits, file_cache.stats.misses) == (1, 1)
+
+
+def test_file_cache_is_shared_by_threads(engine):
+    store = engine.store
+    dataset = create_dataset(store, events="0123456789")
+
+    with store.with_file_cache() as file_cache:
+
+        def load(_):
+            # Nested scopes of the threads share the cache of the outer scope
+            with store.with_file_cache():
+                return store.load_files(dataset).get_file("events").stream.read()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert set(executor.map(load, range(8))) == {b"0123456789"}
+
+        assert store.file_cache is file_cache
+        assert file_cache.stats.misses == 1
+        assert file_cache.stats.hits == 7
+    assert store.file_cache is None
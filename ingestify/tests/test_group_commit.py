@@ -0,0 +1,178 @@
+"""Tests for the group-commit writer that combines dataset saves."""
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from ingestify import Source, DatasetResource
+from ingestify.application.group_commit import GroupCommitWriter
+from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.dataset.events import RevisionAdded
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.utils import utcnow
+
+
+class FakeDataset:
+    def __init__(self, dataset_id):
+        self.dataset_id = dataset_id
+
+
+class RecordingRepository:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.save_many_calls = []
+        self.saved = []
+
+    def save_many(self, bucket, datasets):
+        self.save_many_calls.append([dataset.dataset_id for dataset in datasets])
+        if self.fail_on is not None:
+            raise ValueError("batch failed")
+        self.saved.extend(dataset.dataset_id for dataset in datasets)
+
+    def save(self, bucket, dataset):
+        if dataset.dataset_id == self.fail_on:
+            raise ValueError(f"cannot save {dataset.dataset_id}")
+        self.saved.append(dataset.dataset_id)
+
+    def release_thread_resources(self):
+        pass
+
+
+def _save_concurrently(writer, dataset_ids):
+    errors = {}
+
+    def save(dataset_id):
+        try:
+            writer.save(FakeDataset(dataset_id))
+        except Exception as e:
+            errors[dataset_id] = e
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in dataset_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return errors
+
+
+def test_saves_are_combined_up_to_max_items():
+    repository = RecordingRepository()
+    with GroupCommitWriter(repository, "main", max_items=5, max_delay=5) as writer:
+        errors = _save_concurrently(writer, range(10))
+
+    assert not errors
+    assert sorted(repository.saved) == list(range(10))
+    assert [len(call) for call in repository.save_many_calls] == [5, 5]
+
+
+def test_flush_after_max_delay():
+    repository = RecordingRepository()
+    with GroupCommitWriter(repository, "main", max_items=100, max_delay=0.01) as writer:
+        writer.save(FakeDataset(1))
+        # Returned without waiting for 99 other saves
+        assert repository.saved == [1]
+
+
+def test_same_dataset_is_written_once_per_flush():
+    repository = RecordingRepository()
+    dataset = FakeDataset(1)
+    with GroupCommitWriter(repository, "main", max_items=2, max_delay=5) as writer:
+        futures = [writer.submit(dataset), writer.submit(dataset)]
+        for future in futures:
+            future.result(timeout=5)
+
+    assert repository.save_many_calls == [[1]]
+
+
+def test_failed_flush_falls_back_to_single_saves():
+    repository = RecordingRepository(fail_on=2)
+    with GroupCommitWriter(repository, "main", max_items=4, max_delay=5) as writer:
+        errors = _save_concurrently(writer, range(4))
+
+    assert list(errors) == [2]
+    assert sorted(repository.saved) == [0, 1, 3]
+
+
+def test_submit_after_close():
+    writer = GroupCommitWriter(RecordingRepository(), "main")
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(FakeDataset(1))
+
+
+def loader(file_resource, current_file, **kwargs):
+    return DraftFile.from_input("data", data_feed_key="f1")
+
+
+class SimpleSource(Source):
+    provider = "test_provider"
+    max_concurrency = 4
+
+    def find_datasets(
+        self, dataset_type, data_spec_versions, dataset_collection_metadata, **kwargs
+    ):
+        for i in range(8):
+            r = DatasetResource(
+                dataset_resource_id={"item_id": i},
+                provider=self.provider,
+                dataset_type="test",
+                name=f"item-{i}",
+            )
+            r.add_file(
+                last_modified=utcnow(),
+                data_feed_key="f1",
+                data_spec_version="v1",
+                file_loader=loader,
+            )
+            yield r
+
+
+def test_concurrent_tasks_share_transactions(engine, monkeypatch):
+    monkeypatch.delenv("INGESTIFY_RUN_EAGER")
+    monkeypatch.setenv("INGESTIFY_GROUP_COMMIT_DELAY_MS", "200")
+
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=SimpleSource("s"),
+            fetch_policy=FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+
+    repository = engine.store.dataset_repository
+    committed = set()
+    save_many = repository.save_many
+
+    def recording_save_many(bucket, datasets):
+        save_many(bucket=bucket, datasets=datasets)
+        committed.update(dataset.dataset_id for dataset in datasets)
+
+    events_before_commit = []
+
+    class Dispatcher:
+        def dispatch(self, event):
+            if (
+                isinstance(event, RevisionAdded)
+                and event.dataset.dataset_id not in committed
+            ):
+                events_before_commit.append(event)
+
+    engine.store.event_bus.register(Dispatcher())
+
+    with patch.object(
+        repository, "save_many", side_effect=recording_save_many
+    ) as save_many_mock, patch.object(repository, "save", wraps=repository.save) as (
+        save_mock
+    ):
+        engine.run()
+
+    assert len(engine.store.get_dataset_collection()) == 8
+    assert len(committed) == 8
+    assert not events_before_commit
+    assert save_mock.call_count == 0
+    # Four tasks run at the same time
+    assert save_many_mock.call_count < 8
@@ -0,0 +1,81 @@
+"""The current_revision_* columns on the dataset row follow the latest revision."""
+from sqlalchemy import select, text
+
+from ingestify.domain import DatasetState
+from ingestify.domain.models.dataset.revision import RevisionState
+from ingestify.infra.store.dataset.sqlalchemy.repository import (
+    SqlAlchemySessionProvider,
+)
+from ingestify.tests.conftest import create_dataset, draft_files, revision_source
+
+
+def _summary(store, dataset):
+    return store.get_dataset_summary_map(provider="test_provider", dataset_type="test")[
+        dataset.identifier.key
+    ]
+
+
+def test_head_follows_revisions(engine):
+    store = engine.store
+    dataset = create_dataset(store, 1, f1="a")
+
+    summary = _summary(store, dataset)
+    assert summary.has_revisions
+    assert summary.current_state == RevisionState.PENDING_VALIDATION
+    assert summary.current_created_at == dataset.revisions[0].created_at
+
+    revision = store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+    assert _summary(store, dataset).current_created_at == revision.created_at
+
+    # A save without a new revision keeps the head
+    store.update_dataset(
+        dataset,
+        name="renamed",
+        state=DatasetState.COMPLETE,
+        metadata={},
+        files={},
+        revision_source=revision_source(),
+    )
+    summary = _summary(store, dataset)
+    assert summary.has_revisions
+    assert summary.current_created_at == revision.created_at
+
+    store.invalidate_revision(dataset)
+    summary = _summary(store, dataset)
+    assert summary.current_state == RevisionState.VALIDATION_FAILED
+    assert summary.last_modified is None
+
+
+def test_backfill_existing_store(engine):
+    store = engine.store
+    dataset = create_dataset(store, 1, f1="a")
+    revision = store.add_revision(dataset, draft_files(f1="a2"), revision_source())
+
+    # Turn it into a store created before the columns existed
+    session_provider = store.dataset_repository.session_provider
+    table_name = session_provider.dataset_table.name
+    with session_provider.engine.begin() as connection:
+        for column in (
+            "current_revision_id",
+            "current_revision_state",
+            "current_revision_created_at",
+        ):
+            connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column}"))
+
+    session_provider = SqlAlchemySessionProvider(
+        session_provider.url, table_prefix=session_provider.table_prefix
+    )
+    table = session_provider.dataset_table
+    with session_provider.engine.connect() as connection:
+        head = connection.execute(
+            select(
+                table.c.current_revision_id,
+                table.c.current_revision_state,
+                table.c.current_revision_created_at,
+            ).where(table.c.dataset_id == dataset.dataset_id)
+        ).one()
+    session_provider.close()
+
+    assert head.current_revision_id == 1
+    assert head.current_revision_state == RevisionState.PENDING_VALIDATION
+    assert head.current_revision_created_at == revision.created_at
@@ -5,10 +5,13 @@ import pytest
 import sqlalchemy
 
 from ingestify.application.dataset_store import DatasetStore
+from ingestify.domain import Dataset, DatasetState, Identifier, Selector
+from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
 from ingestify.infra.store.dataset.sqlalchemy.repository import (
     SqlAlchemySessionProvider,
     SqlAlchemyDatasetRepository,
 )
+from ingestify.utils import utcnow
 
 
 INDEX_CONFIGS = [
@@ -53,10 +56,98 @@ def repository(ingestify_test_database_url, db_cleanup):
     provider.drop_all_tables()
 
 
-def test_create_identifier_indexes_sqlite_noop(repository):
-    """No-op on non-Postgres databases — must not raise."""
+def test_create_identifier_indexes_sqlite(repository):
+    """Creates expression indexes on SQLite."""
+    if repository.session_provider.engine.dialect.name != "sqlite":
+        pytest.skip("Expression index test requires SQLite")
+
     repository.create_identifier_indexes(INDEX_CONFIGS)
 
+    with repository.session_provider.engine.connect() as conn:
+        result = conn.execute(
+            sqlalchemy.text(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND name LIKE 'idx_dataset_identifier_%'"
+            )
+        )
+        index_names = {row[0] for row in result}
+
+    assert index_names == {
+        "idx_dataset_identifier_test_keyword_metrics",
+        "idx_dataset_identifier_test_keyword_set",
+    }
+
+
+def test_selector_lookup_uses_identifier_index(ingestify_test_database_url, db_cleanup):
+    """Selector queries use the same casts as the index, on SQLite the plan
+    searches the expression index."""
+    transformer = IdentifierTransformer()
+    for key in INDEX_CONFIGS[1]["keys"]:
+        transformer.register_transformation(
+            provider="test",
+            dataset_type="keyword_set",
+            id_key=key["name"],
+            transformation="identity",
+            key_type=key["key_type"],
+        )
+    provider = SqlAlchemySessionProvider(ingestify_test_database_url)
+    repository = SqlAlchemyDatasetRepository(
+        provider, identifier_transformer=transformer
+    )
+    try:
+        now = utcnow()
+        for i in range(5):
+            repository.save(
+                "main",
+                Dataset(
+                    bucket="main",
+                    dataset_id=f"d{i}",
+                    name=f"Dataset {i}",
+                    state=DatasetState.COMPLETE,
+                    identifier=Identifier(dataset_id=i, table_name=f"table{i}"),
+                    dataset_type="keyword_set",
+                    provider="test",
+                    metadata={},
+                    created_at=now,
+                    updated_at=now,
+                    last_modified_at=None,
+                ),
+            )
+        repository.create_identifier_indexes(INDEX_CONFIGS)
+
+        selector = [
+            # Values are converted to the declared key_type
+            Selector({"dataset_id": "1", "table_name": "table1"}),
+            Selector({"dataset_id": 3, "table_name": "table3"}),
+            Selector({"dataset_id": 4, "table_name": "other"}),
+        ]
+        collection = repository.get_dataset_collection(
+            bucket="main",
+            provider="test",
+            dataset_type="keyword_set",
+            selector=selector,
+        )
+        assert sorted(dataset.dataset_id for dataset in collection) == ["d1", "d3"]
+
+        if provider.engine.dialect.name == "sqlite":
+            query = repository._filter_query(
+                sqlalchemy.select(repository.dataset_table.c.dataset_id),
+                bucket="main",
+                provider="test",
+                dataset_type="keyword_set",
+                selector=selector,
+            ).compile(dialect=repository.dialect)
+            with provider.engine.connect() as conn:
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {query}",
+                    tuple(query.params[name] for name in query.positiontup),
+                ).all()
+            assert any(
+                "idx_dataset_identifier_test_keyword_set" in row[-1] for row in plan
+            )
+    finally:
+        provider.drop_all_tables()
+
 
 def test_create_identifier_indexes_creates_indexes(repository):
     """Creates composite expression indexes on Postgres; skipped on other DBs."""
@@ -0,0 +1,105 @@
+"""Exact identifier lookups through the identifier_key column."""
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from ingestify.domain import Dataset, DatasetState, Identifier
+from ingestify.infra.store.dataset.sqlalchemy.repository import (
+    SqlAlchemyDatasetRepository,
+    SqlAlchemySessionProvider,
+    get_identifier_key,
+)
+from ingestify.utils import utcnow
+
+
+def _dataset(dataset_id, identifier, dataset_type="match"):
+    now = utcnow()
+    return Dataset(
+        bucket="main",
+        dataset_id=dataset_id,
+        name=dataset_id,
+        state=DatasetState.COMPLETE,
+        identifier=identifier,
+        dataset_type=dataset_type,
+        provider="test_provider",
+        metadata={},
+        created_at=now,
+        updated_at=now,
+        last_modified_at=None,
+    )
+
+
+def test_lookup_by_exact_identifiers(engine):
+    repository = engine.store.dataset_repository
+    for i in range(5):
+        repository.save(
+            "main", _dataset(f"d{i}", Identifier(competition_id=1, match_id=i))
+        )
+    # Same identifier, other dataset_type
+    repository.save(
+        "main",
+        _dataset("other", Identifier(competition_id=1, match_id=1), "lineup"),
+    )
+
+    collection = engine.store.get_dataset_collection(
+        dataset_type="match",
+        provider="test_provider",
+        selector=[
+            Identifier(competition_id=1, match_id=1),
+            Identifier(competition_id=1, match_id=3),
+            Identifier(competition_id=1, match_id=99),
+        ],
+    )
+    assert sorted(dataset.dataset_id for dataset in collection) == ["d1", "d3"]
+
+    with repository.session_provider.engine.connect() as connection:
+        keys = connection.execute(
+            select(repository.dataset_table.c.identifier_key).where(
+                repository.dataset_table.c.dataset_id == "d1"
+            )
+        ).scalar()
+    assert keys == "competition_id=1/match_id=1"
+
+
+def test_identifier_key_is_unique(engine):
+    repository = engine.store.dataset_repository
+    repository.save("main", _dataset("d1", Identifier(match_id=1)))
+
+    with pytest.raises(IntegrityError):
+        repository.save("main", _dataset("d2", Identifier(match_id=1)))
+
+
+def test_long_identifier_key_is_hashed():
+    key = get_identifier_key({"keyword": "x" * 300})
+    assert key.startswith("sha1:")
+    assert len(key) <= 255
+
+
+def test_backfill_existing_store(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    session_provider = SqlAlchemySessionProvider(url)
+    repository = SqlAlchemyDatasetRepository(session_provider)
+    for i in range(3):
+        repository.save("main", _dataset(f"d{i}", Identifier(match_id=i)))
+
+    # Turn it into a store created before the identifier_key column existed
+    table_name = repository.dataset_table.name
+    with session_provider.engine.begin() as connection:
+        connection.execute(text("DROP INDEX idx_bucket_provider_type_identifier_key"))
+        connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN identifier_key"))
+    session_provider.close()
+
+    session_provider = SqlAlchemySessionProvider(url)
+    repository = SqlAlchemyDatasetRepository(session_provider)
+
+    collection = repository.get_dataset_collection(
+        bucket="main", identifiers=[Identifier(match_id=2)]
+    )
+    assert [dataset.dataset_id for dataset in collection] == ["d2"]
+
+    repository.create_table_indexes()
+    index_names = [
+        index["name"]
+        for index in inspect(session_provider.engine).get_indexes(table_name)
+    ]
+    assert "idx_bucket_provider_type_identifier_key" in index_names
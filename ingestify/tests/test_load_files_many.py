@@ -0,0 +1,95 @@
+"""load_files_many / iter_datasets(prefetch=N): files of the next datasets are
+loaded on a thread pool."""
+import threading
+import time
+
+import pytest
+
+from ingestify.tests.conftest import create_dataset
+
+
+def _create_datasets(store, count):
+    for i in range(count):
+        create_dataset(store, i, events=f"events-{i:04}", lineups=f"lineups-{i:04}")
+    return list(store.get_dataset_collection())
+
+
+class _Tracker:
+    """Wraps load_files to record how many loads run at the same time"""
+
+    def __init__(self, load_files, delay=0.02):
+        self.load_files = load_files
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            return self.load_files(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_files_are_loaded_in_order(engine):
+    store = engine.store
+    datasets = _create_datasets(store, 10)
+    store.load_files = tracker = _Tracker(store.load_files)
+
+    loaded = list(store.load_files_many(datasets, data_feed_keys=["events"]))
+
+    assert [dataset for dataset, _ in loaded] == datasets
+    for dataset, files in loaded:
+        item_id = dataset.identifier["item_id"]
+        assert files.get_file("events").stream.read() == f"events-{item_id:04}".encode()
+        assert files.get_file("lineups") is None
+    assert tracker.max_running > 1
+
+
+def test_prefetch_is_bounded_by_size(engine):
+    store = engine.store
+    datasets = _create_datasets(store, 6)
+    store.load_files = tracker = _Tracker(store.load_files)
+
+    # Every dataset has 22 bytes: only one is prefetched at a time
+    for _ in store.load_files_many(datasets, prefetch=4, max_size=20):
+        time.sleep(0.05)
+    assert tracker.max_running == 1
+
+
+def test_stopping_early_cancels_prefetch(engine):
+    store = engine.store
+    datasets = _create_datasets(store, 20)
+    store.load_files = tracker = _Tracker(store.load_files)
+
+    iterator = store.load_files_many(datasets, prefetch=4)
+    next(iterator)
+    iterator.close()
+    assert tracker.calls <= 5
+
+
+def test_iter_datasets_with_prefetch(engine):
+    _create_datasets(engine.store, 5)
+
+    pairs = list(
+        engine.iter_datasets(
+            provider="test_provider", prefetch=2, data_feed_keys=["lineups"]
+        )
+    )
+    assert len(pairs) == 5
+    for dataset, files in pairs:
+        item_id = dataset.identifier["item_id"]
+        assert [file.data_feed_key for file in files.values()] == ["lineups"]
+        assert (
+            files.get_file("lineups").stream.read() == f"lineups-{item_id:04}".encode()
+        )
+
+    with pytest.raises(ValueError):
+        next(engine.iter_datasets(prefetch=2, yield_dataset_collection=True))
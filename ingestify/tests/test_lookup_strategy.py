@@ -0,0 +1,100 @@
+"""Selector and dataset id lookups with both lookup strategies."""
+import pytest
+
+from ingestify.domain import Dataset, DatasetState, Identifier, Selector
+from ingestify.infra.store.dataset.sqlalchemy.repository import (
+    SqlAlchemyDatasetRepository,
+)
+from ingestify.utils import utcnow
+
+
+def _save_datasets(repository, count):
+    now = utcnow()
+    repository.save_many(
+        "main",
+        [
+            Dataset(
+                bucket="main",
+                dataset_id=f"d{i}",
+                name=f"Dataset {i}",
+                state=DatasetState.COMPLETE,
+                identifier=Identifier(competition_id=i % 2, match_id=i),
+                dataset_type="match",
+                provider="test_provider",
+                metadata={},
+                created_at=now,
+                updated_at=now,
+                last_modified_at=None,
+            )
+            for i in range(count)
+        ],
+    )
+
+
+@pytest.mark.parametrize("lookup_strategy", ["array", "cte"])
+def test_lookups(engine, lookup_strategy):
+    repository = SqlAlchemyDatasetRepository(
+        engine.store.dataset_repository.session_provider,
+        lookup_strategy=lookup_strategy,
+    )
+    _save_datasets(repository, 10)
+
+    collection = repository.get_dataset_collection(
+        bucket="main",
+        selector=[
+            Selector({"competition_id": 1, "match_id": 3}),
+            Selector({"competition_id": 0, "match_id": 4}),
+            # Wrong competition
+            Selector({"competition_id": 0, "match_id": 5}),
+        ],
+    )
+    assert sorted(dataset.dataset_id for dataset in collection) == ["d3", "d4"]
+
+    collection = repository.get_dataset_collection(
+        bucket="main", dataset_id=["d1", "d7", "unknown"]
+    )
+    assert sorted(dataset.dataset_id for dataset in collection) == ["d1", "d7"]
+
+    collection = repository.get_dataset_collection(
+        bucket="main",
+        identifiers=[Identifier(competition_id=0, match_id=8)],
+    )
+    assert [dataset.dataset_id for dataset in collection] == ["d8"]
+
+
+@pytest.mark.parametrize("lookup_strategy", ["array", "cte"])
+def test_lookup_with_mixed_value_types(engine, lookup_strategy):
+    repository = SqlAlchemyDatasetRepository(
+        engine.store.dataset_repository.session_provider,
+        lookup_strategy=lookup_strategy,
+    )
+    _save_datasets(repository, 4)
+
+    # An int first, then a value that's not an int: compared as text
+    collection = repository.get_dataset_collection(
+        bucket="main",
+        selector=[Selector({"match_id": 3}), Selector({"match_id": "abc"})],
+    )
+    assert [dataset.dataset_id for dataset in collection] == ["d3"]
+
+
+def test_array_lookup_sql_does_not_depend_on_values(engine):
+    repository = SqlAlchemyDatasetRepository(
+        engine.store.dataset_repository.session_provider, lookup_strategy="array"
+    )
+
+    def compiled_sql(size):
+        cte = repository._build_cte(
+            [{"competition_id": 1, "match_id": i} for i in range(size)],
+            "attributes",
+        )
+        return str(cte.select().compile(dialect=repository.dialect))
+
+    assert compiled_sql(1) == compiled_sql(1000)
+
+
+def test_unknown_lookup_strategy(engine):
+    with pytest.raises(ValueError):
+        SqlAlchemyDatasetRepository(
+            engine.store.dataset_repository.session_provider, lookup_strategy="x"
+        )
@@ -158,3 +158,107 @@ def test_dataset_state_filter(engine):
         assert dataset.state == DatasetState.SCHEDULED
 
     assert len(scheduled_dataset_ids) == 3
+
+
+def _save_datasets(store, count, created_at):
+    for i in range(count):
+        dataset = Dataset(
+            bucket=store.bucket,
+            dataset_id=f"dataset-{i:02d}",
+            name=f"Dataset {i}",
+            state="COMPLETE",
+            identifier=Identifier(test_id=i),
+            dataset_type="test",
+            provider="test-provider",
+            metadata={},
+            created_at=created_at(i),
+            updated_at=created_at(i),
+            last_modified_at=created_at(i),
+        )
+        store.dataset_repository.save(store.bucket, dataset)
+
+
+def test_keyset_pagination_with_equal_created_at(engine):
+    """Datasets created at the same moment are ordered by dataset_id, so no
+    dataset is skipped or returned twice at a page boundary."""
+    store = engine.store
+    now = datetime.now(pytz.utc)
+    # Three datasets per timestamp
+    _save_datasets(store, 20, lambda i: now + timedelta(seconds=i // 3))
+
+    dataset_ids = [
+        dataset.dataset_id
+        for dataset in store.iter_dataset_collection_batches(batch_size=4)
+    ]
+    assert dataset_ids == [f"dataset-{i:02d}" for i in range(20)]
+
+
+def test_keyset_pagination_resume_from_cursor(engine):
+    from ingestify.domain import DatasetCursor
+
+    store = engine.store
+    now = datetime.now(pytz.utc)
+    _save_datasets(store, 12, lambda i: now + timedelta(minutes=i))
+
+    collections = list(
+        store.iter_dataset_collection_batches(
+            batch_size=5, yield_dataset_collection=True
+        )
+    )
+    assert [len(collection) for collection in collections] == [5, 5, 2]
+    assert collections[-1].metadata.next_cursor is None
+
+    cursor = collections[0].metadata.next_cursor.encode()
+    assert DatasetCursor.decode(cursor) == collections[0].metadata.next_cursor
+
+    # Datasets created while iterating end up at the end, not on a next page
+    resumed = [
+        dataset.dataset_id
+        for dataset in engine.iter_datasets(after=cursor, batch_size=5)
+    ]
+    assert resumed == [f"dataset-{i:02d}" for i in range(5, 12)]
+
+    last = store.get_dataset_collection(dataset_id="dataset-09").first()
+    resumed = [
+        dataset.dataset_id
+        for dataset in store.iter_dataset_collection_batches(
+            after=DatasetCursor.from_dataset(last)
+        )
+    ]
+    assert resumed == ["dataset-10", "dataset-11"]
+
+
+def test_invalid_cursor(engine):
+    with pytest.raises(ValueError, match="Invalid dataset cursor"):
+        list(engine.store.iter_dataset_collection_batches(after="not-a-cursor"))
+
+
+def test_offset_pagination_still_available(engine):
+    store = engine.store
+    now = datetime.now(pytz.utc)
+    _save_datasets(store, 7, lambda i: now + timedelta(minutes=i))
+
+    dataset_ids = [
+        dataset.dataset_id
+        for dataset in store.iter_dataset_collection_batches(
+            batch_size=3, pagination="offset"
+        )
+    ]
+    assert dataset_ids == [f"dataset-{i:02d}" for i in range(7)]
+
+
+def test_create_missing_table_indexes(engine):
+    from sqlalchemy import inspect
+
+    repository = engine.store.dataset_repository
+    table_name = repository.dataset_table.name
+    index_name = (
+        f"{repository.session_provider.table_prefix}idx_bucket_created_at_dataset_id"
+    )
+    with repository.session_provider.engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index_name}")
+
+    engine.store.create_indexes()
+
+    indexes = inspect(repository.session_provider.engine).get_indexes(table_name)
+    assert index_name in [index["name"] for index in indexes]
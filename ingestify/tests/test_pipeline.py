@@ -0,0 +1,284 @@
+"""Tests for pipelined batch execution (INGESTIFY_PIPELINE_DEPTH)."""
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from ingestify import Source, DatasetResource
+from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.domain.models.dataset.events import DatasetSkipped
+from ingestify.exceptions import FatalError, StopProcessing
+from ingestify.utils import pipelined, utcnow
+
+
+def _dataset_resource(item_id, file_loader):
+    r = DatasetResource(
+        dataset_resource_id={"item_id": item_id},
+        provider="test_provider",
+        dataset_type="test",
+        name=f"item-{item_id}",
+    )
+    r.add_file(
+        last_modified=utcnow(),
+        data_feed_key="f1",
+        data_spec_version="v1",
+        file_loader=file_loader,
+    )
+    return r
+
+
+class BatchedSource(Source):
+    """Yields `batch_count` batches of two datasets. While the first batch is
+    loading files, the source records whether the second batch was already
+    requested."""
+
+    provider = "test_provider"
+
+    def __init__(self, name, batch_count=3, fail_after=None):
+        super().__init__(name)
+        self.batch_count = batch_count
+        self.fail_after = fail_after
+        self.second_batch_requested = threading.Event()
+        self.overlapped = False
+
+    def _loader(self, file_resource, current_file, **kwargs):
+        if file_resource.dataset_resource.dataset_resource_id["item_id"] == 0:
+            self.overlapped = self.second_batch_requested.wait(timeout=5)
+        return DraftFile.from_input("data", data_feed_key="f1")
+
+    def find_datasets(
+        self, dataset_type, data_spec_versions, dataset_collection_metadata, **kwargs
+    ):
+        for batch_idx in range(self.batch_count):
+            if batch_idx == self.fail_after:
+                raise FatalError("account deactivated")
+            if batch_idx == 1:
+                self.second_batch_requested.set()
+            yield [_dataset_resource(batch_idx * 2 + i, self._loader) for i in range(2)]
+
+
+def _setup(engine, source, fetch_policy=None):
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=source,
+            fetch_policy=fetch_policy or FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+
+
+def test_pipelined_preserves_order():
+    assert list(pipelined(range(20), lambda x: x * 2, lambda x: x + 1)) == [
+        x * 2 + 1 for x in range(20)
+    ]
+
+
+def test_pipelined_reraises_stage_error():
+    def stage(x):
+        if x == 3:
+            raise ValueError("boom")
+        return x
+
+    with pytest.raises(ValueError, match="boom"):
+        list(pipelined(range(10), stage))
+
+
+def test_pipelined_close_waits_for_stages():
+    running = threading.Event()
+    finished = threading.Event()
+
+    def stage(x):
+        if x == 1:
+            running.set()
+            time.sleep(0.2)
+            finished.set()
+        return x
+
+    generator = pipelined(range(10), stage, maxsize=2)
+    assert next(generator) == 0
+    assert running.wait(5)
+    generator.close()
+    # The stage was not left running in the background
+    assert finished.is_set()
+
+
+def test_next_batch_discovered_while_executing(engine, monkeypatch):
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", "1")
+    source = BatchedSource("s")
+    _setup(engine, source)
+
+    engine.run()
+
+    assert source.overlapped, "second batch was not discovered ahead of execution"
+    datasets = engine.store.get_dataset_collection()
+    assert len(datasets) == 6
+
+    summaries = engine.store.dataset_repository.load_ingestion_job_summaries()
+    assert len(summaries) == 1
+    assert summaries[0].successful_tasks == 6
+    timing_names = {timing.name for timing in summaries[0].timings}
+    assert {"find_datasets", "get_dataset_collection", "build_task_set"}.issubset(
+        timing_names
+    )
+
+
+def test_sequential_by_default(engine, monkeypatch):
+    monkeypatch.delenv("INGESTIFY_PIPELINE_DEPTH", raising=False)
+    source = BatchedSource("s")
+    source.second_batch_requested.set()  # Don't block the first batch
+    _setup(engine, source)
+
+    engine.run()
+
+    assert len(engine.store.get_dataset_collection()) == 6
+
+
+def test_pipelined_fatal_error_in_find_datasets_propagates(engine, monkeypatch):
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", "2")
+    source = BatchedSource("s", fail_after=2)
+    _setup(engine, source)
+
+    with pytest.raises(FatalError, match="deactivated"):
+        engine.run()
+
+    # Batches discovered before the failure are still ingested
+    assert len(engine.store.get_dataset_collection()) == 4
+
+
+LAST_MODIFIED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class ScriptedSource(Source):
+    """Yields one batch per entry of `batches` (lists of item ids). Files have
+    a fixed last_modified, so a dataset is up-to-date once it's stored."""
+
+    provider = "test_provider"
+
+    def __init__(self, name, batches, loader_delay=0.0, stop_on=None):
+        super().__init__(name)
+        self.batches = batches
+        self.loader_delay = loader_delay
+        self.stop_on = stop_on
+        self.loaded = []
+        self.batches_requested = 0
+        self.requested_while_executing_first = None
+
+    def _loader(self, file_resource, current_file, **kwargs):
+        item_id = file_resource.dataset_resource.dataset_resource_id["item_id"]
+        time.sleep(self.loader_delay)
+        if item_id == self.stop_on:
+            raise StopProcessing("quota")
+        if self.requested_while_executing_first is None:
+            self.requested_while_executing_first = self.batches_requested
+        self.loaded.append(item_id)
+        return DraftFile.from_input("data", data_feed_key="f1")
+
+    def find_datasets(
+        self, dataset_type, data_spec_versions, dataset_collection_metadata, **kwargs
+    ):
+        for item_ids in self.batches:
+            self.batches_requested += 1
+            batch = []
+            for item_id in item_ids:
+                r = DatasetResource(
+                    dataset_resource_id={"item_id": item_id},
+                    provider=self.provider,
+                    dataset_type="test",
+                    name=f"item-{item_id}",
+                )
+                r.add_file(
+                    last_modified=LAST_MODIFIED,
+                    data_feed_key="f1",
+                    data_spec_version="v1",
+                    file_loader=self._loader,
+                )
+                batch.append(r)
+            yield batch
+
+
+@pytest.mark.parametrize("pipeline_depth", ["0", "1", "2"])
+def test_identifier_repeated_across_batches(engine, monkeypatch, pipeline_depth):
+    """A batch resolved while an earlier batch with the same dataset was still
+    running must not create the dataset a second time."""
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", pipeline_depth)
+    source = ScriptedSource("s", [[0], [0], [0]], loader_delay=0.1)
+    _setup(engine, source)
+
+    engine.run()
+
+    assert source.loaded == [0]
+    summaries = engine.store.dataset_repository.load_ingestion_job_summaries()
+    assert summaries[0].successful_tasks == 1
+    assert summaries[0].skipped_tasks == 2
+    assert len(engine.store.get_dataset_collection()) == 1
+
+
+@pytest.mark.parametrize("pipeline_depth", [1, 2])
+def test_lookahead_is_bounded_by_pipeline_depth(engine, monkeypatch, pipeline_depth):
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", str(pipeline_depth))
+    source = ScriptedSource("s", [[i] for i in range(10)], loader_delay=0.3)
+    _setup(engine, source)
+
+    engine.run()
+
+    # The batch being executed plus at most `pipeline_depth` ahead of it
+    assert source.requested_while_executing_first == 1 + pipeline_depth
+    assert len(source.loaded) == 10
+
+
+class NeverRefetchPolicy(FetchPolicy):
+    def can_skip(self, summary, dataset_resource):
+        return False
+
+    def should_refetch(self, dataset, dataset_resource):
+        return False
+
+
+def test_dataset_skipped_not_dispatched_for_unexecuted_batch(engine, monkeypatch):
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", "2")
+    _setup(engine, ScriptedSource("s", [[1]]), NeverRefetchPolicy())
+    engine.run()
+
+    # Batch 0 aborts the job; batch 1 (an up-to-date dataset) is already built
+    # by then, but never executed.
+    engine.loader.ingestion_plans.clear()
+    source = ScriptedSource("s", [[5], [1]], loader_delay=0.3, stop_on=5)
+    _setup(engine, source, NeverRefetchPolicy())
+
+    with patch.object(engine.store, "dispatch") as dispatch:
+        with pytest.raises(StopProcessing):
+            engine.run()
+
+    assert source.batches_requested == 2
+    assert not [
+        call
+        for call in dispatch.call_args_list
+        if isinstance(call[0][0], DatasetSkipped)
+    ]
+
+
+def test_stage_threads_release_their_session(engine, monkeypatch):
+    monkeypatch.setenv("INGESTIFY_PIPELINE_DEPTH", "1")
+    _setup(engine, ScriptedSource("s", [[0], [1]]))
+
+    with patch.object(
+        engine.store,
+        "release_thread_resources",
+        wraps=engine.store.release_thread_resources,
+    ) as release:
+        engine.run()
+
+        # One discover thread and two stage threads; they exit right after the
+        # last batch was handed over.
+        deadline = time.time() + 2
+        while release.call_count < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert release.call_count == 3
@@ -0,0 +1,106 @@
+"""load_files(streaming=True): lazily decompressing, seekable file streams."""
+import gzip
+import io
+
+import pytest
+
+from ingestify.application.compression import (
+    CodecRegistry,
+    GzipCodec,
+    _RewindingReader,
+)
+from ingestify.tests.conftest import create_dataset
+from ingestify.utils import BufferedStream, MappedStream
+
+CONTENT = b"".join(b'{"event_id": %d},' % i for i in range(50_000))
+
+
+def test_streaming_gzip(engine):
+    dataset = create_dataset(engine.store, events=CONTENT)
+
+    stream = engine.store.load_files(dataset, streaming=True).get_file("events").stream
+    assert not isinstance(stream, BufferedStream)
+    assert stream.read(100) == CONTENT[:100]
+
+    stream.seek(500_000)
+    assert stream.read(100) == CONTENT[500_000:500_100]
+    stream.seek(10)
+    assert stream.read() == CONTENT[10:]
+    stream.close()
+
+
+def test_streaming_uncompressed_local_file_is_mapped(engine):
+    store = engine.store
+    store.codecs = CodecRegistry(default="none")
+    store.codecs.bind(store.file_repository, store.bucket)
+    dataset = create_dataset(store, events=CONTENT)
+
+    files = store.load_files(dataset, streaming=True)
+    stream = files.get_file("events").stream
+    assert isinstance(stream, MappedStream)
+    assert stream.getbuffer() == CONTENT
+
+    stream.seek(-10, io.SEEK_END)
+    assert stream.read() == CONTENT[-10:]
+    # auto_rewind
+    assert files.get_file("events").stream.read(5) == CONTENT[:5]
+    stream.close()
+
+
+def test_lazy_and_streaming(engine):
+    dataset = create_dataset(engine.store, events=CONTENT)
+
+    files = engine.store.load_files(dataset, lazy=True, streaming=True)
+    assert files.get_file("events").stream.read() == CONTENT
+
+
+class _ForwardOnly(io.RawIOBase):
+    """A download that can't seek"""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+
+def test_unseekable_source_is_spooled():
+    compressed, _ = GzipCodec().compress(io.BytesIO(CONTENT), "events")
+    stream = GzipCodec().open(_ForwardOnly(compressed.read()), "gzip")
+
+    stream.seek(1000)
+    stream.seek(0)
+    assert stream.read() == CONTENT
+
+
+def test_rewinding_reader():
+    source = io.BytesIO(gzip.compress(CONTENT))
+    stream = _RewindingReader(source, lambda fp: gzip.GzipFile(fileobj=fp))
+
+    assert stream.read(10) == CONTENT[:10]
+    assert stream.seek(5) == 5
+    assert stream.read(5) == CONTENT[5:10]
+    assert stream.seek(-5, io.SEEK_END) == len(CONTENT) - 5
+    assert stream.read() == CONTENT[-5:]
+
+    stream.close()
+    assert source.closed
+    with pytest.raises(ValueError):
+        stream.read()
+
+
+def test_streaming_zstd(engine):
+    pytest.importorskip("zstandard")
+    store = engine.store
+    store.codecs = CodecRegistry(default="zstd")
+    store.codecs.bind(store.file_repository, store.bucket)
+    dataset = create_dataset(store, events=CONTENT)
+
+    stream = store.load_files(dataset, streaming=True).get_file("events").stream
+    stream.seek(500_000)
+    assert stream.read(100) == CONTENT[500_000:500_100]
+    stream.seek(0)
+    assert stream.read() == CONTENT
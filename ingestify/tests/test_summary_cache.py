@@ -0,0 +1,129 @@
+"""DatasetSummaryCache: selector scoped, incrementally refreshed summary maps."""
+from datetime import timedelta
+
+from ingestify.application.summary_cache import DatasetSummaryCache
+from ingestify.domain import Dataset, DatasetState, Identifier, Selector
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
+from ingestify.utils import utcnow
+
+
+def _dataset(dataset_id, competition_id, match_id, updated_at=None):
+    now = utcnow()
+    return Dataset(
+        bucket="main",
+        dataset_id=dataset_id,
+        name=dataset_id,
+        state=DatasetState.COMPLETE,
+        identifier=Identifier(competition_id=competition_id, match_id=match_id),
+        dataset_type="match",
+        provider="test_provider",
+        metadata={},
+        created_at=now,
+        updated_at=updated_at or now,
+        last_modified_at=None,
+    )
+
+
+def _fill(repository):
+    for i in range(6):
+        repository.save("main", _dataset(f"d{i}", competition_id=i % 2, match_id=i))
+
+
+def test_map_is_scoped_by_selector(engine):
+    _fill(engine.store.dataset_repository)
+    cache = DatasetSummaryCache(engine.store)
+
+    summary_map = cache.get("test_provider", "match", Selector(competition_id=1))
+    assert len(summary_map) == 3
+    assert "competition_id=1/match_id=1" in summary_map
+    assert "competition_id=0/match_id=0" not in summary_map
+
+    assert len(cache.get("test_provider", "match")) == 6
+
+
+def test_refresh_reads_updated_datasets(engine):
+    repository = engine.store.dataset_repository
+    _fill(repository)
+    cache = DatasetSummaryCache(engine.store)
+    selector = Selector(competition_id=1)
+    summary_map = cache.get("test_provider", "match", selector)
+
+    calls = []
+    get_dataset_summary_map = engine.store.get_dataset_summary_map
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return get_dataset_summary_map(**kwargs)
+
+    engine.store.get_dataset_summary_map = spy
+
+    dataset = _dataset("d7", competition_id=1, match_id=7)
+    repository.save("main", dataset)
+
+    refreshed = cache.get("test_provider", "match", selector)
+    assert refreshed is summary_map
+    assert "competition_id=1/match_id=7" in refreshed
+    assert len(calls) == 1
+    assert calls[0]["updated_since"] is not None
+
+    # A deleted dataset isn't seen by a refresh: the count check reloads
+    repository.destroy(dataset)
+    refreshed = cache.get("test_provider", "match", selector)
+    assert "competition_id=1/match_id=7" not in refreshed
+    assert len(refreshed) == 3
+    assert calls[-1].get("updated_since") is None
+
+
+def test_refresh_reads_invalidated_datasets(engine):
+    repository = engine.store.dataset_repository
+    # Updated long before the refresh window
+    dataset = _dataset("d1", 1, 1, updated_at=utcnow() - timedelta(days=1))
+    dataset.last_modified_at = utcnow() - timedelta(days=1)
+    repository.save("main", dataset)
+    repository.save("main", _dataset("d2", 1, 2, updated_at=utcnow()))
+
+    cache = DatasetSummaryCache(engine.store)
+    summary_map = cache.get("test_provider", "match")
+    assert summary_map["competition_id=1/match_id=1"].last_modified is not None
+
+    repository.invalidate_revisions([dataset])
+    summary_map = cache.get("test_provider", "match")
+    assert summary_map["competition_id=1/match_id=1"].last_modified is None
+
+
+def test_map_is_kept_between_runs(engine, tmp_path):
+    _fill(engine.store.dataset_repository)
+    selector = Selector(competition_id=0)
+
+    cache = DatasetSummaryCache(engine.store, cache_dir=tmp_path / "cache")
+    summary_map = cache.get("test_provider", "match", selector)
+    cache.save()
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    loaded = DatasetSummaryMap.load(next((tmp_path / "cache").iterdir()))
+    assert len(loaded) == len(summary_map)
+    assert loaded.watermark == summary_map.watermark
+    for i in (0, 2, 4):
+        key = f"competition_id=0/match_id={i}"
+        assert loaded[key] == summary_map[key]
+
+    calls = []
+    get_dataset_summary_map = engine.store.get_dataset_summary_map
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return get_dataset_summary_map(**kwargs)
+
+    engine.store.get_dataset_summary_map = spy
+
+    # The next run starts with the file and only refreshes it
+    cache = DatasetSummaryCache(engine.store, cache_dir=tmp_path / "cache")
+    assert len(cache.get("test_provider", "match", selector)) == 3
+    assert [call["updated_since"] is not None for call in calls] == [True]
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "summary_map.bin"
+    path.write_bytes(b'{"version": 1, "watermark": null, "sizes": [10]}\n12')
+    assert DatasetSummaryMap.load(path) is None
+    assert DatasetSummaryMap.load(tmp_path / "missing.bin") is None
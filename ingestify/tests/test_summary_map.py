@@ -0,0 +1,78 @@
+"""DatasetSummaryMap keeps the dict contract used by FetchPolicy.can_skip."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ingestify.domain.models.dataset.dataset import DatasetSummary
+from ingestify.domain.models.dataset.revision import RevisionState
+from ingestify.domain.models.dataset.summary_map import DatasetSummaryMap
+
+
+def _summary(i, state=RevisionState.PENDING_VALIDATION):
+    moment = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(
+        seconds=i, microseconds=i
+    )
+    return DatasetSummary(
+        last_modified=moment,
+        current_created_at=moment + timedelta(minutes=1),
+        current_state=state,
+        has_revisions=True,
+    )
+
+
+def test_get_returns_stored_summary():
+    summary_map = DatasetSummaryMap()
+    for i in range(1000):
+        summary_map[f"match_id={i}"] = _summary(i)
+
+    assert len(summary_map) == 1000
+    for i in range(1000):
+        assert summary_map.get(f"match_id={i}") == _summary(i)
+    assert "match_id=5" in summary_map
+    assert "match_id=1000" not in summary_map
+    assert summary_map.get("match_id=1000") is None
+    with pytest.raises(KeyError):
+        summary_map["match_id=1000"]
+
+
+def test_missing_values():
+    summary_map = DatasetSummaryMap()
+    assert not summary_map
+
+    summary_map.add(
+        "match_id=1",
+        last_modified=None,
+        current_created_at=None,
+        current_state=None,
+        has_revisions=False,
+    )
+    assert summary_map
+    assert summary_map.get("match_id=1") == DatasetSummary(
+        last_modified=None,
+        current_created_at=None,
+        current_state=None,
+        has_revisions=False,
+    )
+
+
+def test_add_replaces_existing_key():
+    summary_map = DatasetSummaryMap()
+    summary_map["match_id=1"] = _summary(1)
+    summary_map["match_id=1"] = _summary(2, RevisionState.VALIDATION_FAILED)
+
+    assert len(summary_map) == 1
+    assert summary_map.get("match_id=1") == _summary(2, RevisionState.VALIDATION_FAILED)
+
+
+def test_naive_datetimes_are_utc():
+    summary_map = DatasetSummaryMap()
+    summary_map.add(
+        "match_id=1",
+        last_modified=datetime(2024, 1, 1, 12),
+        current_created_at=None,
+        current_state=RevisionState.APPROVED,
+        has_revisions=True,
+    )
+    assert summary_map.get("match_id=1").last_modified == datetime(
+        2024, 1, 1, 12, tzinfo=timezone.utc
+    )
@@ -0,0 +1,190 @@
+"""Transfers of large files in parts, for S3 and GCS."""
+import os
+import threading
+from io import BytesIO
+
+import pytest
+
+from ingestify.domain.services.identifier_key_transformer import IdentifierTransformer
+from ingestify.infra import GCSFileRepository, S3FileRepository
+from ingestify.infra.store.file.transfer import TransferOptions, TransferPool
+
+MB = 1024 * 1024
+
+
+def test_transfer_options():
+    options = TransferOptions.from_dict(
+        {"threshold": "64MB", "part_size": 16 * MB, "concurrency": 4}
+    )
+    assert options == TransferOptions(
+        threshold=64 * MB, part_size=16 * MB, concurrency=4
+    )
+    assert TransferOptions.from_dict(None) == TransferOptions()
+
+
+def test_ranged_download():
+    content = os.urandom(1000)
+    pool = TransferPool(TransferOptions(threshold=100, part_size=64, concurrency=3))
+    threads = set()
+
+    def fetch(start, end):
+        threads.add(threading.current_thread().name)
+        return content[start : end + 1]
+
+    stream = pool.download(content[:100], len(content), fetch)
+    assert stream.read() == content
+    assert len(threads) > 1
+
+    with pytest.raises(IOError):
+        pool.download(content[:100], len(content) + 1, fetch)
+
+
+class _FakeGCSBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def _data(self):
+        return self.bucket.objects[self.name]
+
+    @property
+    def size(self):
+        return len(self._data)
+
+    @property
+    def generation(self):
+        return self.bucket.generations[self.name]
+
+    def _store(self, data: bytes):
+        self.bucket.objects[self.name] = data
+        self.bucket.generations[self.name] = (
+            self.bucket.generations.get(self.name, 0) + 1
+        )
+
+    def upload_from_file(self, stream):
+        self.bucket.uploads += 1
+        self._store(stream.read())
+
+    def upload_from_string(self, data):
+        self.bucket.uploads += 1
+        self._store(data)
+
+    def compose(self, sources):
+        assert len(sources) <= 32
+        self._store(b"".join(source._data for source in sources))
+
+    def delete(self):
+        del self.bucket.objects[self.name]
+
+    def download_as_bytes(
+        self, start=None, end=None, checksum="md5", if_generation_match=None
+    ):
+        assert if_generation_match == self.generation
+        self.bucket.downloads += 1
+        if start is None:
+            return self._data
+        return self._data[start : end + 1]
+
+
+class _FakeGCSBucket:
+    def __init__(self):
+        self.objects = {}
+        self.generations = {}
+        self.uploads = 0
+        self.downloads = 0
+
+    def blob(self, name):
+        return _FakeGCSBlob(self, name)
+
+    def get_blob(self, name):
+        return _FakeGCSBlob(self, name) if name in self.objects else None
+
+
+class _FakeGCSClient:
+    def __init__(self):
+        self.buckets = {}
+
+    def bucket(self, name):
+        return self.buckets.setdefault(name, _FakeGCSBucket())
+
+
+def test_gcs_composite_upload_and_ranged_download():
+    repository = GCSFileRepository(
+        url="gcs://",
+        identifier_transformer=IdentifierTransformer(),
+        transfer_options=TransferOptions(threshold=1000, part_size=100, concurrency=4),
+    )
+    repository._client = client = _FakeGCSClient()
+    bucket = client.bucket("test-bucket")
+
+    content = os.urandom(5000)
+    repository.save_content_at("test-bucket/main/large", BytesIO(content))
+    # 32 parts at most: 50 parts of 100 bytes become 32 parts of 157 bytes
+    assert bucket.uploads == 32
+    assert list(bucket.objects) == ["main/large"]
+
+    stream = repository.load_content("test-bucket/main/large")
+    assert stream.read() == content
+    # The first 1000 bytes, and 40 parts of 100 bytes
+    assert bucket.downloads == 1 + 40
+
+    repository.save_content_at("test-bucket/main/small", BytesIO(b"small"))
+    assert repository.load_content("test-bucket/main/small").read() == b"small"
+
+    with pytest.raises(FileNotFoundError):
+        repository.load_content("test-bucket/main/missing")
+
+
+def test_gcs_upload_of_unseekable_stream():
+    repository = GCSFileRepository(
+        url="gcs://",
+        identifier_transformer=IdentifierTransformer(),
+        transfer_options=TransferOptions(threshold=1000, part_size=100, concurrency=4),
+    )
+    repository._client = client = _FakeGCSClient()
+
+    class _Unseekable(BytesIO):
+        def seekable(self):
+            return False
+
+    # Over 32 parts, composed in rounds
+    content = os.urandom(4000)
+    repository.save_content_at("test-bucket/main/large", _Unseekable(content))
+    assert client.bucket("test-bucket").objects == {"main/large": content}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket="test-bucket")
+        yield client
+
+
+def test_s3_multipart_upload_and_ranged_download(s3):
+    repository = S3FileRepository(
+        url="s3://",
+        identifier_transformer=IdentifierTransformer(),
+        # S3 parts are at least 5MB
+        transfer_options=TransferOptions(threshold=6 * MB, part_size=5 * MB),
+    )
+
+    content = os.urandom(13 * MB)
+    repository.save_content_at("test-bucket/main/large", BytesIO(content))
+    etag = s3.head_object(Bucket="test-bucket", Key="main/large")["ETag"]
+    # A multipart upload of 3 parts
+    assert etag.strip('"').endswith("-3")
+    assert repository.load_content("test-bucket/main/large").read() == content
+
+    repository.save_content_at("test-bucket/main/small", BytesIO(b"small"))
+    assert repository.load_content("test-bucket/main/small").read() == b"small"
+
+    repository.save_content_at("test-bucket/main/empty", BytesIO(b""))
+    assert repository.load_content("test-bucket/main/empty").read() == b""
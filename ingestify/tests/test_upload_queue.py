@@ -0,0 +1,198 @@
+"""with_upload_queue: files are uploaded in the background and the revision is
+saved once its uploads are done."""
+import hashlib
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from ingestify import DatasetResource, Source
+from ingestify.application.upload_queue import UploadQueue
+from ingestify.domain import (
+    DataSpecVersionCollection,
+    DatasetCreated,
+    DraftFile,
+    Selector,
+)
+from ingestify.domain.models.dataset.events import RevisionAdded
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.tests.conftest import create_dataset, draft_files, revision_source
+from ingestify.utils import utcnow
+
+
+class _BlockingUploads:
+    """Wraps a save method; uploads wait until `release` is set"""
+
+    def __init__(self, save):
+        self.save = save
+        self.release = threading.Event()
+        self.threads = set()
+
+    def __call__(self, *args, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        assert self.release.wait(5)
+        return self.save(*args, **kwargs)
+
+
+def test_revision_is_saved_after_uploads(engine):
+    store = engine.store
+    event_bus = Mock()
+    dispatch_threads = []
+    event_bus.dispatch.side_effect = lambda event: dispatch_threads.append(
+        threading.current_thread().name
+    )
+    store.set_event_bus(event_bus)
+    uploads = _BlockingUploads(store.file_repository.save_content)
+
+    with patch.object(store.file_repository, "save_content", uploads):
+        with store.with_upload_queue(max_workers=2):
+            # The task continues while the files are uploaded
+            assert create_dataset(store, 1, events="[]", lineups="{}") is None
+            assert len(store.get_dataset_collection(item_id=1)) == 0
+            event_bus.dispatch.assert_not_called()
+
+            uploads.release.set()
+            assert store.flush_uploads() == []
+            # The events are dispatched on flush, by this thread
+            assert dispatch_threads == [threading.current_thread().name] * 2
+        assert all(name.startswith("upload") for name in uploads.threads)
+
+    dataset = store.get_dataset_collection(item_id=1).first()
+    assert dataset.current_revision.revision_id == 0
+    assert store.load_files(dataset).get_file("events").stream.read() == b"[]"
+    assert [type(call.args[0]) for call in event_bus.dispatch.call_args_list] == [
+        RevisionAdded,
+        DatasetCreated,
+    ]
+
+
+def test_failed_upload_does_not_save_the_revision(engine):
+    store = engine.store
+
+    with patch.object(
+        store.file_repository, "save_content", side_effect=IOError("Failed")
+    ):
+        with store.with_upload_queue(max_workers=2):
+            queue = store.upload_queue
+            create_dataset(store, 1, events="[]")
+            failed = store.flush_uploads()
+
+    assert queue.failed == 1
+    assert [dataset.identifier["item_id"] for dataset in failed] == [1]
+    assert len(store.get_dataset_collection(item_id=1)) == 0
+
+
+def test_revisions_of_a_dataset_are_saved_in_order(engine):
+    store = engine.store
+    dataset = create_dataset(store, 1, events="v1")
+
+    with store.with_upload_queue(max_workers=2):
+        first = store.add_revision(dataset, draft_files(events="v2"), revision_source())
+        second = store.add_revision(
+            dataset, draft_files(events="v3"), revision_source()
+        )
+    assert (first.revision_id, second.revision_id) == (1, 2)
+
+    dataset = store.get_dataset_collection(item_id=1).first()
+    assert [revision.revision_id for revision in dataset.revisions] == [0, 1, 2]
+    assert store.load_files(dataset).get_file("events").stream.read() == b"v3"
+
+
+def test_content_addressed_blob_is_recorded_after_upload(engine):
+    store = engine.store
+    store.content_addressed = True
+
+    with store.with_upload_queue(max_workers=2):
+        create_dataset(store, 1, events="[1, 2]")
+
+    dataset = store.get_dataset_collection(item_id=1).first()
+    file = dataset.current_revision.modified_files_map["events"]
+    content_hash = hashlib.sha1(b"[1, 2]").hexdigest()
+    blob = store.dataset_repository.get_blobs("main", [content_hash])[content_hash]
+    assert file.storage_path == blob.storage_path
+    assert store.load_files(dataset).get_file("events").stream.read() == b"[1, 2]"
+
+
+def test_queue_is_bounded_by_size():
+    queue = UploadQueue(max_workers=4, max_size=10)
+    release = threading.Event()
+    queue.submit(lambda: release.wait(5), size=6)
+
+    submitted = threading.Event()
+
+    def submit_second():
+        queue.submit(lambda: None, size=6)
+        submitted.set()
+
+    thread = threading.Thread(target=submit_second)
+    thread.start()
+    time.sleep(0.05)
+    # 12 bytes would be over the budget
+    assert not submitted.is_set()
+
+    release.set()
+    assert submitted.wait(5)
+    thread.join()
+
+    # Larger than the budget, but the queue is empty
+    queue.submit(lambda: None, size=100).result()
+    queue.close()
+
+
+def test_without_upload_queue(engine):
+    store = engine.store
+    with store.with_upload_queue(max_workers=0):
+        assert store.upload_queue is None
+        assert create_dataset(store, 1, events="[]") is not None
+
+
+class _Source(Source):
+    provider = "test_provider"
+
+    def find_datasets(
+        self, dataset_type, data_spec_versions, dataset_collection_metadata, **kwargs
+    ):
+        for i in range(3):
+            resource = DatasetResource(
+                dataset_resource_id={"item_id": i},
+                provider=self.provider,
+                dataset_type="test",
+                name=f"item-{i}",
+            )
+            resource.add_file(
+                last_modified=utcnow(),
+                data_feed_key="events",
+                data_spec_version="v1",
+                file_loader=lambda file_resource, current_file, **kwargs: (
+                    DraftFile.from_input("[]", data_feed_key="events")
+                ),
+            )
+            yield resource
+
+
+def test_failed_upload_fails_the_task(engine, monkeypatch):
+    monkeypatch.setenv("INGESTIFY_UPLOAD_CONCURRENCY", "2")
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=_Source("s"),
+            fetch_policy=FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+    store = engine.store
+    save_content = store.file_repository.save_content
+
+    def fail_item_1(bucket, dataset, *args, **kwargs):
+        if dataset.identifier["item_id"] == 1:
+            raise IOError("Failed")
+        return save_content(bucket, dataset, *args, **kwargs)
+
+    with patch.object(store.file_repository, "save_content", fail_item_1):
+        engine.run()
+
+    summary = store.dataset_repository.load_ingestion_job_summaries()[0]
+    assert (summary.successful_tasks, summary.failed_tasks) == (2, 1)
+    assert len(store.get_dataset_collection()) == 2
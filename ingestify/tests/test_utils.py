@@ -1,7 +1,24 @@
 import gzip
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from unittest.mock import patch
 
-from ingestify.utils import BufferedStream, detect_compression, gzip_uncompressed_size
+import pytest
+
+from ingestify import Source, DatasetResource
+from ingestify.domain import DataSpecVersionCollection, DraftFile, Selector
+from ingestify.domain.models.fetch_policy import FetchPolicy
+from ingestify.domain.models.ingestion.ingestion_job import IngestionJob
+from ingestify.domain.models.ingestion.ingestion_plan import IngestionPlan
+from ingestify.utils import (
+    BufferedStream,
+    TaskExecutor,
+    detect_compression,
+    gzip_uncompressed_size,
+    utcnow,
+)
 
 PLAIN = b'{"key": "value"}' * 100
 
@@ -27,3 +44,141 @@ def test_detect_compression_resets_position():
 def test_gzip_uncompressed_size():
     compressed = gzip.compress(PLAIN)
     assert gzip_uncompressed_size(to_stream(compressed)) == len(PLAIN)
+
+
+def _thread_executor(max_workers, max_in_flight):
+    executor = TaskExecutor(processes=max_workers, max_in_flight=max_in_flight)
+    # Tests run with INGESTIFY_RUN_EAGER; force a real thread pool here
+    executor.executor = ThreadPoolExecutor(max_workers=max_workers)
+    return executor
+
+
+def test_iter_run_bounds_in_flight_tasks():
+    lock = threading.Lock()
+    in_flight = 0
+    max_seen = 0
+
+    def task(item):
+        nonlocal in_flight, max_seen
+        with lock:
+            in_flight += 1
+            max_seen = max(max_seen, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return item
+
+    completed = []
+    submitted_ahead = []
+
+    def items():
+        for i in range(20):
+            # Tasks handed out so far that have not finished yet
+            with lock:
+                submitted_ahead.append(i - len(completed))
+            yield i
+
+    def tracked_task(item):
+        result = task(item)
+        with lock:
+            completed.append(item)
+        return result
+
+    with _thread_executor(max_workers=8, max_in_flight=3) as executor:
+        results = list(executor.iter_run(tracked_task, items()))
+
+    assert max(submitted_ahead) <= 3
+    assert sorted(results) == list(range(20))
+    assert max_seen <= 3
+
+
+def test_iter_run_yields_in_completion_order():
+    release_slow = threading.Event()
+
+    def task(item):
+        if item == 0:
+            release_slow.wait(timeout=5)
+        return item
+
+    with _thread_executor(max_workers=4, max_in_flight=4) as executor:
+        results = []
+        for result in executor.iter_run(task, range(4)):
+            results.append(result)
+            if len(results) == 3:
+                # The fast tasks came back while the slow one is still running
+                release_slow.set()
+
+    assert results[-1] == 0
+    assert sorted(results[:3]) == [1, 2, 3]
+
+
+def test_iter_run_cancels_pending_on_error():
+    started = []
+
+    def task(item):
+        started.append(item)
+        if item == 0:
+            raise ValueError("boom")
+        time.sleep(0.05)
+        return item
+
+    with _thread_executor(max_workers=1, max_in_flight=5) as executor:
+        with pytest.raises(ValueError, match="boom"):
+            list(executor.iter_run(task, range(10)))
+
+    # The queued tasks were cancelled: at most the task the worker picked up
+    # right after the failing one still ran
+    assert started[0] == 0
+    assert len(started) <= 2
+
+
+def test_ingestion_job_saves_progress_per_task(engine):
+    dsv = DataSpecVersionCollection.from_dict({"default": {"v1"}})
+
+    class _Source(Source):
+        provider = "test_provider"
+
+        def find_datasets(
+            self,
+            dataset_type,
+            data_spec_versions,
+            dataset_collection_metadata,
+            **kwargs,
+        ):
+            for i in range(3):
+                r = DatasetResource(
+                    dataset_resource_id={"item_id": i},
+                    provider=self.provider,
+                    dataset_type="test",
+                    name=f"item-{i}",
+                )
+                r.add_file(
+                    last_modified=utcnow(),
+                    data_feed_key="f1",
+                    data_spec_version="v1",
+                    file_loader=lambda *args, **kwargs: DraftFile.from_input(
+                        "data", data_feed_key="f1"
+                    ),
+                )
+                yield r
+
+    engine.add_ingestion_plan(
+        IngestionPlan(
+            source=_Source("s"),
+            fetch_policy=FetchPolicy(),
+            dataset_type="test",
+            selectors=[Selector.build({}, data_spec_versions=dsv)],
+            data_spec_versions=dsv,
+        )
+    )
+
+    task_counts = []
+
+    def save_progress(self, store, ingestion_job_summary, **kwargs):
+        task_counts.append(len(ingestion_job_summary.task_summaries))
+
+    with patch.object(IngestionJob, "_save_progress", save_progress):
+        engine.run()
+
+    # Called after every single task instead of once per batch
+    assert [1, 2, 3] == [count for count in task_counts if count][:3]
@@ -1,16 +1,29 @@
+import asyncio
+import hashlib
+import io
 import logging
+import mmap
 import os
+import pickle
+import queue
 import shutil
 import tempfile
 import time
 import re
+import threading
 import traceback
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
 from contextlib import contextmanager
 
 from datetime import datetime, timezone
 from string import Template
-from typing import BinaryIO, Dict, Tuple, Optional, Any, List
+from typing import BinaryIO, Dict, Tuple, Optional, Any, List, Union
 
 from pydantic import Field
 from typing_extensions import Self
@@ -19,6 +32,7 @@ from typing_extensions import Self
 from itertools import islice
 
 from ingestify.domain.models.timing import Timing
+from ingestify.exceptions import ConfigurationError
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +61,66 @@ class BufferedStream(tempfile.SpooledTemporaryFile):
         return buffer
 
 
+class MappedStream(io.BufferedIOBase):
+    """Read-only, seekable stream over a memory-mapped file. The pages are read
+    by the OS when they're accessed, and `getbuffer` gives zero-copy access to
+    the whole content."""
+
+    def __init__(self, fileobj: BinaryIO):
+        # The mapping stays valid after the file is closed
+        with fileobj:
+            self._mmap = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        self._checkClosed()
+        return self._mmap.read(-1 if size is None else size)
+
+    read1 = read
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._checkClosed()
+        self._mmap.seek(offset, whence)
+        return self._mmap.tell()
+
+    def tell(self) -> int:
+        self._checkClosed()
+        return self._mmap.tell()
+
+    def getbuffer(self) -> memoryview:
+        return memoryview(self._mmap)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A buffer from getbuffer() is still in use. The mapping is
+                # released when that's garbage collected.
+                pass
+        super().close()
+
+
+def content_hash(stream: BinaryIO) -> str:
+    """sha1 of the content of a seekable stream. The stream is rewound."""
+    hash_ = hashlib.sha1()
+    stream.seek(0)
+    while chunk := stream.read(1024 * 1024):
+        hash_.update(chunk)
+    stream.seek(0)
+    return hash_.hexdigest()
+
+
 def gzip_uncompressed_size(stream: BinaryIO) -> int:
     """Read uncompressed size from the gzip trailer (last 4 bytes, mod 2^32)."""
     stream.seek(-4, 2)
@@ -155,6 +229,10 @@ class SyncExecutor:
     def map(self, func, iterable):
         return [func(item) for item in iterable]
 
+    def iter_map(self, func, iterable, max_in_flight=None):
+        for item in iterable:
+            yield func(item)
+
     def __enter__(self):
         return self
 
@@ -167,6 +245,10 @@ class DummyExecutor:
         logger.info(f"DummyPool: not running {len(list(iterable))} tasks")
         return None
 
+    def iter_map(self, func, iterable, max_in_flight=None):
+        logger.info(f"DummyPool: not running {len(list(iterable))} tasks")
+        return iter([])
+
     def __enter__(self):
         return self
 
@@ -174,26 +256,166 @@ class DummyExecutor:
         pass
 
 
+def _require_cloudpickle():
+    try:
+        import cloudpickle
+    except ImportError as e:
+        raise ConfigurationError(
+            "cloudpickle is required for the process executor. "
+            "Install with: pip install ingestify[process]"
+        ) from e
+    return cloudpickle
+
+
+def _dumps(obj) -> bytes:
+    # cloudpickle can also handle lambdas and closures (e.g. file loaders)
+    return _require_cloudpickle().dumps(obj)
+
+
+def _call_pickled(payload: bytes):
+    func, item = pickle.loads(payload)
+    return func(item)
+
+
+class AsyncioExecutor(Executor):
+    """Executor for coroutine functions. The coroutines run on an event loop
+    in a background thread; `submit` returns a concurrent.futures.Future."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, /, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), self.loop)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if self.loop.is_closed():
+            return
+        from ingestify.infra.fetch.http import close_async_client
+
+        # The pooled HTTP client of this loop
+        asyncio.run_coroutine_threadsafe(close_async_client(), self.loop).result()
+        # Blocking work offloaded with run_in_executor(None, ...)
+        asyncio.run_coroutine_threadsafe(
+            self.loop.shutdown_default_executor(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+async def _anext(iterator):
+    return await iterator.__anext__()
+
+
+def iter_async(async_iterable, loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Iterate over an async iterable from synchronous code.
+
+    When `loop` is given (and running in another thread) the iterable is
+    driven on that loop, otherwise on a private loop."""
+    iterator = async_iterable.__aiter__()
+    own_loop = loop is None
+    if own_loop:
+        loop = asyncio.new_event_loop()
+
+    try:
+        while True:
+            try:
+                if own_loop:
+                    item = loop.run_until_complete(_anext(iterator))
+                else:
+                    item = asyncio.run_coroutine_threadsafe(
+                        _anext(iterator), loop
+                    ).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if own_loop:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+EXECUTOR_BACKENDS = ("thread", "process", "hybrid", "asyncio")
+
+
+def get_executor_backend(backend: Optional[str] = None) -> str:
+    """The backend tasks run on:
+
+    - thread: a thread pool (default)
+    - process: a process pool. Use this when tasks are CPU-bound
+    - hybrid: a thread pool for the tasks, plus a process pool for CPU-heavy
+      stages like compression
+    - asyncio: tasks are coroutines on an event loop. Used for AsyncSource
+    """
+    backend = backend or os.environ.get("INGESTIFY_EXECUTOR") or "thread"
+    if backend not in EXECUTOR_BACKENDS:
+        raise ValueError(
+            f"Unknown executor '{backend}'. Choose from: {', '.join(EXECUTOR_BACKENDS)}"
+        )
+    return backend
+
+
 class TaskExecutor:
-    def __init__(self, processes=0, dry_run: bool = False):
+    def __init__(
+        self,
+        processes=0,
+        dry_run: bool = False,
+        max_in_flight: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
+        self.backend = get_executor_backend(backend)
+        # Process pool for CPU-bound work when tasks themselves run on threads
+        self.cpu_executor: Optional[ProcessPoolExecutor] = None
+
         if dry_run:
             executor = DummyExecutor()
+        elif self.backend == "asyncio":
+            executor = AsyncioExecutor()
+            if os.environ.get("INGESTIFY_RUN_EAGER") == "true":
+                # One coroutine at a time
+                processes = 1
+            # No threads per task: many more tasks can be in flight
+            processes = processes or get_async_concurrency()
+            max_in_flight = max_in_flight or processes
         elif os.environ.get("INGESTIFY_RUN_EAGER") == "true":
             executor = SyncExecutor()
+        elif self.backend == "process":
+            # Fail now, instead of when the first task is submitted
+            _require_cloudpickle()
+            # Workers rebuild the DatasetStore from its pickled state.
+            processes = processes or os.cpu_count() or 1
+            executor = ProcessPoolExecutor(max_workers=processes)
         else:
             if not processes:
                 processes = get_concurrency()
 
-            # if "fork" in get_all_start_methods():
-            #     ctx = get_context("fork")
-            # else:
-            #     ctx = get_context("spawn")
-
-            # pool = ctx.Pool(processes or cpu_count())
-
             executor = ThreadPoolExecutor(max_workers=processes)
+            if self.backend == "hybrid":
+                self.cpu_executor = ProcessPoolExecutor(max_workers=os.cpu_count())
 
         self.executor = executor
+        self.max_in_flight = max_in_flight or get_max_in_flight(processes)
+
+    @property
+    def runs_in_processes(self) -> bool:
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    @property
+    def runs_concurrently(self) -> bool:
+        """Whether tasks run concurrently within this process."""
+        return (
+            isinstance(self.executor, (ThreadPoolExecutor, AsyncioExecutor))
+            and self.max_in_flight > 1
+        )
+
+    @property
+    def event_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The event loop tasks run on, when they are coroutines."""
+        if isinstance(self.executor, AsyncioExecutor):
+            return self.executor.loop
+        return None
 
     def __enter__(self):
         self.executor.__enter__()
@@ -201,13 +423,18 @@ class TaskExecutor:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.executor.__exit__(exc_type, exc_val, exc_tb)
+        if self.cpu_executor:
+            self.cpu_executor.shutdown(cancel_futures=exc_type is not None)
+
+    def _wrap(self, func, iterable):
+        if not self.runs_in_processes:
+            return func, iterable
+        # Pickle ourselves, so tasks don't need to be picklable by the
+        # standard pickle module
+        return _call_pickled, (_dumps((func, item)) for item in iterable)
 
     def run(self, func, iterable):
-        # If multiprocessing
-        # wrapped_fn = cloudpickle.dumps(func)
-        # res = self.executor.map(
-        #     cloud_unpack_and_call, ((wrapped_fn, item) for item in iterable)
-        # )
+        func, iterable = self._wrap(func, iterable)
         start_time = time.time()
         res = list(self.executor.map(func, iterable))
         if res:
@@ -217,6 +444,63 @@ class TaskExecutor:
             )
         return res
 
+    def iter_run(self, func, iterable):
+        """Like `run`, but yield results as soon as they complete.
+
+        At most `max_in_flight` tasks are submitted at any time, so a slow task
+        doesn't hold back the results of the others. Results are yielded in
+        completion order, not submission order.
+        """
+        if not isinstance(self.executor, (Executor, SyncExecutor, DummyExecutor)):
+            # Unknown executor: it only promises `map`
+            yield from self.run(func, iterable) or []
+            return
+
+        func, iterable = self._wrap(func, iterable)
+        start_time = time.time()
+        if isinstance(self.executor, Executor):
+            results = _iter_bounded(self.executor, func, iterable, self.max_in_flight)
+        else:
+            results = self.executor.iter_map(func, iterable)
+
+        count = 0
+        for result in results:
+            count += 1
+            yield result
+
+        if count:
+            took = time.time() - start_time
+            logger.info(
+                f"Finished {count} tasks in {took:.1f} seconds. {(count/took):.1f} tasks/sec"
+            )
+
+
+def _iter_bounded(executor, func, iterable, max_in_flight: int):
+    iterator = iter(iterable)
+    pending = set()
+
+    def submit_next() -> bool:
+        for item in iterator:
+            pending.add(executor.submit(func, item))
+            return True
+        return False
+
+    try:
+        while len(pending) < max_in_flight and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                # Raises when the task failed; remaining tasks are cancelled below
+                result = future.result()
+                submit_next()
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
 
 def try_number(s: str):
     try:
@@ -276,3 +560,165 @@ def get_concurrency():
     if not concurrency:
         concurrency = min(32, (os.cpu_count() or 1) + 4)
     return concurrency
+
+
+def get_async_concurrency():
+    """Number of coroutines (e.g. HTTP requests) in flight for async sources."""
+    return int(os.environ.get("INGESTIFY_ASYNC_CONCURRENCY", "100"))
+
+
+def get_max_in_flight(concurrency: int = 0):
+    """Maximum number of tasks submitted to the executor at the same time.
+    Defaults to twice the concurrency, so workers never wait for new work."""
+    max_in_flight = int(os.environ.get("INGESTIFY_MAX_IN_FLIGHT", "0"))
+    if not max_in_flight:
+        max_in_flight = 2 * (concurrency or get_concurrency())
+    return max_in_flight
+
+
+def get_pipeline_depth():
+    """Number of batches that may be discovered ahead of the one being executed.
+    0 (the default) disables the staged pipeline and runs batches sequentially."""
+    return int(os.environ.get("INGESTIFY_PIPELINE_DEPTH", "0"))
+
+
+def get_group_commit_size():
+    """Maximum number of dataset saves combined in one transaction. 0 disables
+    group commit, so every task saves its dataset in its own transaction."""
+    return int(os.environ.get("INGESTIFY_GROUP_COMMIT_SIZE", "100"))
+
+
+def get_group_commit_delay():
+    """Seconds a save waits for other saves to join its transaction."""
+    return int(os.environ.get("INGESTIFY_GROUP_COMMIT_DELAY_MS", "20")) / 1000
+
+
+def get_upload_concurrency():
+    """Number of threads uploading files in the background, while tasks
+    continue. 0 (the default) disables the upload queue, so every task
+    uploads its own files."""
+    return int(os.environ.get("INGESTIFY_UPLOAD_CONCURRENCY", "0"))
+
+
+def get_upload_queue_size() -> int:
+    """Bytes of files that may wait in the upload queue."""
+    return parse_size(os.environ.get("INGESTIFY_UPLOAD_QUEUE_SIZE", "256MB"))
+
+
+def get_summary_cache_dir() -> Optional[str]:
+    """Directory where the summary maps are kept between runs. Not set (the
+    default) disables the cache file, so every run loads them from the store."""
+    return os.environ.get("INGESTIFY_SUMMARY_CACHE_DIR") or None
+
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: Union[int, str]) -> int:
+    """Number of bytes of a size like 500MB or 10GB (or a plain number)."""
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", size.upper())
+    if not match:
+        raise ValueError(f"Invalid size: '{size}'")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+_PIPELINE_END = object()
+
+
+class _PipelineError:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def pipelined(iterable, *stages, maxsize: int = 1, on_thread_exit=None):
+    """Run `iterable` and every stage in its own thread, connected by queues,
+    and yield the output of the last stage in order.
+
+    Each stage is a function item -> item. At most `maxsize` items are taken
+    from `iterable` ahead of the consumer: an item only counts as consumed once
+    it is yielded, regardless of how many stages there are. An exception raised
+    by the iterable or any stage is re-raised in the consuming thread. Closing
+    the generator stops all stages and waits until their threads exited, so
+    no stage keeps running after the consumer stopped. `on_thread_exit` is
+    called by every background thread right before it exits.
+    """
+    stop = threading.Event()
+    # One slot per item between `iterable` and the consumer
+    slots = threading.Semaphore(maxsize)
+    queues = [queue.Queue() for _ in range(len(stages) + 1)]
+
+    def acquire_slot() -> bool:
+        while not stop.is_set():
+            if slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPELINE_END
+
+    def feed():
+        try:
+            iterator = iter(iterable)
+            while acquire_slot():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    queues[0].put(_PIPELINE_END)
+                    return
+                except BaseException as e:
+                    queues[0].put(_PipelineError(e))
+                    return
+                queues[0].put(item)
+        finally:
+            if on_thread_exit:
+                on_thread_exit()
+
+    def work(stage, in_queue, out_queue):
+        try:
+            while True:
+                item = get(in_queue)
+                if item is _PIPELINE_END or isinstance(item, _PipelineError):
+                    out_queue.put(item)
+                    return
+                try:
+                    result = stage(item)
+                except BaseException as e:
+                    out_queue.put(_PipelineError(e))
+                    return
+                out_queue.put(result)
+        finally:
+            if on_thread_exit:
+                on_thread_exit()
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for idx, stage in enumerate(stages):
+        threads.append(
+            threading.Thread(
+                target=work,
+                args=(stage, queues[idx], queues[idx + 1]),
+                daemon=True,
+            )
+        )
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _PIPELINE_END:
+                return
+            if isinstance(item, _PipelineError):
+                raise item.exception
+            slots.release()
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -42,7 +42,17 @@ def setup_package():
         ],
         extras_require={
             "gcs": ["google-cloud-storage>=2.0.0"],
-            "test": ["pytest>=6.2.5,<7", "pytz"],
+            "async": ["httpx>=0.24"],
+            "zstd": ["zstandard>=0.21"],
+            "process": ["cloudpickle>=2"],
+            "test": [
+                "pytest>=6.2.5,<7",
+                "pytz",
+                "httpx>=0.24",
+                "cloudpickle>=2",
+                "moto[s3]>=5",
+                "zstandard>=0.21",
+            ],
         },
     )
 